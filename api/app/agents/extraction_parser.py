@@ -0,0 +1,182 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+from pydantic import ValidationError
+from app.models.character import Character
+from app.models.extraction_result import ExtractionResult
+from app.models.location import Location
+from app.models.relationship import Relationship
+from app.utils.json_repair import IncrementalObjectParser, parse_partial_json
+
+Entity = Union[Character, Location, Relationship]
+
+class ExtractionParseError(ValueError):
+    """Raised when a response contains nothing that can be used."""
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return ", ".join(_text(item) for item in value)
+    return str(value)
+
+def _names(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value] if value else []
+    if isinstance(value, list):
+        return [_text(item) for item in value if item]
+    return []
+
+def parse_character(data: Dict[str, Any]) -> Character:
+    """
+    Validate one character from an extraction response.
+
+    Missing descriptions become empty strings, and both the prompt's field
+    names (physical_desc) and their long forms (physical_description) are read.
+
+    Raises:
+        ValidationError: If the character has no usable name
+    """
+    return Character(
+        name=_text(data.get("name")).strip(),
+        arc=_text(data.get("arc")),
+        physical_desc=_text(data.get("physical_desc", data.get("physical_description"))),
+        psychological_desc=_text(data.get("psychological_desc", data.get("psychological_description"))),
+        alt_names=_names(data.get("alt_names"))
+    )
+
+def parse_location(data: Dict[str, Any]) -> Location:
+    """
+    Validate one location from an extraction response.
+
+    Raises:
+        ValidationError: If the location has no usable name
+    """
+    return Location(
+        name=_text(data.get("name")).strip(),
+        description=_text(data.get("description")),
+        significance=_text(data.get("significance")),
+        alt_names=_names(data.get("alt_names"))
+    )
+
+def parse_relationship(data: Dict[str, Any]) -> Relationship:
+    """
+    Validate one relationship from an extraction response.
+
+    Property values are flattened to strings, as the graph stores them; a
+    bare value given instead of an object is kept as the "detail" property.
+
+    Raises:
+        ValidationError: If the type, source or target is missing
+    """
+    properties = data.get("properties")
+    if isinstance(properties, list):
+        # Models sometimes return the prompt's [key, value] example literally
+        properties = dict(item for item in properties if isinstance(item, list) and len(item) == 2)
+    elif not isinstance(properties, dict):
+        properties = {"detail": properties} if _text(properties) else {}
+    return Relationship(
+        type=_text(data.get("type")).strip(),
+        description=_text(data.get("description")),
+        source=_text(data.get("source")).strip(),
+        target=_text(data.get("target")).strip(),
+        properties={str(key): _text(value) for key, value in properties.items()}
+    )
+
+_PARSERS = {
+    "characters": parse_character,
+    "locations": parse_location,
+    "relationships": parse_relationship,
+}
+
+def parse_entity(key: str, data: Any) -> Optional[Entity]:
+    """
+    Validate one element of a response's characters, locations or relationships.
+
+    Args:
+        key: "characters", "locations" or "relationships"
+        data: Decoded JSON element
+
+    Returns:
+        The entity, or None if it is invalid or malformed
+    """
+    if not isinstance(data, dict):
+        return None
+    try:
+        entity = _PARSERS[key](data)
+    except (ValidationError, TypeError, AttributeError, ValueError):
+        return None
+    if isinstance(entity, Relationship):
+        return entity if entity.type and entity.source and entity.target else None
+    return entity if entity.name else None
+
+def parse_extraction(text: str) -> ExtractionResult:
+    """
+    Parse an extraction response into validated entities.
+
+    A truncated response keeps every entity that was completely written;
+    invalid entities are dropped and counted rather than failing the chunk.
+
+    Args:
+        text: The model's response
+
+    Returns:
+        The validated result
+
+    Raises:
+        ExtractionParseError: If the response holds no JSON object
+    """
+    try:
+        data, complete = parse_partial_json(text)
+    except ValueError as e:
+        raise ExtractionParseError(str(e)) from e
+    if not isinstance(data, dict):
+        raise ExtractionParseError("The response is not a JSON object")
+
+    entities: Dict[str, list] = {}
+    dropped = 0
+    for key in _PARSERS:
+        items = data.get(key) or []
+        if not isinstance(items, list):
+            items = [items]
+        entities[key] = []
+        for item in items:
+            entity = parse_entity(key, item)
+            if entity is None:
+                dropped += 1
+            else:
+                entities[key].append(entity)
+
+    themes = data.get("themes")
+    return ExtractionResult(
+        characters=entities["characters"],
+        locations=entities["locations"],
+        relationships=entities["relationships"],
+        themes=_names(themes),
+        summary=_text(data.get("summary")),
+        complete=complete,
+        dropped=dropped
+    )
+
+class StreamingExtractionParser:
+    """Validates entities one by one while an extraction response streams in."""
+
+    def __init__(self):
+        self._parser = IncrementalObjectParser(list(_PARSERS))
+
+    def feed(self, text: str) -> List[Tuple[str, Entity]]:
+        """
+        Add the next piece of the response.
+
+        Args:
+            text: Newly received text
+
+        Returns:
+            ("characters" | "locations" | "relationships", entity) pairs completed by this piece
+        """
+        completed = []
+        for key, data in self._parser.feed(text):
+            entity = parse_entity(key, data)
+            if entity is not None:
+                completed.append((key, entity))
+        return completed
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+
+# Connection pool shared by every call to the OpenAI API
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+
+# Shape and speed of the fake backend's responses
+FAKE_LLM_CHARACTERS = int(os.getenv("FAKE_LLM_CHARACTERS", "4"))
+FAKE_LLM_LOCATIONS = int(os.getenv("FAKE_LLM_LOCATIONS", "2"))
+FAKE_LLM_RELATIONSHIPS = int(os.getenv("FAKE_LLM_RELATIONSHIPS", "4"))
+FAKE_LLM_DESCRIPTION_WORDS = int(os.getenv("FAKE_LLM_DESCRIPTION_WORDS", "30"))
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+FAKE_LLM_JITTER = float(os.getenv("FAKE_LLM_JITTER", "0.2"))
+FAKE_LLM_STREAM_PIECES = int(os.getenv("FAKE_LLM_STREAM_PIECES", "20"))
+
+class LLMCompletion:
+    """Text returned by a backend, with the token usage it reported."""
+
+    def __init__(self, text: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+class LLMBackend:
+    """Turns a prompt into a completion; subclasses wrap a model provider."""
+
+    name = "base"
+
+    def fingerprint(self) -> Dict[str, Any]:
+        """Everything about the backend that changes its output, for cache keys."""
+        return {"backend": self.name}
+
+    async def complete(self, prompt: str, on_text: Optional[Callable[[str], None]] = None) -> LLMCompletion:
+        """
+        Complete a prompt.
+
+        Args:
+            prompt: Fully formatted prompt
+            on_text: Called with each piece of the response as it arrives; backends
+                that can stream call it several times, others once with the whole text
+
+        Returns:
+            The model's response and token usage
+        """
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        """Release network resources held by the backend."""
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI chat model through LangChain."""
+
+    name = "openai"
+
+    def __init__(self, model_name: str, params: Dict[str, Any]):
+        """
+        Initialize the backend; the client is created on first use.
+
+        Args:
+            model_name: OpenAI model to call
+            params: Model settings ("temperature" and optional "response_format")
+        """
+        self.model_name = model_name
+        self.params = params
+        self._llm = None
+        self._http_client = None
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            # Imported lazily; langchain_openai accounts for most of the API's import time
+            import httpx
+            from langchain_openai import ChatOpenAI
+            # One keep-alive pool for all chunks, instead of a handshake per client
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+                ),
+                timeout=LLM_TIMEOUT
+            )
+            llm = ChatOpenAI(
+                model=self.model_name,
+                temperature=self.params["temperature"],
+                http_async_client=self._http_client,
+                stream_usage=True
+            )
+            if "response_format" in self.params:
+                llm = llm.bind(response_format=self.params["response_format"])
+            self._llm = llm
+        return self._llm
+
+    def fingerprint(self) -> Dict[str, Any]:
+        # Same shape as before backends existed, so existing cache entries stay valid
+        return {"model": self.model_name, "params": self.params}
+
+    async def complete(self, prompt: str, on_text: Optional[Callable[[str], None]] = None) -> LLMCompletion:
+        if on_text is None:
+            response = await self.llm.ainvoke(prompt)
+        else:
+            response = None
+            async for piece in self.llm.astream(prompt):
+                if piece.content:
+                    on_text(piece.content)
+                response = piece if response is None else response + piece
+        usage = getattr(response, "usage_metadata", None) or {}
+        return LLMCompletion(
+            response.content,
+            prompt_tokens=usage.get("input_tokens", 0),
+            completion_tokens=usage.get("output_tokens", 0)
+        )
+
+    async def aclose(self) -> None:
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            self._llm = None
+
+_FAKE_FIRST_NAMES = [
+    "Elizabeth", "Fitzwilliam", "Jane", "Charles", "Lydia", "George", "Catherine", "William",
+    "Mary", "Kitty", "Caroline", "Charlotte", "Edward", "Anne", "Thomas", "Harriet",
+]
+_FAKE_SURNAMES = ["Bennet", "Darcy", "Bingley", "Wickham", "Collins", "Lucas", "Gardiner", "de Bourgh"]
+_FAKE_PLACES = [
+    "Longbourn", "Netherfield Park", "Pemberley", "Rosings Park", "Meryton", "Lambton",
+    "Hunsford Parsonage", "Brighton", "Gracechurch Street", "Lucas Lodge",
+]
+_FAKE_WORDS = (
+    "quiet proud witty anxious generous reserved lively stern gentle curious "
+    "house garden road letter ball dinner carriage evening morning family "
+    "walks speaks waits writes returns remembers hopes doubts admires avoids"
+).split()
+
+class FakeBackend(LLMBackend):
+    """
+    Offline stand-in that returns schema-valid extraction JSON after a simulated delay.
+
+    Responses are a pure function of the prompt and the configuration, so runs
+    are reproducible and cacheable; names are drawn from small pools so that
+    entities recur across chunks and exercise consolidation like a real book.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        characters: int = FAKE_LLM_CHARACTERS,
+        locations: int = FAKE_LLM_LOCATIONS,
+        relationships: int = FAKE_LLM_RELATIONSHIPS,
+        description_words: int = FAKE_LLM_DESCRIPTION_WORDS,
+        latency: float = FAKE_LLM_LATENCY,
+        jitter: float = FAKE_LLM_JITTER,
+        stream_pieces: int = FAKE_LLM_STREAM_PIECES
+    ):
+        """
+        Initialize the fake.
+
+        Args:
+            characters: Characters per response
+            locations: Locations per response
+            relationships: Relationships per response
+            description_words: Words in each generated description, to control response size
+            latency: Seconds every call takes
+            jitter: Extra seconds added at random (deterministically per prompt), up to this much
+            stream_pieces: Number of evenly spaced pieces a streamed response arrives in
+        """
+        self.characters = characters
+        self.locations = locations
+        self.relationships = relationships
+        self.description_words = description_words
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_pieces = max(1, stream_pieces)
+
+    def fingerprint(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "characters": self.characters,
+            "locations": self.locations,
+            "relationships": self.relationships,
+            "description_words": self.description_words,
+        }
+
+    def _text(self, rng: random.Random) -> str:
+        return " ".join(rng.choice(_FAKE_WORDS) for _ in range(self.description_words)).capitalize() + "."
+
+    def respond(self, prompt: str) -> str:
+        """
+        Build the response for a prompt without waiting.
+
+        Args:
+            prompt: Fully formatted prompt
+
+        Returns:
+            Extraction JSON matching the prompt's schema
+        """
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+
+        names = set()
+        while len(names) < min(self.characters, len(_FAKE_FIRST_NAMES) * len(_FAKE_SURNAMES)):
+            names.add(f"{rng.choice(_FAKE_FIRST_NAMES)} {rng.choice(_FAKE_SURNAMES)}")
+        characters = [
+            {
+                "name": name,
+                "arc": self._text(rng),
+                "physical_desc": self._text(rng),
+                "psychological_desc": self._text(rng),
+                "alt_names": [name.split(" ")[0]] if rng.random() < 0.5 else [],
+            }
+            for name in sorted(names)
+        ]
+
+        places = sorted(rng.sample(_FAKE_PLACES, min(self.locations, len(_FAKE_PLACES))))
+        locations = [
+            {"name": place, "description": self._text(rng), "significance": self._text(rng)}
+            for place in places
+        ]
+
+        relationships: List[Dict[str, Any]] = []
+        for _ in range(self.relationships if characters else 0):
+            source = rng.choice(characters)["name"]
+            if locations and rng.random() < 0.4:
+                rel_type, target = "character_to_location", rng.choice(locations)["name"]
+            else:
+                rel_type, target = "character_to_character", rng.choice(characters)["name"]
+            relationships.append({
+                "type": rel_type,
+                "description": self._text(rng),
+                "source": source,
+                "target": target,
+                "properties": {"detail": self._text(rng)},
+            })
+
+        return json.dumps({
+            "themes": [rng.choice(_FAKE_WORDS) for _ in range(3)],
+            "characters": characters,
+            "locations": locations,
+            "relationships": relationships,
+            "summary": self._text(rng),
+        })
+
+    async def complete(self, prompt: str, on_text: Optional[Callable[[str], None]] = None) -> LLMCompletion:
+        response = self.respond(prompt)
+        delay = self.latency
+        if self.jitter:
+            delay += random.Random(prompt).random() * self.jitter
+        if on_text is None:
+            await asyncio.sleep(delay)
+        else:
+            # Spread the response over the delay, as a model generating tokens would
+            size = -(-len(response) // self.stream_pieces)
+            for start in range(0, len(response), size):
+                await asyncio.sleep(delay / self.stream_pieces)
+                on_text(response[start:start + size])
+        # Report usage at about four characters per token
+        return LLMCompletion(response, prompt_tokens=len(prompt) // 4, completion_tokens=len(response) // 4)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_llm_backend() -> LLMBackend:
+    """Return the process-wide backend selected by LLM_BACKEND ("openai" or "fake")."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if LLM_BACKEND == "fake":
+                _backend = FakeBackend()
+            elif LLM_BACKEND == "openai":
+                from app.agents.summary_extractor import MODEL_NAME, MODEL_PARAMS
+                _backend = OpenAIBackend(MODEL_NAME, MODEL_PARAMS)
+            else:
+                raise ValueError(f"Unknown LLM_BACKEND: {LLM_BACKEND}")
+        return _backend
@@ -1,16 +1,269 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.agents.extraction_parser import Entity, ExtractionParseError, StreamingExtractionParser, parse_extraction
+from app.agents.llm_backends import LLMBackend, get_llm_backend
+from app.models.extraction_result import ExtractionResult
+from app.models.relationship import Relationship
+
+PROMPT_PATH = "app/prompts/generate_summary.md"
+MODEL_NAME = "gpt-4o"
+MODEL_PARAMS = {"temperature": 0.7, "response_format": {"type": "json_object"}}
+
+# Extra attempts for a chunk whose call fails or whose response is unusable or cut off
+EXTRACTION_RETRIES = int(os.getenv("EXTRACTION_RETRIES", "2"))
+EXTRACTION_RETRY_BACKOFF = float(os.getenv("EXTRACTION_RETRY_BACKOFF", "1.0"))
+
+_prompts: Dict[str, Any] = {}
+_prompts_lock = threading.Lock()
+
+def load_prompt(path: str = PROMPT_PATH):
+    """
+    Return the compiled prompt template for a file, reading it from disk only once.
+
+    Args:
+        path: Prompt template file
+
+    Returns:
+        LangChain PromptTemplate
+    """
+    with _prompts_lock:
+        template = _prompts.get(path)
+        if template is None:
+            from langchain_core.prompts import PromptTemplate
+            template = PromptTemplate.from_file(path, encoding="utf-8")
+            _prompts[path] = template
+        return template
+
+def extraction_cache_key(chunk, backend: LLMBackend = None):
+    """Content hash of everything that determines the extraction output for a chunk."""
+    backend = backend or get_llm_backend()
+    template = load_prompt(PROMPT_PATH).template
+    fingerprint = json.dumps(backend.fingerprint(), sort_keys=True)
+    digest = hashlib.sha256()
+    for part in (chunk, template, fingerprint):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class ExtractionMetrics:
+    """Latency and token usage of extraction calls."""
+
+    def __init__(self, window: int = 1000):
+        """
+        Initialize empty metrics.
+
+        Args:
+            window: Number of recent calls kept for latency percentiles
+        """
+        self.calls = 0
+        self.failures = 0
+        self.invalid_responses = 0
+        self.truncated_responses = 0
+        self.retries = 0
+        self.skipped_chunks = 0
+        self.total_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        with self._lock:
+            self.calls += 1
+            self.total_seconds += seconds
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self._latencies.append(seconds)
+
+    def record_failure(self, seconds: float) -> None:
+        with self._lock:
+            self.failures += 1
+            self.total_seconds += seconds
+
+    def record_invalid(self) -> None:
+        with self._lock:
+            self.invalid_responses += 1
+
+    def record_truncated(self) -> None:
+        with self._lock:
+            self.truncated_responses += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def record_skipped(self) -> None:
+        with self._lock:
+            self.skipped_chunks += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "invalid_responses": self.invalid_responses,
+            "truncated_responses": self.truncated_responses,
+            "retries": self.retries,
+            "skipped_chunks": self.skipped_chunks,
+            "mean_seconds": round(self.total_seconds / max(1, self.calls + self.failures), 3),
+            "p50_seconds": percentile(0.5),
+            "p95_seconds": percentile(0.95),
+            "max_seconds": round(latencies[-1], 3) if latencies else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "completion_tokens_per_second": round(self.completion_tokens / self.total_seconds, 1) if self.total_seconds else 0.0,
+        }
+
+class ExtractorService:
+    """Extracts entities from chunks with one backend, prompt and set of metrics per process."""
+
+    def __init__(self, backend: LLMBackend = None, prompt_path: str = PROMPT_PATH):
+        """
+        Initialize the service.
+
+        Args:
+            backend: LLM backend (defaults to the one selected by LLM_BACKEND)
+            prompt_path: Extraction prompt template
+        """
+        self.backend = backend or get_llm_backend()
+        self.prompt_path = prompt_path
+        self.metrics = ExtractionMetrics()
+
+    def cache_key(self, chunk: str) -> str:
+        """Extraction cache key for a chunk under this service's backend."""
+        return extraction_cache_key(chunk, self.backend)
+
+    async def extract(self, chunk: str, on_text: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Extract characters, locations and relationships from a chunk.
+
+        Args:
+            chunk: Book text
+            on_text: Called with each piece of the response as it streams in
+
+        Returns:
+            The model's JSON response
+        """
+        prompt = load_prompt(self.prompt_path).format(book_text=chunk)
+        start = time.perf_counter()
+        try:
+            completion = await self.backend.complete(prompt, on_text=on_text)
+        except Exception:
+            self.metrics.record_failure(time.perf_counter() - start)
+            raise
+        self.metrics.record(time.perf_counter() - start, completion.prompt_tokens, completion.completion_tokens)
+        return completion.text
+
+    async def extract_validated(
+        self,
+        chunk: str,
+        on_entity: Optional[Callable[[str, Entity], None]] = None,
+        retries: int = EXTRACTION_RETRIES
+    ) -> Tuple[str, ExtractionResult]:
+        """
+        Extract a chunk and validate the response, retrying only this chunk on failure.
+
+        A failed call, an unusable response or a cut-off one is retried with
+        backoff. If every attempt is cut off, the most complete of them is
+        returned with complete=False rather than losing the chunk.
+
+        Args:
+            chunk: Book text
+            on_entity: Called with ("characters" | "locations" | "relationships", entity)
+                for each entity as soon as the streamed response contains it; an entity
+                repeated by a retry is reported once
+            retries: Extra attempts after the first
+
+        Returns:
+            (raw response, validated result)
+
+        Raises:
+            ExtractionParseError: If no attempt produced a usable response
+            Exception: The backend's error, if the last attempt's call failed
+        """
+        reported = set()
+
+        def report(key: str, entity: Entity) -> None:
+            if isinstance(entity, Relationship):
+                identity = (key, entity.type, entity.source, entity.target)
+            else:
+                identity = (key, entity.name)
+            if identity not in reported:
+                reported.add(identity)
+                on_entity(key, entity)
+
+        best: Optional[Tuple[str, ExtractionResult]] = None
+        for attempt in range(retries + 1):
+            if attempt:
+                self.metrics.record_retry()
+                await asyncio.sleep(EXTRACTION_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+            on_text = None
+            if on_entity is not None:
+                stream = StreamingExtractionParser()
+
+                def on_text(text: str, stream: StreamingExtractionParser = stream) -> None:
+                    for key, entity in stream.feed(text):
+                        report(key, entity)
+
+            try:
+                text = await self.extract(chunk, on_text=on_text)
+            except Exception:
+                if attempt == retries:
+                    if best is not None:
+                        return best
+                    raise
+                continue
+
+            try:
+                result = parse_extraction(text)
+            except ExtractionParseError:
+                self.metrics.record_invalid()
+                if attempt == retries and best is None:
+                    raise
+                continue
+
+            if result.complete:
+                return text, result
+            self.metrics.record_truncated()
+            if best is None or _entity_count(result) > _entity_count(best[1]):
+                best = (text, result)
+
+        return best
+
+    async def aclose(self) -> None:
+        await self.backend.aclose()
+
+def _entity_count(result: ExtractionResult) -> int:
+    return len(result.characters) + len(result.locations) + len(result.relationships)
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_extractor_service() -> ExtractorService:
+    """Return the process-wide extractor service, so clients and prompts are built once."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ExtractorService()
+        return _service
 
 class SummaryExtractor:
-    def __init__(self, chunk):
+    def __init__(self, chunk, backend: LLMBackend = None):
         self.chunk = chunk
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
-        self.llm = self.llm.bind(response_format={"type": "json_object"})
+        # A custom backend gets its own service; otherwise share the process-wide one
+        self.service = ExtractorService(backend) if backend else get_extractor_service()
 
     async def run(self):
-        prompt_template = PromptTemplate.from_file("app/prompts/generate_summary.md")
-        prompt = prompt_template.format(
-            book_text=self.chunk,
-        )
-        response = await self.llm.ainvoke(prompt)
-        return response.content
\ No newline at end of file
+        return await self.service.extract(self.chunk)
@@ -0,0 +1,28 @@
+from typing import Optional
+from fastapi import Form, HTTPException, Request
+from app.services.neo4j.connection import Neo4jConnection
+from app.pipeline.book_jobs import JobManager
+from app.pipeline.processing_window import ProcessingWindow
+
+def get_neo4j_connection(request: Request) -> Neo4jConnection:
+    """Provide the application-scoped Neo4j connection created at startup."""
+    return request.app.state.neo4j
+
+
+def get_job_manager(request: Request) -> JobManager:
+    """Provide the application-scoped job manager created at startup."""
+    return request.app.state.jobs
+
+
+def get_processing_window(
+    start_chunk: int = Form(0),
+    end_chunk: Optional[int] = Form(None),
+    max_chunks: Optional[int] = Form(None),
+    stride: int = Form(1),
+    dry_run: bool = Form(False)
+) -> ProcessingWindow:
+    """Build the processing window from the request's form fields."""
+    try:
+        return ProcessingWindow(start_chunk=start_chunk, end_chunk=end_chunk, max_chunks=max_chunks, stride=stride, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
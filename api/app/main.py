@@ -1,12 +1,23 @@
-from fastapi import FastAPI, File, UploadFile
+import time
+STARTED_AT = time.perf_counter()
+
+import asyncio
+from typing import Optional
+from fastapi import Depends, FastAPI, File, Header, HTTPException, UploadFile
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.pipeline.read_a_book import process_book
+from app.pipeline.book_jobs import JobManager
 from dotenv import load_dotenv
 import os
-from pathlib import Path
 import logging
-from app.utils.file_utils import extract_file_content
+from app.utils.file_utils import extract_file_content, receive_upload, shutdown_parse_pool
+from app.services.neo4j.connection import Neo4jConnection
+from app.dependencies import get_job_manager, get_neo4j_connection, get_processing_window
+from app.pipeline.processing_window import ProcessingWindow, estimate_processing
+from app.pipeline.chunk_uploader import close_chunk_store
+from app.services.jobs.job_store import JobStore
+from app.services.neo4j.embedding_service import get_embedding_service
+from app.agents.summary_extractor import get_extractor_service, load_prompt
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -20,9 +31,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
 @app.on_event("startup")
 async def startup_event():
     logger.info("Application is starting...")
@@ -31,12 +39,117 @@ async def startup_event():
     openai_key = os.getenv('OPENAI_API_KEY')
     os.environ["OPENAI_API_KEY"] = openai_key
     
-    for file in UPLOAD_DIR.glob("*"):
-        file.unlink()
+    # One driver and connection pool for the whole process
+    app.state.neo4j = Neo4jConnection.from_env()
+    
+    # Book processing runs as background jobs; interrupted ones resume from their last checkpoint
+    app.state.jobs = JobManager(JobStore(), app.state.neo4j)
+    await app.state.jobs.start()
+    
+    # Optionally pay model loading costs now instead of on the first upload
+    app.state.warm_up_seconds = None
+    if os.getenv("WARM_UP_MODELS", "false").lower() in ("1", "true", "yes"):
+        warm_up_start = time.perf_counter()
+        await asyncio.to_thread(warm_up)
+        app.state.warm_up_seconds = time.perf_counter() - warm_up_start
+    
+    app.state.startup_seconds = time.perf_counter() - STARTED_AT
+    app.state.startup_budget_seconds = float(os.getenv("STARTUP_BUDGET_SECONDS", "10"))
+    if app.state.startup_seconds > app.state.startup_budget_seconds:
+        logger.warning(f"Startup took {app.state.startup_seconds:.2f}s, over the {app.state.startup_budget_seconds:.2f}s budget")
     
-    logger.info("Startup tasks completed")
+    logger.info(f"Startup tasks completed in {app.state.startup_seconds:.2f}s")
+
+def warm_up():
+    """Load the embedding model, LLM client libraries and extraction prompt ahead of the first request."""
+    get_embedding_service().load()
+    import langchain_openai  # noqa: F401
+    load_prompt()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await app.state.jobs.stop()
+    app.state.jobs.store.close()
+    await app.state.neo4j.aclose()
+    await get_extractor_service().aclose()
+    close_chunk_store()
+    shutdown_parse_pool()
+
+@app.get("/health")
+async def health(neo4j: Neo4jConnection = Depends(get_neo4j_connection)):
+    return {
+        "status": "ok",
+        "startup_seconds": round(app.state.startup_seconds, 3),
+        "startup_budget_seconds": app.state.startup_budget_seconds,
+        "within_startup_budget": app.state.startup_seconds <= app.state.startup_budget_seconds,
+        "warm_up_seconds": None if app.state.warm_up_seconds is None else round(app.state.warm_up_seconds, 3),
+        "embedding_model_loaded": get_embedding_service().loaded,
+        "neo4j_database": neo4j.db_name,
+    }
+
+@app.get("/metrics/extraction")
+async def extraction_metrics():
+    return get_extractor_service().metrics.to_dict()
 
 @app.post("/read_a_book")
-async def read_a_book(file: UploadFile = File(...)):
+async def read_a_book(
+    file: UploadFile = File(...),
+    window: ProcessingWindow = Depends(get_processing_window),
+    jobs: JobManager = Depends(get_job_manager)
+):
+    # Submit a job and follow it; the work carries on if the client disconnects
+    data = await receive_upload(file)
+    job_id = await jobs.submit(file.filename, data, window)
+    
+    async def follow():
+        async for _, message in jobs.events(job_id):
+            yield message
+    
+    return StreamingResponse(follow(), media_type="text/event-stream")
+
+@app.post("/jobs")
+async def submit_job(
+    file: UploadFile = File(...),
+    window: ProcessingWindow = Depends(get_processing_window),
+    jobs: JobManager = Depends(get_job_manager)
+):
+    data = await receive_upload(file)
+    job_id = await jobs.submit(file.filename, data, window)
+    return {"job_id": job_id}
+
+@app.post("/estimate")
+async def estimate(file: UploadFile = File(...), window: ProcessingWindow = Depends(get_processing_window)):
+    # Parse and chunk the book to report its cost before committing to a run
     result = await extract_file_content(file)
-    return StreamingResponse(process_book(result), media_type="text/event-stream")
+    estimate = await estimate_processing(result, window)
+    return estimate.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, jobs: JobManager = Depends(get_job_manager)):
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    after: int = 0,
+    last_event_id: Optional[str] = Header(None),
+    jobs: JobManager = Depends(get_job_manager)
+):
+    if jobs.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Reconnecting EventSource clients send the id of the last event they received
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+    
+    async def stream():
+        async for seq, message in jobs.events(job_id, after):
+            data = "".join(f"data: {line}\n" for line in message.split("\n"))
+            yield f"id: {seq}\n{data}\n"
+        job = jobs.get_job(job_id)
+        yield f"event: end\ndata: {job.status}\n\n"
+    
+    return StreamingResponse(stream(), media_type="text/event-stream")
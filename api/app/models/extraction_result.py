@@ -0,0 +1,30 @@
+from typing import List, Optional
+from app.models.character import Character
+from app.models.location import Location
+from app.models.relationship import Relationship
+
+class ExtractionResult:
+    """Validated entities extracted from one chunk."""
+
+    def __init__(
+        self,
+        characters: Optional[List[Character]] = None,
+        locations: Optional[List[Location]] = None,
+        relationships: Optional[List[Relationship]] = None,
+        themes: Optional[List[str]] = None,
+        summary: str = "",
+        complete: bool = True,
+        dropped: int = 0,
+        error: Optional[str] = None
+    ):
+        self.characters = characters or []
+        self.locations = locations or []
+        self.relationships = relationships or []
+        self.themes = themes or []
+        self.summary = summary
+        # False when the response was cut off and only its complete part was kept
+        self.complete = complete
+        # Entities that were present but failed validation
+        self.dropped = dropped
+        # Set, with no entities, when no usable response was obtained for the chunk
+        self.error = error
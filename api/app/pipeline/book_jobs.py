@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+from app.pipeline.read_a_book import process_book
+from app.pipeline.processing_window import ProcessingWindow
+from app.services.jobs.job_store import JobStore, JobRecord, QUEUED, RUNNING, COMPLETED, FAILED
+from app.services.neo4j.connection import Neo4jConnection
+from app.utils.file_utils import open_book
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+
+class JobManager:
+    """Runs book processing jobs on a pool of workers and publishes their progress."""
+
+    def __init__(self, store: JobStore, connection: Neo4jConnection, workers: int = JOB_WORKERS):
+        """
+        Initialize the manager; call start() to begin processing.
+
+        Args:
+            store: Persistent record of jobs, checkpoints and events
+            connection: Shared Neo4j connection the jobs write to
+            workers: Number of books processed at the same time
+        """
+        self.store = store
+        self.connection = connection
+        self.workers = max(1, workers)
+        self._queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._changed = asyncio.Condition()
+
+    async def start(self) -> None:
+        """Start the workers, re-queueing jobs that were pending or interrupted by a crash."""
+        for job_id in self.store.unfinished_jobs():
+            job = self.store.get_job(job_id)
+            if job.status == RUNNING:
+                self.store.set_status(job_id, QUEUED)
+                await self._publish(job_id, f"Job interrupted; re-queued after {job.committed_chunks} committed chunks")
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers; running jobs stay marked as running and resume on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, filename: str, document: bytes, window: Optional[ProcessingWindow] = None) -> str:
+        """
+        Queue a book for processing.
+
+        Args:
+            filename: Original file name; its extension picks the parser
+            document: Raw file contents
+            window: Chunks to process (defaults to the whole book)
+
+        Returns:
+            Id of the new job
+        """
+        job_id = self.store.create_job(filename, document, options=(window or ProcessingWindow()).to_dict())
+        await self._publish(job_id, f"Job {job_id} queued")
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[JobRecord]:
+        return self.store.get_job(job_id)
+
+    async def events(self, job_id: str, after: int = 0) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Replay a job's events and follow new ones until the job finishes.
+
+        Args:
+            job_id: Job to follow
+            after: Sequence number of the last event the client already has
+
+        Yields:
+            (sequence number, message) pairs
+        """
+        while True:
+            async with self._changed:
+                events = await asyncio.to_thread(self.store.events_after, job_id, after)
+                if not events:
+                    job = await asyncio.to_thread(self.store.get_job, job_id)
+                    if job is None or job.finished:
+                        return
+                    await self._changed.wait()
+                    continue
+            for seq, message in events:
+                yield seq, message
+                after = seq
+
+    async def _publish(self, job_id: str, message: str) -> None:
+        # The insert and commit block on SQLite, so they run off the event loop
+        await asyncio.to_thread(self.store.append_event, job_id, message)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = self.store.get_job(job_id)
+        if job is None or job.finished:
+            return
+        self.store.set_status(job_id, RUNNING)
+        await self._publish(job_id, f"Processing {job.filename}")
+
+        try:
+            result = await open_book(job.filename, self.store.load_document(job_id))
+            updates = process_book(
+                result,
+                self.connection,
+                window=ProcessingWindow.from_dict(job.options),
+                resume_from=job.committed_chunks,
+                checkpoint=lambda committed: self.store.checkpoint(job_id, committed)
+            )
+            async for update in updates:
+                await self._publish(job_id, update)
+        except asyncio.CancelledError:
+            # Shutting down: leave the job running so it resumes from its last checkpoint
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+            self.store.set_status(job_id, FAILED, error=str(e))
+            await self._publish(job_id, f"Job failed: {str(e)}")
+            return
+
+        self.store.set_status(job_id, COMPLETED)
+        await self._publish(job_id, "Job completed")
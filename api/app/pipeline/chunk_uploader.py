@@ -0,0 +1,158 @@
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set
+from app.services.vector.vector_store import VECTOR_STORE_UPSERT_BATCH_SIZE, VECTOR_STORE_UPSERT_CONCURRENCY, VectorStore
+
+# Where chunk text and summaries go: "local" (on-disk store under VECTOR_STORE_DIR, the
+# default), "pinecone", "memory" or "none" to not store chunks at all
+CHUNK_STORE = os.getenv("CHUNK_STORE", "local")
+# Batches waiting for a free request slot before put() blocks the pipeline
+CHUNK_STORE_MAX_PENDING_BATCHES = int(os.getenv("CHUNK_STORE_MAX_PENDING_BATCHES", "8"))
+
+class ChunkUploader:
+    """
+    Buffers chunk records and upserts them in concurrent batches behind the pipeline.
+
+    put() returns as soon as a record is buffered, so graph writes carry on
+    while earlier batches are embedded and upserted. When too many batches are
+    waiting, put() blocks until one finishes, bounding memory if the store
+    falls behind.
+    """
+
+    def __init__(
+        self,
+        adapter: VectorStore,
+        batch_size: int = VECTOR_STORE_UPSERT_BATCH_SIZE,
+        concurrency: int = VECTOR_STORE_UPSERT_CONCURRENCY,
+        max_pending_batches: int = CHUNK_STORE_MAX_PENDING_BATCHES
+    ):
+        """
+        Initialize the uploader.
+
+        Args:
+            adapter: Store the records are upserted into
+            batch_size: Records per upsert request
+            concurrency: Upsert requests in flight at once
+            max_pending_batches: Batches started or waiting before put() blocks
+        """
+        self.adapter = adapter
+        self.batch_size = max(1, batch_size)
+        self.uploaded = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._requests = asyncio.Semaphore(max(1, concurrency))
+        self._pending = asyncio.Semaphore(max(1, max_pending_batches))
+        self._tasks: Set[asyncio.Task] = set()
+        self._error: Optional[BaseException] = None
+
+    async def _upload(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            async with self._requests:
+                count = await asyncio.to_thread(self.adapter.upsert_batch, batch)
+            self.uploaded += count
+        except Exception as e:
+            self._error = self._error or e
+        finally:
+            self._pending.release()
+
+    async def _submit(self) -> None:
+        batch, self._buffer = self._buffer, []
+        # Back-pressure: wait for a slot before buffering more work
+        await self._pending.acquire()
+        task = asyncio.create_task(self._upload(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    async def put(self, record: Dict[str, Any]) -> None:
+        """
+        Queue a record for upserting.
+
+        Args:
+            record: Dictionary with "id", "text" and optional "metadata"
+
+        Raises:
+            Exception: The error of an earlier failed batch
+        """
+        self._raise_error()
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            await self._submit()
+
+    async def flush(self) -> int:
+        """
+        Upsert whatever is buffered and wait for every batch to finish.
+
+        Returns:
+            Total number of records upserted so far
+
+        Raises:
+            Exception: The error of a failed batch
+        """
+        if self._buffer:
+            await self._submit()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+        self._raise_error()
+        return self.uploaded
+
+def chunk_record(book: str, filename: str, index: int, chunk: str, summary: str = "") -> Dict[str, Any]:
+    """
+    Build the chunk store record for one chunk of a book.
+
+    Ids are derived from the book's contents and the chunk index, so
+    re-processing a book overwrites its records instead of duplicating them,
+    while a different book uploaded under the same name gets its own.
+
+    Args:
+        book: The book's id (a hash of its contents, as set by open_book)
+        filename: Name of the book's file
+        index: Position of the chunk in the book
+        chunk: Chunk text
+        summary: Extracted summary of the chunk
+
+    Returns:
+        Record with "id", "text" and "metadata"
+    """
+    return {
+        "id": f"{book}-{index}",
+        "text": chunk,
+        "metadata": {"book": filename, "book_id": book, "chunk": index, "summary": summary},
+    }
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_chunk_store() -> Optional[VectorStore]:
+    """Return the process-wide chunk store selected by CHUNK_STORE, or None when disabled."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if CHUNK_STORE == "none":
+                return None
+            if CHUNK_STORE == "pinecone":
+                from app.services.pinecone.pinecone_adapter import PineconeAdapter
+                store = PineconeAdapter()
+            elif CHUNK_STORE == "local":
+                from app.services.vector.local_store import LocalVectorStore
+                store = LocalVectorStore()
+            elif CHUNK_STORE == "memory":
+                from app.services.pinecone.memory_adapter import InMemoryPineconeAdapter
+                store = InMemoryPineconeAdapter()
+            else:
+                raise ValueError(f"Unknown CHUNK_STORE: {CHUNK_STORE}")
+            store.create_index()
+            _store = store
+        return _store
+
+def close_chunk_store() -> None:
+    """Close the process-wide chunk store, if one was opened."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
@@ -0,0 +1,207 @@
+import os
+from typing import Callable, Dict, List, Optional, Set, TypeVar
+import numpy as np
+from app.models.character import Character
+from app.models.extraction_result import ExtractionResult
+from app.models.location import Location
+from app.services.neo4j.character_service import CharacterService
+from app.services.neo4j.location_service import LocationService
+from app.services.vector.vector_index import normalize
+
+# "online" resolves each chunk against the graph as it is extracted; "batch" extracts the
+# whole book first, clusters every mention at once and writes the result in one transaction
+ENTITY_CONSOLIDATION = os.getenv("ENTITY_CONSOLIDATION", "online").lower()
+
+# Nearest mentions each mention may be merged with, and rows scored per matrix product
+ENTITY_CLUSTER_NEIGHBOURS = int(os.getenv("ENTITY_CLUSTER_NEIGHBOURS", "10"))
+ENTITY_CLUSTER_BLOCK_SIZE = 1024
+
+Entity = TypeVar("Entity", Character, Location)
+
+class UnionFind:
+    """Disjoint sets over 0..size-1; each set is represented by its smallest member."""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            # Path halving keeps the trees flat
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    def groups(self) -> List[List[int]]:
+        """Members of every set in ascending order, sets ordered by their smallest member."""
+        groups: Dict[int, List[int]] = {}
+        for item in range(len(self.parent)):
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+def character_has_data(character: Character) -> bool:
+    """Whether a character carries enough beyond its name for embedding comparison to mean anything."""
+    return bool(character.physical_desc or character.psychological_desc or character.arc or character.alt_names)
+
+def location_has_data(location: Location) -> bool:
+    """Whether a location carries enough beyond its name for embedding comparison to mean anything."""
+    return bool(location.description or location.significance or location.alt_names)
+
+def cluster_mentions(
+    names: List[List[str]],
+    embeddings: List[Optional[np.ndarray]],
+    threshold: float,
+    neighbours: int = ENTITY_CLUSTER_NEIGHBOURS,
+    comparable: Optional[List[bool]] = None
+) -> List[List[int]]:
+    """
+    Group mentions of the same entity with union-find.
+
+    Mentions are joined by name first, as exact matching does online: a
+    mention joins the others with the same name, or else the one entity whose
+    aliases include its name (a name listed by several entities, such as a
+    shared first name, is ambiguous and left to embeddings). Then mentions
+    are joined with those of their nearest neighbours whose cosine similarity
+    reaches the threshold, most similar pairs first; neighbours come from one
+    matrix product per block of rows. Two entities only merge if their first
+    mentions are similar enough as well, as when a mention is matched against
+    the stored node online, so chains of loosely similar mentions don't
+    collapse into one entity.
+
+    Args:
+        names: Name of each mention followed by its aliases
+        embeddings: Embedding of each mention; None leaves it to name matching
+        threshold: Lowest cosine similarity that joins two mentions
+        neighbours: Nearest mentions considered for each mention
+        comparable: Which mentions take part in embedding matching (defaults to all)
+
+    Returns:
+        Mention indexes per entity, each in ascending order, entities ordered by first mention
+    """
+    sets = UnionFind(len(names))
+
+    # As online: a mention joins others of the same name, or else the one entity
+    # listing its name as an alias; a name several entities use is left to embeddings
+    first_named: Dict[str, int] = {}
+    for mention, mention_names in enumerate(names):
+        sets.union(mention, first_named.setdefault(mention_names[0], mention))
+    aliased: Dict[str, Set[str]] = {}
+    for mention_names in names:
+        for alias in mention_names[1:]:
+            if alias != mention_names[0]:
+                aliased.setdefault(alias, set()).add(mention_names[0])
+    for mention, mention_names in enumerate(names):
+        owners = aliased.get(mention_names[0], ())
+        if mention_names[0] not in owners and len(owners) == 1:
+            sets.union(mention, first_named[next(iter(owners))])
+
+    rows = [
+        mention for mention, embedding in enumerate(embeddings)
+        if embedding is not None and (comparable is None or comparable[mention])
+    ]
+    if len(rows) > 1 and neighbours > 0:
+        matrix = normalize(np.stack([np.asarray(embeddings[mention], dtype=np.float32).reshape(-1) for mention in rows]))
+        
+        # Candidate pairs from each row's nearest neighbours; every row's best match is itself, so ask for one more
+        k = min(neighbours + 1, len(rows))
+        pairs = []
+        for start in range(0, len(rows), ENTITY_CLUSTER_BLOCK_SIZE):
+            scores = matrix[start:start + ENTITY_CLUSTER_BLOCK_SIZE] @ matrix.T
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            for offset, column in zip(*np.nonzero(top_scores >= threshold)):
+                if start + offset != top[offset, column]:
+                    pairs.append((float(top_scores[offset, column]), start + offset, int(top[offset, column])))
+        
+        # Each entity is represented by its first comparable mention, the embedding the
+        # graph would hold for it online; two entities merge only if those are similar too
+        representative: Dict[int, int] = {}
+        for row, mention in enumerate(rows):
+            representative.setdefault(sets.find(mention), row)
+        for _, row_a, row_b in sorted(pairs, reverse=True):
+            root_a, root_b = sets.find(rows[row_a]), sets.find(rows[row_b])
+            if root_a == root_b:
+                continue
+            rep_a, rep_b = representative[root_a], representative[root_b]
+            if float(matrix[rep_a] @ matrix[rep_b]) < threshold:
+                continue
+            sets.union(root_a, root_b)
+            representative[sets.find(root_a)] = min(rep_a, rep_b)
+
+    return sets.groups()
+
+def merge_clusters(entities: List[Entity], clusters: List[List[int]], merge: Callable[[Entity, Entity], Entity]) -> List[Entity]:
+    """
+    Fold each cluster's mentions into one entity named after its first mention.
+
+    Args:
+        entities: Every mention
+        clusters: Mention indexes per entity, as returned by cluster_mentions
+        merge: Consolidation rule taking (new, existing), e.g. CharacterService.merge_character_data
+
+    Returns:
+        One entity per cluster, whose aliases include every name its mentions used
+    """
+    merged = []
+    for cluster in clusters:
+        entity = entities[cluster[0]].model_copy(deep=True)
+        if entity.alt_names is None:
+            entity.alt_names = [entity.name]
+        elif entity.name not in entity.alt_names:
+            entity.alt_names.append(entity.name)
+        for mention in cluster[1:]:
+            entity = merge(entities[mention], entity)
+        merged.append(entity)
+    return merged
+
+def consolidate_extractions(
+    extractions: List[ExtractionResult],
+    character_service: CharacterService,
+    location_service: LocationService,
+    neighbours: int = ENTITY_CLUSTER_NEIGHBOURS
+) -> ExtractionResult:
+    """
+    Consolidate a whole book's extractions offline, independent of chunk order.
+
+    Every mention is embedded in one batch per entity kind and clustered with
+    cluster_mentions at the services' similarity thresholds; clusters are
+    merged with the services' consolidation rules. Relationships keep their
+    raw endpoint names, which all appear among the merged entities' aliases.
+
+    Args:
+        extractions: Extractions of every chunk, in reading order
+        character_service: CharacterService used for embeddings and merge rules
+        location_service: LocationService used for embeddings and merge rules
+        neighbours: Nearest mentions considered for each mention
+
+    Returns:
+        A single extraction holding one entity per cluster and every relationship
+    """
+    characters = [character for extraction in extractions for character in extraction.characters]
+    locations = [location for extraction in extractions for location in extraction.locations]
+
+    character_clusters = cluster_mentions(
+        [[character.name] + list(character.alt_names or []) for character in characters],
+        character_service.generate_character_embeddings(characters),
+        character_service.similarity_threshold,
+        neighbours=neighbours,
+        comparable=[character_has_data(character) for character in characters],
+    )
+    location_clusters = cluster_mentions(
+        [[location.name] + list(location.alt_names or []) for location in locations],
+        location_service.generate_location_embeddings(locations),
+        location_service.similarity_threshold,
+        neighbours=neighbours,
+        comparable=[location_has_data(location) for location in locations],
+    )
+
+    return ExtractionResult(
+        characters=merge_clusters(characters, character_clusters, character_service.merge_character_data),
+        locations=merge_clusters(locations, location_clusters, location_service.merge_location_data),
+        relationships=[relationship for extraction in extractions for relationship in extraction.relationships],
+        themes=list(dict.fromkeys(theme for extraction in extractions for theme in extraction.themes)),
+    )
@@ -0,0 +1,286 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, AsyncIterable, Awaitable, Callable, Iterable, Optional, Union
+
+EXTRACTION_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY", "4"))
+EXTRACTION_REQUESTS_PER_MINUTE = int(os.getenv("EXTRACTION_REQUESTS_PER_MINUTE", "0")) or None
+EXTRACTION_TOKENS_PER_MINUTE = int(os.getenv("EXTRACTION_TOKENS_PER_MINUTE", "0")) or None
+# Chunks read from the stream but not yet handed back; bounds memory on large books
+EXTRACTION_MAX_PENDING = int(os.getenv("EXTRACTION_MAX_PENDING", "16"))
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens in a piece of text.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated token count (about four characters per token)
+    """
+    return max(1, len(text) // 4)
+
+class ChunkProgress:
+    """Snapshot of how many chunks are waiting, running and finished."""
+
+    def __init__(self, in_flight: int, completed: int, queued: int, cache_hits: int = 0, cache_misses: int = 0):
+        self.in_flight = in_flight
+        self.completed = completed
+        self.queued = queued
+        self.cache_hits = cache_hits
+        self.cache_misses = cache_misses
+
+class ChunkResult:
+    """Extraction output for a single chunk, delivered in chunk order."""
+
+    def __init__(self, index: int, chunk: str, result: Any):
+        self.index = index
+        self.chunk = chunk
+        self.result = result
+
+class ChunkUpdate:
+    """Partial output reported by a chunk's extraction while it is still running."""
+
+    def __init__(self, index: int, payload: Any):
+        self.index = index
+        self.payload = payload
+
+class RateLimiter:
+    """Sliding-window limiter on requests and tokens per minute."""
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None, period: float = 60.0):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Maximum number of calls per period (None for unlimited)
+            tokens_per_minute: Maximum number of tokens per period (None for unlimited)
+            period: Length of the sliding window in seconds
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.period = period
+        self._window = deque()  # (timestamp, tokens)
+        self._window_tokens = 0
+        self._lock = asyncio.Lock()
+
+    def _expire(self, now: float) -> None:
+        while self._window and now - self._window[0][0] >= self.period:
+            _, tokens = self._window.popleft()
+            self._window_tokens -= tokens
+
+    def _fits(self, tokens: int) -> bool:
+        # An empty window always admits a call, even one larger than the token budget
+        if not self._window:
+            return True
+        if self.requests_per_minute and len(self._window) >= self.requests_per_minute:
+            return False
+        if self.tokens_per_minute and self._window_tokens + tokens > self.tokens_per_minute:
+            return False
+        return True
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """
+        Wait until a call costing the given number of tokens fits in the budget.
+
+        Args:
+            tokens: Estimated token cost of the call
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                if self._fits(tokens):
+                    self._window.append((now, tokens))
+                    self._window_tokens += tokens
+                    return
+                await asyncio.sleep(self.period - (now - self._window[0][0]))
+
+class ExtractionScheduler:
+    """Runs chunk extractions concurrently and hands results back in chunk order."""
+
+    def __init__(
+        self,
+        extract_fn: Callable[[str], Awaitable[Any]],
+        cached_fn: Optional[Callable[[str], Optional[Any]]] = None,
+        max_concurrency: int = EXTRACTION_CONCURRENCY,
+        requests_per_minute: Optional[int] = EXTRACTION_REQUESTS_PER_MINUTE,
+        tokens_per_minute: Optional[int] = EXTRACTION_TOKENS_PER_MINUTE,
+        updates: bool = False,
+        max_pending: int = EXTRACTION_MAX_PENDING
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            extract_fn: Coroutine function that extracts a single chunk
+            cached_fn: Optional function returning a previously stored result for a
+                chunk (or None), run in a worker thread; hits skip the concurrency
+                and rate limits entirely
+            max_concurrency: Maximum number of extractions running at once
+            requests_per_minute: Optional cap on LLM calls per minute
+            tokens_per_minute: Optional cap on estimated prompt tokens per minute
+            updates: Also pass extract_fn a callback that reports partial output,
+                which run() yields as ChunkUpdates as soon as it is reported
+            max_pending: Maximum number of chunks read from the stream and not yet
+                yielded as results (at least max_concurrency); the stream is only
+                read further once earlier results have been consumed
+        """
+        self.extract_fn = extract_fn
+        self.cached_fn = cached_fn
+        self.updates = updates
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pending = max(self.max_concurrency, max_pending)
+        self.rate_limiter = None
+        if requests_per_minute or tokens_per_minute:
+            self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self._in_flight = 0
+        self._completed = 0
+        self._produced = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    def _progress(self) -> ChunkProgress:
+        return ChunkProgress(
+            in_flight=self._in_flight,
+            completed=self._completed,
+            queued=self._produced - self._in_flight - self._completed,
+            cache_hits=self._cache_hits,
+            cache_misses=self._cache_misses
+        )
+
+    async def _extract(self, index: int, chunk: str, semaphore: asyncio.Semaphore, done: asyncio.Queue) -> None:
+        if self.cached_fn:
+            # Cache lookups read (and may parse) files, so they run off the event loop
+            cached = await asyncio.to_thread(self.cached_fn, chunk)
+            if cached is not None:
+                self._cache_hits += 1
+                self._completed += 1
+                await done.put((index, cached))
+                return
+            self._cache_misses += 1
+
+        async with semaphore:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(estimate_tokens(chunk))
+            self._in_flight += 1
+            try:
+                if self.updates:
+                    outcome = await self.extract_fn(chunk, lambda payload: done.put_nowait((index, ChunkUpdate(index, payload))))
+                else:
+                    outcome = await self.extract_fn(chunk)
+            except Exception as e:
+                outcome = e
+            finally:
+                self._in_flight -= 1
+                self._completed += 1
+        await done.put((index, outcome))
+
+    async def _feed(self, chunks: Union[Iterable[str], AsyncIterable[str]], texts: dict, tasks: set, semaphore: asyncio.Semaphore, window: asyncio.Semaphore, done: asyncio.Queue) -> None:
+        try:
+            # Each chunk takes a place in the window before it is read, and gives it
+            # back once its result has been yielded
+            if hasattr(chunks, "__aiter__"):
+                iterator = chunks.__aiter__()
+                while True:
+                    await window.acquire()
+                    try:
+                        chunk = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    self._start(chunk, texts, tasks, semaphore, done)
+            else:
+                # Pull from synchronous producers (parsers, chunkers) off the event loop
+                iterator = iter(chunks)
+                exhausted = object()
+                while True:
+                    await window.acquire()
+                    chunk = await asyncio.to_thread(next, iterator, exhausted)
+                    if chunk is exhausted:
+                        break
+                    self._start(chunk, texts, tasks, semaphore, done)
+        except Exception as e:
+            await done.put((None, e))
+        else:
+            await done.put((None, None))
+
+    def _start(self, chunk: str, texts: dict, tasks: set, semaphore: asyncio.Semaphore, done: asyncio.Queue) -> None:
+        index = self._produced
+        self._produced += 1
+        texts[index] = chunk
+        task = asyncio.create_task(self._extract(index, chunk, semaphore, done))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def run(self, chunks: Union[Iterable[str], AsyncIterable[str]]) -> AsyncGenerator[Union[ChunkProgress, ChunkUpdate, ChunkResult], None]:
+        """
+        Extract all chunks, yielding progress snapshots and in-order results.
+
+        Chunks may come from a list or from a (sync or async) stream whose length
+        is not known up front; extraction of each chunk starts as soon as it is
+        produced, while later chunks are still being parsed. At most max_pending
+        chunks are read ahead of the results consumed so far. A ChunkProgress is
+        yielded every time an extraction finishes. ChunkResults are only yielded
+        once every earlier chunk has been yielded, so callers can commit them to
+        the graph deterministically. If an extraction (or the chunk stream)
+        raises, the exception is re-raised when that chunk's turn comes. With
+        updates enabled, ChunkUpdates are yielded the moment they are reported,
+        in whatever order the chunks produce them.
+
+        Args:
+            chunks: Text chunks to extract
+
+        Yields:
+            ChunkProgress, ChunkUpdate and ChunkResult objects
+        """
+        self._in_flight = 0
+        self._completed = 0
+        self._produced = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        window = asyncio.Semaphore(self.max_pending)
+        done = asyncio.Queue()
+        texts = {}
+        tasks = set()
+        feeder = asyncio.create_task(self._feed(chunks, texts, tasks, semaphore, window, done))
+
+        try:
+            # Let the first batch start before reporting
+            await asyncio.sleep(0)
+            yield self._progress()
+
+            finished = {}
+            next_index = 0
+            feeding = True
+            stream_error = None
+            while feeding or next_index < self._produced:
+                index, outcome = await done.get()
+                if index is None:
+                    # The chunk stream ended; an error surfaces after the chunks it did produce
+                    feeding = False
+                    stream_error = outcome
+                    continue
+                if isinstance(outcome, ChunkUpdate):
+                    yield outcome
+                    continue
+                finished[index] = outcome
+                yield self._progress()
+
+                # Release every result that is now contiguous with what was already yielded
+                while next_index in finished:
+                    outcome = finished.pop(next_index)
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                    yield ChunkResult(index=next_index, chunk=texts.pop(next_index), result=outcome)
+                    next_index += 1
+                    window.release()
+
+            if stream_error is not None:
+                raise stream_error
+        finally:
+            feeder.cancel()
+            for task in list(tasks):
+                task.cancel()
@@ -0,0 +1,186 @@
+import math
+import os
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+from app.agents.summary_extractor import PROMPT_PATH, extraction_cache_key, load_prompt
+from app.pipeline.extraction_scheduler import EXTRACTION_CONCURRENCY, EXTRACTION_REQUESTS_PER_MINUTE, EXTRACTION_TOKENS_PER_MINUTE
+from app.services.cache.extraction_cache import get_extraction_cache
+from app.utils.chunker import achunk_blocks, get_token_counter
+
+# Latency model for the estimator; tune to the model and account in use
+ESTIMATED_OUTPUT_TOKENS_PER_CHUNK = int(os.getenv("ESTIMATED_OUTPUT_TOKENS_PER_CHUNK", "800"))
+ESTIMATED_OUTPUT_TOKENS_PER_SECOND = float(os.getenv("ESTIMATED_OUTPUT_TOKENS_PER_SECOND", "60"))
+ESTIMATED_CALL_OVERHEAD_SECONDS = float(os.getenv("ESTIMATED_CALL_OVERHEAD_SECONDS", "1.5"))
+
+class ProcessingWindow:
+    """Which chunks of a book to process, and whether to write the results to the graph."""
+
+    def __init__(self, start_chunk: int = 0, end_chunk: Optional[int] = None, max_chunks: Optional[int] = None, stride: int = 1, dry_run: bool = False):
+        """
+        Initialize the window.
+
+        Args:
+            start_chunk: Index of the first chunk to process
+            end_chunk: Index one past the last chunk to process (None for the end of the book)
+            max_chunks: Maximum number of chunks to process (None for no limit)
+            stride: Process every stride-th chunk from start_chunk, to sample a book cheaply
+            dry_run: Extract chunks without writing anything to the graph
+        """
+        if start_chunk < 0 or (end_chunk is not None and end_chunk < 0) or (max_chunks is not None and max_chunks < 0):
+            raise ValueError("Chunk indexes and limits must not be negative")
+        if stride < 1:
+            raise ValueError("Stride must be at least 1")
+        self.start_chunk = start_chunk
+        self.end_chunk = end_chunk
+        self.max_chunks = max_chunks
+        self.stride = stride
+        self.dry_run = dry_run
+
+    @classmethod
+    def from_dict(cls, options: Optional[Dict[str, Any]]) -> "ProcessingWindow":
+        return cls(**(options or {}))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "start_chunk": self.start_chunk,
+            "end_chunk": self.end_chunk,
+            "max_chunks": self.max_chunks,
+            "stride": self.stride,
+            "dry_run": self.dry_run,
+        }
+
+    def includes(self, index: int) -> bool:
+        """Whether a chunk index falls in the range and on the stride (ignoring max_chunks)."""
+        if index < self.start_chunk or (self.end_chunk is not None and index >= self.end_chunk):
+            return False
+        return (index - self.start_chunk) % self.stride == 0
+
+    def _limit(self) -> Optional[int]:
+        """Index one past the last chunk the window can select."""
+        limits = []
+        if self.end_chunk is not None:
+            limits.append(self.end_chunk)
+        if self.max_chunks is not None:
+            limits.append(self.start_chunk + max(0, self.max_chunks - 1) * self.stride + min(1, self.max_chunks))
+        return min(limits) if limits else None
+
+    async def select(self, chunks: AsyncIterable[str], resume_from: int = 0) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Pick the chunks in the window out of a chunk stream.
+
+        The stream is abandoned as soon as no later chunk can be selected, so
+        processing the start of a book doesn't parse the rest of it.
+
+        Args:
+            chunks: Chunks of the whole book, in order
+            resume_from: Index before which chunks were already committed by an earlier run
+
+        Yields:
+            (chunk index, chunk) pairs
+        """
+        limit = self._limit()
+        if limit is not None and limit <= max(self.start_chunk, resume_from):
+            return
+        index = 0
+        async for chunk in chunks:
+            if index >= resume_from and self.includes(index):
+                yield index, chunk
+            index += 1
+            if limit is not None and index >= limit:
+                return
+
+class ProcessingEstimate:
+    """Expected size, token usage and duration of processing a book."""
+
+    def __init__(self, total_chunks: int, selected_chunks: int, cached_chunks: int, input_tokens: int, output_tokens: int, concurrency: int, estimated_seconds: float, dry_run: bool):
+        self.total_chunks = total_chunks
+        self.selected_chunks = selected_chunks
+        self.cached_chunks = cached_chunks
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.concurrency = concurrency
+        self.estimated_seconds = estimated_seconds
+        self.dry_run = dry_run
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_chunks": self.total_chunks,
+            "selected_chunks": self.selected_chunks,
+            "cached_chunks": self.cached_chunks,
+            "llm_calls": self.selected_chunks - self.cached_chunks,
+            "estimated_input_tokens": self.input_tokens,
+            "estimated_output_tokens": self.output_tokens,
+            "concurrency": self.concurrency,
+            "estimated_seconds": round(self.estimated_seconds, 1),
+            "dry_run": self.dry_run,
+        }
+
+_prompt_tokens = None
+
+def _prompt_overhead_tokens() -> int:
+    """Tokens the extraction prompt adds around every chunk."""
+    global _prompt_tokens
+    if _prompt_tokens is None:
+        _prompt_tokens = get_token_counter().count_batch([load_prompt(PROMPT_PATH).template])[0]
+    return _prompt_tokens
+
+async def estimate_processing(
+    result: Dict[str, Any],
+    window: ProcessingWindow,
+    concurrency: int = EXTRACTION_CONCURRENCY,
+    requests_per_minute: Optional[int] = EXTRACTION_REQUESTS_PER_MINUTE,
+    tokens_per_minute: Optional[int] = EXTRACTION_TOKENS_PER_MINUTE
+) -> ProcessingEstimate:
+    """
+    Estimate what processing a book with a given window would cost, without calling the LLM.
+
+    The book is parsed and chunked exactly as process_book would. Chunks already
+    in the extraction cache cost nothing. Wall time assumes each LLM call takes
+    a fixed overhead plus its output at a steady token rate, spread over the
+    configured concurrency and capped by the configured rate limits.
+
+    Args:
+        result: Dictionary containing processed book data, as for process_book
+        window: Chunks that would be processed
+        concurrency: Number of extractions run at once
+        requests_per_minute: Configured cap on LLM calls per minute
+        tokens_per_minute: Configured cap on prompt tokens per minute
+
+    Returns:
+        The estimate
+    """
+    chunks = achunk_blocks(result["processed_data"]["text_blocks"], block_kind=result["processed_data"]["block_kind"])
+    cache = get_extraction_cache()
+
+    total = 0
+    selected: List[str] = []
+    cached = 0
+    async for chunk in chunks:
+        if window.includes(total) and (window.max_chunks is None or len(selected) + cached < window.max_chunks):
+            if extraction_cache_key(chunk) in cache:
+                cached += 1
+            else:
+                selected.append(chunk)
+        total += 1
+
+    calls = len(selected)
+    input_tokens = sum(get_token_counter().count_batch(selected)) + calls * _prompt_overhead_tokens()
+    output_tokens = calls * ESTIMATED_OUTPUT_TOKENS_PER_CHUNK
+
+    seconds_per_call = ESTIMATED_CALL_OVERHEAD_SECONDS + ESTIMATED_OUTPUT_TOKENS_PER_CHUNK / ESTIMATED_OUTPUT_TOKENS_PER_SECOND
+    concurrency = max(1, concurrency)
+    seconds = math.ceil(calls / concurrency) * seconds_per_call
+    if requests_per_minute:
+        seconds = max(seconds, 60.0 * calls / requests_per_minute)
+    if tokens_per_minute:
+        seconds = max(seconds, 60.0 * input_tokens / tokens_per_minute)
+
+    return ProcessingEstimate(
+        total_chunks=total,
+        selected_chunks=calls + cached,
+        cached_chunks=cached,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        concurrency=concurrency,
+        estimated_seconds=seconds,
+        dry_run=window.dry_run
+    )
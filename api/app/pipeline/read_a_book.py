@@ -1,122 +1,331 @@
+import asyncio
 import json
-from typing import List, Dict, Any, Generator, Optional
-from app.agents.summary_extractor import SummaryExtractor
-from app.utils.file_utils import chunkify_textblob
-from app.services.neo4j.connection import Neo4jConnection
+import os
+import time
+from typing import List, Dict, Any, Callable, Generator, Optional, Tuple, Union
+from app.agents.extraction_parser import Entity, ExtractionParseError, parse_extraction
+from app.agents.summary_extractor import get_extractor_service
+from app.pipeline.chunk_uploader import ChunkUploader, chunk_record, get_chunk_store
+from app.pipeline.entity_clustering import ENTITY_CONSOLIDATION, character_has_data, consolidate_extractions, location_has_data
+from app.pipeline.extraction_scheduler import ExtractionScheduler, ChunkProgress, ChunkUpdate
+from app.pipeline.processing_window import ProcessingWindow
+from app.pipeline.resolution_context import ResolutionCache, ResolutionContext
+from app.pipeline.stage_timings import StageTimings
+from app.utils.chunker import achunk_blocks
+from app.services.neo4j.connection import Neo4jConnection, USE_VECTOR_INDEX
 from app.services.neo4j.character_service import CharacterService, CharacterResult
 from app.services.neo4j.location_service import LocationService, LocationResult
 from app.services.neo4j.relationship_service import RelationshipService
-from app.services.neo4j.embedding_service import EmbeddingService
+from app.services.neo4j.embedding_service import get_embedding_service
+from app.services.cache.extraction_cache import get_extraction_cache
 from app.models.character import Character
+from app.models.extraction_result import ExtractionResult
 from app.models.location import Location
-from app.models.relationship import Relationship
 
-async def process_book(result: Dict[str, Any]) -> Generator[str, None, None]:
+# Report entities while their chunk's response is still streaming, and embed them ahead of the graph write
+EXTRACTION_STREAM_ENTITIES = os.getenv("EXTRACTION_STREAM_ENTITIES", "false").lower() == "true"
+
+async def process_book(
+    result: Dict[str, Any],
+    connection: Neo4jConnection,
+    window: Optional[ProcessingWindow] = None,
+    resume_from: int = 0,
+    checkpoint: Optional[Callable[[int], None]] = None,
+    timings: Optional[StageTimings] = None,
+    stream_entities: bool = EXTRACTION_STREAM_ENTITIES,
+    consolidation: str = ENTITY_CONSOLIDATION
+) -> Generator[str, None, None]:
     """
     Process a book by extracting entities and relationships using AI, 
     then store them in a Neo4j knowledge graph.
     
     Args:
         result: Dictionary containing processed book data
+        connection: Shared Neo4j connection; it is left open for other requests
+        window: Chunks to process and whether to write to the graph (defaults to the whole book)
+        resume_from: Index before which chunks were already committed by an earlier run, which are skipped
+        checkpoint: Called after each chunk's graph write with the index just past that chunk
+            (its chunk store upsert may still be in flight; upserts are idempotent); in batch
+            consolidation, once after the whole book is written
+        timings: Collects the time spent in each pipeline stage, for benchmarks
+        stream_entities: Report each entity as soon as its chunk's response contains it
+        consolidation: "online" to resolve and write each chunk as it is extracted, or "batch"
+            to extract the whole book, cluster all its mentions at once and write them together
         
     Yields:
         Progress updates as strings
     """
-    # Extract the text content from the result
-    blob = result["processed_data"]["text_content"]
+    # Text blocks stream in from the parsing pool, in reading order
+    blocks = result["processed_data"]["text_blocks"]
+    
+    # Pack the text into token-budgeted chunks at chapter, page and paragraph boundaries as it is extracted
+    chunks = achunk_blocks(blocks, block_kind=result["processed_data"]["block_kind"])
+    yield "Extracting file text -> Streaming chunks into extraction"
     
-    # Split the text into manageable chunks
-    chunks = chunkify_textblob(blob)
-    yield f"Extracted file text -> Splitting into {len(chunks)} chunks"
+    window = window or ProcessingWindow()
+    if consolidation not in ("online", "batch"):
+        raise ValueError(f"Unknown consolidation mode: {consolidation}")
+    batch = consolidation == "batch"
+    timings = timings if timings is not None else StageTimings()
     
-    # Initialize embedding service for semantic entity matching
-    embedding_service = EmbeddingService()
+    # Shared embedding service for semantic entity matching; the model loads once per process
+    embedding_service = get_embedding_service()
     
-    # Initialize connection and services
-    connection = Neo4jConnection(db_name="story_graph")
+    # Initialize services on the shared connection
+    if USE_VECTOR_INDEX and not window.dry_run:
+        await asyncio.to_thread(connection.enable_vector_indexes, embedding_service.dimensions)
     character_service = CharacterService(connection, embedding_service)
     location_service = LocationService(connection, embedding_service)
     relationship_service = RelationshipService(connection)
     
-    try:
-        results = []
+    # Names resolved in earlier chunks skip the graph lookup in later ones
+    resolution_cache = ResolutionCache()
+    
+    # Chunk text and summaries go to the chunk store (CHUNK_STORE) in batches, behind the graph writes
+    chunk_store = None if window.dry_run else await asyncio.to_thread(get_chunk_store)
+    uploader = ChunkUploader(chunk_store) if chunk_store else None
+    
+    # Previously extracted chunks are served from the on-disk cache
+    extraction_cache = get_extraction_cache()
+    
+    # One extractor per process: the LLM client, its connection pool and the prompt are reused across chunks
+    extractor = get_extractor_service()
+    
+    def cached(chunk: str) -> Optional[ExtractionResult]:
+        result_json = extraction_cache.get(extractor.cache_key(chunk))
+        if result_json is None:
+            return None
+        try:
+            return parse_extraction(result_json)
+        except ExtractionParseError:
+            # Unusable entries are extracted again
+            return None
+    
+    async def extract(chunk: str, report: Optional[Callable[[Entity], None]] = None) -> ExtractionResult:
+        on_entity = (lambda key, entity: report(entity)) if report else None
+        try:
+            with timings.measure("extraction"):
+                result_json, extraction = await extractor.extract_validated(chunk, on_entity=on_entity)
+        except Exception as e:
+            # Unparseable responses and backend errors that outlasted the retries lose
+            # only this chunk; the rest of the book carries on
+            extractor.metrics.record_skipped()
+            return ExtractionResult(error=str(e) or type(e).__name__)
+        # Cut-off responses are used but not cached, so a later run asks again
+        if extraction.complete:
+            await asyncio.to_thread(extraction_cache.put, extractor.cache_key(chunk), result_json)
+        return extraction
+    
+    scheduler = ExtractionScheduler(extract, cached_fn=cached, updates=stream_entities)
+    
+    # Chunks whose entities were reported while streaming, and the embeddings of those
+    # entities being computed while the chunk waits for its turn to be written
+    streamed = set()
+    warming: Dict[int, List[asyncio.Task]] = {}
+    
+    results = []
+    last_index = None
+    if resume_from:
+        yield f"Resuming from chunk {resume_from + 1}"
+    
+    # The scheduler numbers the chunks it is given; remember where each sits in the book
+    positions = []
+    
+    async def chunks_to_process():
+        selected = window.select(chunks, resume_from)
+        while True:
+            # Time spent waiting on the parsing pool and the chunker
+            start = time.perf_counter()
+            try:
+                index, chunk = await selected.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                timings.add("parse_and_chunk", time.perf_counter() - start)
+            positions.append(index)
+            yield chunk
+    
+    # Extract chunks concurrently; results arrive in chunk order
+    async for event in scheduler.run(chunks_to_process()):
+        if isinstance(event, ChunkProgress):
+            yield f"Chunks: {event.in_flight} in-flight, {event.completed} completed, {event.queued} queued " \
+                  f"(cache: {event.cache_hits} hits, {event.cache_misses} misses)"
+            continue
         
-        # Process each chunk of the book
-        for i, chunk in enumerate(chunks[:2]):  # Limited to first 2 chunks for testing
-            yield f"Processing chunk {i+1}/{len(chunks[:2])}"
-            
-            # Extract entities and relationships from the chunk
-            agent = SummaryExtractor(chunk)
-            result_json = await agent.run()
-            
-            # Parse the extraction result
-            parsed_result = json.loads(result_json)
-            
-            # Log extracted information
-            yield f"Extracted {len(parsed_result['characters'])} characters, " \
-                  f"{len(parsed_result['locations'])} locations, " \
-                  f"{len(parsed_result['relationships'])} relationships"
-            
-            # Yield character names
-            for character in parsed_result['characters']:
-                yield f"\nCharacter: {character['name']}"
-
-            # Yield location names
-            for location in parsed_result['locations']:
-                yield f"\nLocation: {location['name']}"
-
-            # Store the extraction in Neo4j, with automatic entity consolidation
-            store_extraction_in_graph(
-                character_service=character_service,
-                location_service=location_service,
-                relationship_service=relationship_service,
-                extraction=parsed_result
-            )
-            
-            results.append(result_json)
-            
-        # Get all characters and locations
-        all_characters = character_service.get_all_characters()
-        all_locations = location_service.get_all_locations()
+        if isinstance(event, ChunkUpdate):
+            entity = event.payload
+            streamed.add(event.index)
+            if isinstance(entity, Character):
+                yield f"\nCharacter: {entity.name} (chunk {positions[event.index] + 1})"
+                if not window.dry_run:
+                    warming.setdefault(event.index, []).append(asyncio.create_task(
+                        asyncio.to_thread(character_service.generate_character_embeddings, [entity])
+                    ))
+            elif isinstance(entity, Location):
+                yield f"\nLocation: {entity.name} (chunk {positions[event.index] + 1})"
+                if not window.dry_run:
+                    warming.setdefault(event.index, []).append(asyncio.create_task(
+                        asyncio.to_thread(location_service.generate_location_embeddings, [entity])
+                    ))
+            continue
+        
+        i = positions[event.index]
+        parsed_result = event.result
+        yield f"Processing chunk {i+1}"
+        
+        if parsed_result.error:
+            streamed.discard(event.index)
+            for task in warming.pop(event.index, []):
+                task.cancel()
+            yield f"Skipped chunk {i+1}: no usable extraction after retries ({parsed_result.error})"
+            last_index = i
+            if checkpoint and not window.dry_run and not batch:
+                checkpoint(i + 1)
+            continue
+        
+        # Log extracted information
+        yield f"Extracted {len(parsed_result.characters)} characters, " \
+              f"{len(parsed_result.locations)} locations, " \
+              f"{len(parsed_result.relationships)} relationships"
+        if not parsed_result.complete:
+            yield f"Chunk {i+1} response was cut off; kept the entities it completed"
+        if parsed_result.dropped:
+            yield f"Dropped {parsed_result.dropped} invalid entities from chunk {i+1}"
+        
+        # Streamed chunks already reported their entities
+        if event.index not in streamed:
+            for character in parsed_result.characters:
+                yield f"\nCharacter: {character.name}"
+            for location in parsed_result.locations:
+                yield f"\nLocation: {location.name}"
 
-        yield f"Book processed. Consolidated into {len(all_characters)} unique characters and {len(all_locations)} unique locations."
+        streamed.discard(event.index)
+        results.append(parsed_result)
+        last_index = i
+        if window.dry_run:
+            continue
+        
+        if uploader:
+            # Blocks only when the store has fallen too far behind
+            with timings.measure("chunk_store_wait"):
+                await uploader.put(chunk_record(result["book_id"], result["filename"], i, event.chunk, parsed_result.summary))
+        
+        # Batch consolidation writes the whole book after extraction
+        if batch:
+            continue
+        
+        # Streamed entities were embedded while the chunk waited; the batch embed below reuses those vectors
+        if event.index in warming:
+            with timings.measure("embedding_warmup_wait"):
+                await asyncio.gather(*warming.pop(event.index), return_exceptions=True)
+        
+        # Store the extraction in Neo4j, with automatic entity consolidation
+        await astore_extraction_in_graph(
+            connection=connection,
+            character_service=character_service,
+            location_service=location_service,
+            relationship_service=relationship_service,
+            extraction=parsed_result,
+            timings=timings,
+            cache=resolution_cache
+        )
+        
+        if checkpoint:
+            checkpoint(i + 1)
+    
+    if uploader:
+        with timings.measure("chunk_store_flush"):
+            stored = await uploader.flush()
+        yield f"Stored {stored} chunks in the chunk store"
+    
+    if window.dry_run:
+        yield f"Dry run finished. Extracted {len(results)} chunks; nothing was written to the graph."
+        return
+    
+    if batch:
+        # Streamed entities' embeddings land in the embedding cache for the batch embed below
+        for tasks in warming.values():
+            await asyncio.gather(*tasks, return_exceptions=True)
+        yield f"Clustering {sum(len(r.characters) for r in results)} character and " \
+              f"{sum(len(r.locations) for r in results)} location mentions from {len(results)} chunks"
+        with timings.measure("clustering"):
+            book_extraction = await asyncio.to_thread(consolidate_extractions, results, character_service, location_service)
+        yield f"Clustered into {len(book_extraction.characters)} characters and {len(book_extraction.locations)} locations"
+        
+        # One write for the whole book, still resolved against entities from earlier books
+        await astore_extraction_in_graph(
+            connection=connection,
+            character_service=character_service,
+            location_service=location_service,
+            relationship_service=relationship_service,
+            extraction=book_extraction,
+            timings=timings
+        )
+        if checkpoint and last_index is not None:
+            checkpoint(last_index + 1)
+        
+    # Get all characters and locations
+    with timings.measure("summary"):
+        all_characters, all_locations = await asyncio.gather(
+            character_service.aget_all_characters(),
+            location_service.aget_all_locations(),
+        )
 
-        # Yield each character name
-        for character in all_characters:
-            yield f"\nCharacter: {character.name}"
+    yield f"Book processed. Consolidated into {len(all_characters)} unique characters and {len(all_locations)} unique locations."
 
-        # Yield each location name
-        for location in all_locations:
-            yield f"\nLocation: {location.name}"
+    # Yield each character name
+    for character in all_characters:
+        yield f"\nCharacter: {character.character.name}"
 
-    finally:
-        # Ensure the connection is closed
-        connection.close()
+    # Yield each location name
+    for location in all_locations:
+        yield f"\nLocation: {location.location.name}"
 
-def find_matching_character(character_service: CharacterService, character: Character) -> Optional[CharacterResult]:
+def find_matching_character(
+    character_service: CharacterService,
+    character: Character,
+    known: Optional[Dict[str, CharacterResult]] = None,
+    candidates: Optional[List[CharacterResult]] = None,
+    embedding: Any = None,
+    graph_matches: Optional[List[Tuple[CharacterResult, float]]] = None
+) -> Optional[CharacterResult]:
     """
     Find a matching character using multiple strategies.
     
     Args:
         character_service: CharacterService instance
         character: Character to match
+        known: Pre-fetched name/alias lookups; when given, no per-name queries are issued
+        candidates: Characters not yet written to the graph to include in similarity matching
+        embedding: Pre-computed embedding of the character, reused instead of encoding its description
+        graph_matches: Stored characters most similar to the embedding, already looked up; when given,
+            the graph isn't queried for similarity
         
     Returns:
         CharacterResult if a match is found, None otherwise
     """
-    # Try exact name match
-    result = character_service.get_character(character.name)
-    if result:
-        return result
-    
-    # Try alternative names
-    result = character_service.get_character_by_alias(character.name)
-    if result:
-        return result
+    if known is not None:
+        # Exact name and alias matches were resolved in bulk
+        result = known.get(character.name)
+        if result:
+            return result
+    else:
+        # Try exact name match
+        result = character_service.get_character(character.name)
+        if result:
+            return result
+        
+        # Try alternative names
+        result = character_service.get_character_by_alias(character.name)
+        if result:
+            return result
     
     # Try similar character using embedding
     # First check if there's enough data to do a meaningful comparison
-    has_data = bool(character.physical_desc or character.psychological_desc or character.arc or character.alt_names)
+    has_data = character_has_data(character)
+    
+    if has_data and embedding is not None:
+        return character_service.find_similar_character(character=character, embedding=embedding, candidates=candidates, graph_matches=graph_matches)
     
     if has_data:
         # If we have some description or alt names, try similarity matching
@@ -128,35 +337,56 @@ def find_matching_character(character_service: CharacterService, character: Char
         if character.arc:
             description += character.arc
             
-        result = character_service.find_similar_character(character_desc=description)
+        result = character_service.find_similar_character(character_desc=description, candidates=candidates)
         return result
     
     return None
 
-def find_matching_location(location_service: LocationService, location: Location) -> Optional[LocationResult]:
+def find_matching_location(
+    location_service: LocationService,
+    location: Location,
+    known: Optional[Dict[str, LocationResult]] = None,
+    candidates: Optional[List[LocationResult]] = None,
+    embedding: Any = None,
+    graph_matches: Optional[List[Tuple[LocationResult, float]]] = None
+) -> Optional[LocationResult]:
     """
     Find a matching location using multiple strategies.
     
     Args:
         location_service: LocationService instance
         location: Location to match
+        known: Pre-fetched name/alias lookups; when given, no per-name queries are issued
+        candidates: Locations not yet written to the graph to include in similarity matching
+        embedding: Pre-computed embedding of the location, reused instead of encoding its description
+        graph_matches: Stored locations most similar to the embedding, already looked up; when given,
+            the graph isn't queried for similarity
         
     Returns:
         LocationResult if a match is found, None otherwise
     """
-    # Try exact name match
-    result = location_service.get_location(location.name)
-    if result:
-        return result
-    
-    # Try alternative names
-    result = location_service.get_location_by_alias(location.name)
-    if result:
-        return result
+    if known is not None:
+        # Exact name and alias matches were resolved in bulk
+        result = known.get(location.name)
+        if result:
+            return result
+    else:
+        # Try exact name match
+        result = location_service.get_location(location.name)
+        if result:
+            return result
+        
+        # Try alternative names
+        result = location_service.get_location_by_alias(location.name)
+        if result:
+            return result
     
     # Try similar location using embedding
     # First check if there's enough data to do a meaningful comparison
-    has_data = bool(location.description or location.significance or location.alt_names)
+    has_data = location_has_data(location)
+    
+    if has_data and embedding is not None:
+        return location_service.find_similar_location(location=location, embedding=embedding, candidates=candidates, graph_matches=graph_matches)
     
     if has_data:
         # If we have some description or alt names, try similarity matching
@@ -166,96 +396,307 @@ def find_matching_location(location_service: LocationService, location: Location
         if location.significance:
             description += location.significance
             
-        result = location_service.find_similar_location(location_desc=description)
+        result = location_service.find_similar_location(location_desc=description, candidates=candidates)
         return result
     
     return None
 
-def store_extraction_in_graph(
+def _remember_names(known: Dict[str, Any], canonical_name: str, alt_names: Optional[List[str]], result: Any, entity_of) -> None:
+    """Point a resolved entity's name and aliases at its latest pending state."""
+    for name, existing in list(known.items()):
+        if entity_of(existing).name == canonical_name:
+            known[name] = result
+    known[canonical_name] = result
+    for alt_name in alt_names or []:
+        known.setdefault(alt_name, result)
+
+def resolve_characters(
     character_service: CharacterService,
-    location_service: LocationService,
-    relationship_service: RelationshipService,
-    extraction: Dict[str, Any]
-) -> None:
+    characters: List[Character],
+    known: Optional[Dict[str, CharacterResult]] = None,
+    embeddings: Optional[List[Any]] = None,
+    graph_matches: Optional[List[List[Tuple[CharacterResult, float]]]] = None
+) -> Tuple[List[Tuple[Character, Any]], Dict[str, CharacterResult]]:
     """
-    Store extracted entities and relationships in the Neo4j graph.
+    Resolve a chunk's characters against the graph and each other, without writing anything.
     
     Args:
         character_service: CharacterService instance
-        location_service: LocationService instance
-        relationship_service: RelationshipService instance
-        extraction: Dictionary with extracted entities and relationships
+        characters: Characters extracted from one chunk
+        
+    Returns:
+        (Character, embedding) rows to write, where embedding is None for nodes that already
+        exist, and the name/alias lookup table including everything resolved in this chunk
     """
-    # Store characters with their properties
-    for char_data in extraction.get("characters", []):
-        character = Character(
-            name=char_data["name"],
-            arc=char_data.get("arc", ""),
-            physical_desc=char_data.get("physical_description", ""),
-            psychological_desc=char_data.get("psychological_description", ""),
-            alt_names=char_data.get("alt_names", [])
+    if known is None:
+        known = character_service.get_characters_by_names([c.name for c in characters])
+    
+    # Embed the whole chunk in one batch; vectors serve both matching and storage
+    if embeddings is None:
+        embeddings = character_service.generate_character_embeddings(characters)
+    if graph_matches is None:
+        graph_matches = [None] * len(characters)
+    pending: Dict[str, Tuple[Character, Any]] = {}
+    new_results: List[CharacterResult] = []
+    
+    for character, character_embedding, character_matches in zip(characters, embeddings, graph_matches):
+        existing_result = find_matching_character(
+            character_service, character, known=known, candidates=new_results,
+            embedding=character_embedding, graph_matches=character_matches
         )
-        
-        # Add character - entity consolidation happens automatically
-        existing_result = find_matching_character(character_service, character)
         if existing_result:
-            character_service.consolidate_character(character, existing_result)
+            canonical_name = existing_result.character.name
+            # Earlier entities in this chunk may already have updated this one
+            existing_character, embedding = pending.get(canonical_name, (existing_result.character, None))
+            merged = character_service.merge_character_data(character, existing_character)
+            pending[canonical_name] = (merged, embedding)
         else:
-            character_service.add_character(character)
-    
-    # Store locations with their properties
-    for loc_data in extraction.get("locations", []):
-        location = Location(
-            name=loc_data["name"],
-            description=loc_data.get("description", ""),
-            significance=loc_data.get("significance", ""),
-            alt_names=loc_data.get("alt_names", [])
+            # Ensure alt_names includes the character's primary name
+            if character.alt_names is None:
+                character.alt_names = [character.name]
+            elif character.name not in character.alt_names:
+                character.alt_names.append(character.name)
+            canonical_name = character.name
+            embedding = character_embedding
+            pending[canonical_name] = (character, embedding)
+            if embedding is not None:
+                new_results.append(CharacterResult(character=character, embedding=embedding))
+        
+        resolved, embedding = pending[canonical_name]
+        _remember_names(
+            known, canonical_name, resolved.alt_names,
+            CharacterResult(character=resolved, embedding=embedding),
+            lambda result: result.character
         )
+    
+    return list(pending.values()), known
+
+def resolve_locations(
+    location_service: LocationService,
+    locations: List[Location],
+    known: Optional[Dict[str, LocationResult]] = None,
+    embeddings: Optional[List[Any]] = None,
+    graph_matches: Optional[List[List[Tuple[LocationResult, float]]]] = None
+) -> Tuple[List[Tuple[Location, Any]], Dict[str, LocationResult]]:
+    """
+    Resolve a chunk's locations against the graph and each other, without writing anything.
+    
+    Args:
+        location_service: LocationService instance
+        locations: Locations extracted from one chunk
         
-        # Add location - entity consolidation happens automatically
-        existing_result = find_matching_location(location_service, location)
+    Returns:
+        (Location, embedding) rows to write, where embedding is None for nodes that already
+        exist, and the name/alias lookup table including everything resolved in this chunk
+    """
+    if known is None:
+        known = location_service.get_locations_by_names([l.name for l in locations])
+    
+    # Embed the whole chunk in one batch; vectors serve both matching and storage
+    if embeddings is None:
+        embeddings = location_service.generate_location_embeddings(locations)
+    if graph_matches is None:
+        graph_matches = [None] * len(locations)
+    pending: Dict[str, Tuple[Location, Any]] = {}
+    new_results: List[LocationResult] = []
+    
+    for location, location_embedding, location_matches in zip(locations, embeddings, graph_matches):
+        existing_result = find_matching_location(
+            location_service, location, known=known, candidates=new_results,
+            embedding=location_embedding, graph_matches=location_matches
+        )
         if existing_result:
-            location_service.consolidate_location(location, existing_result)
+            canonical_name = existing_result.location.name
+            # Earlier entities in this chunk may already have updated this one
+            existing_location, embedding = pending.get(canonical_name, (existing_result.location, None))
+            merged = location_service.merge_location_data(location, existing_location)
+            pending[canonical_name] = (merged, embedding)
         else:
-            location_service.add_location(location)
-    
-    # Store relationships between entities
-    for rel_data in extraction.get("relationships", []):
-        # Check for entity resolution in relationships
-        source_name = rel_data["source"]
-        target_name = rel_data["target"]
-        
-        # Try to find matching character for source
-        if rel_data["type"] == "character_to_character" or rel_data["type"].startswith("character_to"):
-            source_char = find_matching_character(
-                character_service, 
-                Character(name=source_name, arc="", physical_desc="", psychological_desc="")
-            )
-            if source_char:
-                source_name = source_char.character.name
-        
-        # Try to find matching entity for target
-        if rel_data["type"] == "character_to_character":
-            target_char = find_matching_character(
-                character_service,
-                Character(name=target_name, arc="", physical_desc="", psychological_desc="")
-            )
-            if target_char:
-                target_name = target_char.character.name
-        elif rel_data["type"] == "character_to_location" or rel_data["type"].endswith("_to_location"):
-            target_loc = find_matching_location(
-                location_service,
-                Location(name=target_name, description="", significance="")
-            )
-            if target_loc:
-                target_name = target_loc.location.name
+            # Ensure alt_names includes the location's primary name
+            if location.alt_names is None:
+                location.alt_names = [location.name]
+            elif location.name not in location.alt_names:
+                location.alt_names.append(location.name)
+            canonical_name = location.name
+            embedding = location_embedding
+            pending[canonical_name] = (location, embedding)
+            if embedding is not None:
+                new_results.append(LocationResult(location=location, embedding=embedding))
         
-        # Create and add the relationship
-        relationship = Relationship(
-            source=source_name,
-            target=target_name,
-            type=rel_data["type"],
-            properties=rel_data.get("properties", {}),
-            description=rel_data.get("description", "")
+        resolved, embedding = pending[canonical_name]
+        _remember_names(
+            known, canonical_name, resolved.alt_names,
+            LocationResult(location=resolved, embedding=embedding),
+            lambda result: result.location
         )
-        relationship_service.add_relationship(relationship)
\ No newline at end of file
+    
+    return list(pending.values()), known
+
+def _split_cached(lookup: Optional[Callable[[List[str]], Dict[str, Any]]], names: List[str]) -> Tuple[Dict[str, Any], List[str]]:
+    """Split names into cached resolutions and the names still to look up in the graph."""
+    found = lookup(names) if lookup else {}
+    return found, [name for name in dict.fromkeys(names) if name not in found]
+
+def store_extraction_in_graph(
+    connection: Neo4jConnection,
+    character_service: CharacterService,
+    location_service: LocationService,
+    relationship_service: RelationshipService,
+    extraction: Union[ExtractionResult, Dict[str, Any]],
+    timings: Optional[StageTimings] = None,
+    cache: Optional[ResolutionCache] = None
+) -> None:
+    """
+    Store extracted entities and relationships in the Neo4j graph.
+    
+    Entities are resolved client-side first, then the whole chunk is written
+    with a handful of UNWIND queries in a single transaction.
+    
+    Args:
+        connection: Neo4j connection used for the write transaction
+        character_service: CharacterService instance
+        location_service: LocationService instance
+        relationship_service: RelationshipService instance
+        extraction: Validated extraction, or a decoded extraction response
+        timings: Collects the time spent resolving, writing and indexing
+        cache: Resolutions carried over from the book's earlier chunks, consulted before the
+            graph and brought up to date after the write
+    """
+    timings = timings if timings is not None else StageTimings()
+    resolve_start = time.perf_counter()
+    
+    if isinstance(extraction, dict):
+        extraction = parse_extraction(json.dumps(extraction))
+    characters = extraction.characters
+    locations = extraction.locations
+    
+    # Every name in the chunk, entities and relationship endpoints alike, is looked up once
+    character_names, location_names = ResolutionContext.relationship_endpoints(extraction.relationships)
+    known_characters, missing_characters = _split_cached(cache.characters if cache else None, [c.name for c in characters] + list(character_names))
+    known_locations, missing_locations = _split_cached(cache.locations if cache else None, [l.name for l in locations] + list(location_names))
+    known_characters.update(character_service.get_characters_by_names(missing_characters))
+    known_locations.update(location_service.get_locations_by_names(missing_locations))
+    
+    # Resolve entities - entity consolidation happens automatically
+    character_rows, known_characters = resolve_characters(character_service, characters, known=known_characters)
+    location_rows, known_locations = resolve_locations(location_service, locations, known=known_locations)
+    
+    # Relationship endpoints resolve through the same context as the entities
+    context = ResolutionContext(known_characters, known_locations)
+    relationships = context.canonical_relationships(extraction.relationships)
+    
+    timings.add("resolve", time.perf_counter() - resolve_start)
+    
+    # Commit the whole chunk at once
+    def write_chunk(tx):
+        character_service.write_characters(tx, character_rows)
+        location_service.write_locations(tx, location_rows)
+        relationship_service.write_relationships(tx, relationships)
+    
+    with timings.measure("graph_write"):
+        connection.execute_write(write_chunk)
+    
+    # Keep the in-memory similarity indexes in step with the graph
+    with timings.measure("index"):
+        character_service.index_characters(character_rows)
+        location_service.index_locations(location_rows)
+        if cache:
+            cache.update(context, character_rows, location_rows)
+
+async def astore_extraction_in_graph(
+    connection: Neo4jConnection,
+    character_service: CharacterService,
+    location_service: LocationService,
+    relationship_service: RelationshipService,
+    extraction: Union[ExtractionResult, Dict[str, Any]],
+    timings: Optional[StageTimings] = None,
+    cache: Optional[ResolutionCache] = None
+) -> None:
+    """
+    Asynchronous store_extraction_in_graph, on the connection's async driver.
+    
+    Graph reads and the write transaction are awaited and embeddings run in a
+    worker thread, so the event loop keeps serving other books and LLM streams
+    meanwhile. Lookups are batched up front (names, then one similarity query
+    per entity kind), leaving resolution itself free of I/O.
+    
+    Args:
+        connection: Neo4j connection used for the write transaction
+        character_service: CharacterService instance
+        location_service: LocationService instance
+        relationship_service: RelationshipService instance
+        extraction: Validated extraction, or a decoded extraction response
+        timings: Collects the time spent resolving, writing and indexing
+        cache: Resolutions carried over from the book's earlier chunks, consulted before the
+            graph and brought up to date after the write
+    """
+    timings = timings if timings is not None else StageTimings()
+    resolve_start = time.perf_counter()
+    
+    if isinstance(extraction, dict):
+        extraction = parse_extraction(json.dumps(extraction))
+    characters = extraction.characters
+    locations = extraction.locations
+    
+    # Exact name/alias lookups, including relationship endpoints, and the chunk's embeddings all at once
+    character_names, location_names = ResolutionContext.relationship_endpoints(extraction.relationships)
+    known_characters, missing_characters = _split_cached(cache.characters if cache else None, [c.name for c in characters] + list(character_names))
+    known_locations, missing_locations = _split_cached(cache.locations if cache else None, [l.name for l in locations] + list(location_names))
+    fetched_characters, fetched_locations, character_embeddings, location_embeddings = await asyncio.gather(
+        character_service.aget_characters_by_names(missing_characters),
+        location_service.aget_locations_by_names(missing_locations),
+        asyncio.to_thread(character_service.generate_character_embeddings, characters),
+        asyncio.to_thread(location_service.generate_location_embeddings, locations),
+    )
+    known_characters.update(fetched_characters)
+    known_locations.update(fetched_locations)
+    
+    # Similarity lookups only for entities without an exact match
+    character_matches, location_matches = await asyncio.gather(
+        character_service.afind_graph_matches(
+            [
+                None if character.name in known_characters else embedding
+                for character, embedding in zip(characters, character_embeddings)
+            ],
+            names=[[character.name] + list(character.alt_names or []) for character in characters],
+        ),
+        location_service.afind_graph_matches(
+            [
+                None if location.name in known_locations else embedding
+                for location, embedding in zip(locations, location_embeddings)
+            ],
+            names=[[location.name] + list(location.alt_names or []) for location in locations],
+        ),
+    )
+    
+    # Resolve entities - entity consolidation happens automatically
+    character_rows, known_characters = resolve_characters(
+        character_service, characters, known=known_characters,
+        embeddings=character_embeddings, graph_matches=character_matches
+    )
+    location_rows, known_locations = resolve_locations(
+        location_service, locations, known=known_locations,
+        embeddings=location_embeddings, graph_matches=location_matches
+    )
+    
+    # Relationship endpoints resolve through the same context as the entities
+    context = ResolutionContext(known_characters, known_locations)
+    relationships = context.canonical_relationships(extraction.relationships)
+    
+    timings.add("resolve", time.perf_counter() - resolve_start)
+    
+    # Commit the whole chunk at once
+    async def write_chunk(tx):
+        await character_service.awrite_characters(tx, character_rows)
+        await location_service.awrite_locations(tx, location_rows)
+        await relationship_service.awrite_relationships(tx, relationships)
+    
+    with timings.measure("graph_write"):
+        await connection.aexecute_write(write_chunk)
+    
+    # Keep the in-memory similarity indexes in step with the graph
+    with timings.measure("index"):
+        character_service.index_characters(character_rows)
+        location_service.index_locations(location_rows)
+        if cache:
+            cache.update(context, character_rows, location_rows)
@@ -0,0 +1,182 @@
+import os
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from app.models.character import Character
+from app.models.character_result import CharacterResult
+from app.models.location import Location
+from app.models.location_result import LocationResult
+from app.models.relationship import Relationship
+
+# Names per entity kind whose resolution is remembered from one chunk to the next
+RESOLUTION_CACHE_SIZE = int(os.getenv("RESOLUTION_CACHE_SIZE", "10000"))
+
+class ResolutionContext:
+    """
+    Where every name seen in one chunk resolves to, built once and shared by its entities and relationships.
+
+    Maps raw names (as extracted, including aliases) to the resolved entity,
+    reflecting any consolidation done in the chunk, so relationship endpoints
+    are canonicalised with dictionary lookups instead of repeated matching.
+    """
+
+    def __init__(self, characters: Optional[Dict[str, CharacterResult]] = None, locations: Optional[Dict[str, LocationResult]] = None):
+        """
+        Initialize the context.
+
+        Args:
+            characters: Raw name to resolved character
+            locations: Raw name to resolved location
+        """
+        self.characters = characters if characters is not None else {}
+        self.locations = locations if locations is not None else {}
+
+    @staticmethod
+    def relationship_endpoints(relationships: List[Relationship]) -> Tuple[Set[str], Set[str]]:
+        """Names of the characters and locations that relationships point at."""
+        character_names = set()
+        location_names = set()
+        for rel_data in relationships:
+            if rel_data.type == "character_to_character" or rel_data.type.startswith("character_to"):
+                character_names.add(rel_data.source)
+            if rel_data.type == "character_to_character":
+                character_names.add(rel_data.target)
+            elif rel_data.type == "character_to_location" or rel_data.type.endswith("_to_location"):
+                location_names.add(rel_data.target)
+        return character_names, location_names
+
+    def character_name(self, name: str) -> str:
+        """Canonical name of a character, or the name itself if it didn't resolve."""
+        result = self.characters.get(name)
+        return result.character.name if result else name
+
+    def location_name(self, name: str) -> str:
+        """Canonical name of a location, or the name itself if it didn't resolve."""
+        result = self.locations.get(name)
+        return result.location.name if result else name
+
+    def canonical_relationships(self, relationships: List[Relationship]) -> List[Relationship]:
+        """
+        Point relationship endpoints at canonical entity names.
+
+        Args:
+            relationships: Relationships as extracted
+
+        Returns:
+            Copies of the relationships with resolved source and target names
+        """
+        canonical = []
+        for rel_data in relationships:
+            source_name = rel_data.source
+            target_name = rel_data.target
+
+            if rel_data.type == "character_to_character" or rel_data.type.startswith("character_to"):
+                source_name = self.character_name(source_name)
+
+            if rel_data.type == "character_to_character":
+                target_name = self.character_name(target_name)
+            elif rel_data.type == "character_to_location" or rel_data.type.endswith("_to_location"):
+                target_name = self.location_name(target_name)
+
+            canonical.append(rel_data.model_copy(update={"source": source_name, "target": target_name}))
+        return canonical
+
+class _NameCache:
+    """LRU of raw name to resolved entity, able to drop every name of one entity at once."""
+
+    def __init__(self, max_entries: int, canonical_of: Callable[[Any], str]):
+        self.max_entries = max_entries
+        self.canonical_of = canonical_of
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._names_of: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        for name in names:
+            result = self._entries.get(name)
+            if result is not None:
+                self._entries.move_to_end(name)
+                found[name] = result
+        return found
+
+    def invalidate(self, canonical_names: Iterable[str]) -> None:
+        for canonical_name in canonical_names:
+            for name in self._names_of.pop(canonical_name, ()):
+                self._entries.pop(name, None)
+
+    def _discard(self, name: str) -> None:
+        result = self._entries.pop(name, None)
+        if result is not None:
+            names = self._names_of.get(self.canonical_of(result))
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._names_of[self.canonical_of(result)]
+
+    def put(self, name: str, result: Any) -> None:
+        self._discard(name)
+        self._entries[name] = result
+        self._names_of.setdefault(self.canonical_of(result), set()).add(name)
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+
+class ResolutionCache:
+    """
+    Recent name resolutions carried across the chunks of a book.
+
+    Names resolved in earlier chunks are served from here instead of the
+    graph. Whenever a chunk writes an entity, every cached name pointing at it
+    is dropped and replaced by the chunk's resolutions, so later chunks merge
+    into the entity as written rather than a stale copy. Only valid while the
+    graph isn't modified by anything else, so keep one per book being processed.
+    """
+
+    def __init__(self, max_entries: int = RESOLUTION_CACHE_SIZE):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries: Names kept per entity kind
+        """
+        self._characters = _NameCache(max_entries, lambda result: result.character.name)
+        self._locations = _NameCache(max_entries, lambda result: result.location.name)
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, cache: _NameCache, names: Iterable[str]) -> Dict[str, Any]:
+        names = list(dict.fromkeys(names))
+        found = cache.get_many(names)
+        self.hits += len(found)
+        self.misses += len(names) - len(found)
+        return found
+
+    def characters(self, names: Iterable[str]) -> Dict[str, CharacterResult]:
+        """Cached resolutions for the given character names; names not cached are left out."""
+        return self._lookup(self._characters, names)
+
+    def locations(self, names: Iterable[str]) -> Dict[str, LocationResult]:
+        """Cached resolutions for the given location names; names not cached are left out."""
+        return self._lookup(self._locations, names)
+
+    def update(
+        self,
+        context: ResolutionContext,
+        character_rows: List[Tuple[Character, Any]],
+        location_rows: List[Tuple[Location, Any]]
+    ) -> None:
+        """
+        Remember a chunk's resolutions once it has been written.
+
+        Args:
+            context: The chunk's resolution context
+            character_rows: Characters the chunk wrote, created or consolidated
+            location_rows: Locations the chunk wrote, created or consolidated
+        """
+        self._characters.invalidate(character.name for character, _ in character_rows)
+        self._locations.invalidate(location.name for location, _ in location_rows)
+        for name, result in context.characters.items():
+            self._characters.put(name, result)
+        for name, result in context.locations.items():
+            self._locations.put(name, result)
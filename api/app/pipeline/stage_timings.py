@@ -0,0 +1,36 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+class StageTimings:
+    """Accumulates the time spent in each named stage of the pipeline."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        """
+        Record time spent in a stage.
+
+        Args:
+            stage: Stage name
+            seconds: Time spent
+        """
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Time the body of a with block as one call of a stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {"seconds": round(seconds, 4), "calls": self.calls[stage]}
+            for stage, seconds in self.seconds.items()
+        }
@@ -0,0 +1,106 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+EXTRACTION_CACHE_DIR = Path(os.getenv("EXTRACTION_CACHE_DIR", ".cache/extractions"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+class ExtractionCache:
+    """On-disk, size-bounded LRU cache of raw extraction results keyed by content hash."""
+
+    def __init__(self, directory: Path = EXTRACTION_CACHE_DIR, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES):
+        """
+        Initialize the cache and index any entries already on disk.
+
+        Args:
+            directory: Directory holding one file per cached extraction
+            max_bytes: Total size above which least recently used entries are evicted
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+
+        # Rebuild LRU order from modification times, which are refreshed on every hit
+        existing = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in existing:
+            size = path.stat().st_size
+            self._entries[path.stem] = size
+            self._total_bytes += size
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def __contains__(self, key: str) -> bool:
+        """Whether an extraction is cached, without counting a hit or refreshing its age."""
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached extraction.
+
+        Args:
+            key: Content hash of the chunk, prompt and model settings
+
+        Returns:
+            The cached extraction JSON, or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                content = path.read_text(encoding="utf-8")
+                os.utime(path)
+            except FileNotFoundError:
+                # Removed behind our back; forget it
+                self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return content
+
+    def put(self, key: str, content: str) -> None:
+        """
+        Store an extraction and evict old entries if the cache is over budget.
+
+        Args:
+            key: Content hash of the chunk, prompt and model settings
+            content: Raw extraction JSON
+        """
+        data = content.encode("utf-8")
+        with self._lock:
+            path = self._path(key)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                self._path(old_key).unlink(missing_ok=True)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_extraction_cache() -> ExtractionCache:
+    """Return the process-wide extraction cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+        return _cache
@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", ".cache/jobs.sqlite3")
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+FINISHED_STATUSES = (COMPLETED, FAILED)
+
+class JobRecord:
+    """State of a book processing job, without its document."""
+
+    def __init__(self, job_id: str, filename: str, status: str, committed_chunks: int = 0, error: Optional[str] = None, created_at: float = None, updated_at: float = None, options: Optional[Dict[str, Any]] = None):
+        self.job_id = job_id
+        self.filename = filename
+        self.status = status
+        self.committed_chunks = committed_chunks
+        self.error = error
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.options = options or {}
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "committed_chunks": self.committed_chunks,
+            "options": self.options,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+class JobStore:
+    """SQLite-backed record of jobs, their documents, progress checkpoints and event logs."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        """
+        Open (and if necessary create) the job database.
+
+        Args:
+            path: SQLite database file, or ":memory:"
+        """
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            # WAL keeps the per-chunk commits cheap and lets readers run alongside the writer
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    committed_chunks INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    document BLOB,
+                    options TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS job_events (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                );
+            """)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def create_job(self, filename: str, document: bytes, options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Record a new queued job.
+
+        Args:
+            filename: Original file name of the book
+            document: Raw file contents, kept so the job can be resumed after a crash
+            options: JSON-serialisable processing options, restored when the job runs
+
+        Returns:
+            The new job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, filename, status, document, options, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, filename, QUEUED, document, json.dumps(options or {}), now, now)
+            )
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[JobRecord]:
+        """
+        Look up a job.
+
+        Args:
+            job_id: Id returned by create_job
+
+        Returns:
+            The job, or None if it doesn't exist
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, filename, status, committed_chunks, error, created_at, updated_at, options FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return JobRecord(*row[:7], options=json.loads(row[7]) if row[7] else None)
+
+    def load_document(self, job_id: str) -> Optional[bytes]:
+        """Return the raw file contents stored with a job."""
+        with self._lock:
+            row = self._db.execute("SELECT document FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def unfinished_jobs(self) -> List[str]:
+        """Ids of queued jobs and of jobs that were running when the process stopped, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (QUEUED, RUNNING)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        """
+        Move a job to a new status; finished jobs drop their stored document.
+
+        Args:
+            job_id: Job to update
+            status: One of QUEUED, RUNNING, COMPLETED or FAILED
+            error: Failure description, for FAILED jobs
+        """
+        with self._lock:
+            if status in FINISHED_STATUSES:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, document = NULL, updated_at = ? WHERE id = ?",
+                    (status, error, time.time(), job_id)
+                )
+            else:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                    (status, error, time.time(), job_id)
+                )
+
+    def checkpoint(self, job_id: str, committed_chunks: int) -> None:
+        """
+        Record that every chunk before committed_chunks has been written to the graph.
+
+        Args:
+            job_id: Job to update
+            committed_chunks: Number of leading chunks that are safely committed
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET committed_chunks = ?, updated_at = ? WHERE id = ?",
+                (committed_chunks, time.time(), job_id)
+            )
+
+    def append_event(self, job_id: str, message: str) -> int:
+        """
+        Append a progress message to a job's event log.
+
+        Args:
+            job_id: Job the message belongs to
+            message: Progress message
+
+        Returns:
+            Sequence number of the event (starting at 1)
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                seq = self._db.execute(
+                    "SELECT COALESCE(MAX(seq), 0) + 1 FROM job_events WHERE job_id = ?",
+                    (job_id,)
+                ).fetchone()[0]
+                self._db.execute(
+                    "INSERT INTO job_events (job_id, seq, message, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, seq, message, time.time())
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return seq
+
+    def events_after(self, job_id: str, seq: int = 0) -> List[Tuple[int, str]]:
+        """
+        Read a job's events newer than a sequence number.
+
+        Args:
+            job_id: Job to read
+            seq: Last sequence number the caller has already seen
+
+        Returns:
+            (sequence number, message) pairs in order
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT seq, message FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, seq)
+            ).fetchall()
@@ -2,14 +2,82 @@ from app.models.character_result import CharacterResult
 from neo4j import RoutingControl
 from typing import Optional, List, Dict, Tuple
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from app.models.character import Character
-from app.services.neo4j.connection import Neo4jConnection
+from app.services.neo4j.connection import Neo4jConnection, CHARACTER_VECTOR_INDEX
+from app.services.neo4j.embedding_codec import EMBEDDING_ENCODINGS, NEO4J_EMBEDDING_ENCODING, decode_embedding, encode_embedding
+from app.services.vector.name_index import NAME_BLOCKING_CANDIDATES, NameIndex
+from app.services.vector.vector_index import VectorIndex
+
+_CHARACTER_FIELDS = """
+    c.name as name,
+    c.arc as arc,
+    c.physical_desc as physical_desc,
+    c.psychological_desc as psychological_desc,
+    coalesce(c.embedding_bytes, c.embedding) as embedding,
+    c.embedding_scale as embedding_scale,
+    c.alt_names as alt_names
+"""
+
+_ALL_CHARACTERS_QUERY = f"""
+    MATCH (c:Character)
+    WHERE c.embedding IS NOT NULL OR c.embedding_bytes IS NOT NULL
+    RETURN {_CHARACTER_FIELDS}
+"""
+
+_CHARACTERS_BY_NAMES_QUERY = f"""
+    UNWIND $names AS lookup
+    OPTIONAL MATCH (exact:Character {{name: lookup}})
+    OPTIONAL MATCH (:Alias {{label: 'Character', name: lookup}})-[:ALIAS_OF]->(aliased:Character)
+    WITH lookup, exact, collect(aliased)[0] AS aliased
+    WITH lookup, coalesce(exact, aliased) AS c
+    WHERE c IS NOT NULL
+    RETURN lookup, {_CHARACTER_FIELDS}
+"""
+
+_SIMILAR_CHARACTERS_QUERY = f"""
+    UNWIND range(0, size($embeddings) - 1) AS i
+    CALL db.index.vector.queryNodes($index_name, $k, $embeddings[i])
+    YIELD node AS c, score
+    RETURN i, score, {_CHARACTER_FIELDS}
+"""
+
+_WRITE_CHARACTERS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (c:Character {name: row.name})
+    SET c.arc = row.arc,
+        c.physical_desc = row.physical_desc,
+        c.psychological_desc = row.psychological_desc,
+        c.alt_names = row.alt_names
+    FOREACH (_ IN CASE WHEN row.embedding IS NULL AND row.embedding_bytes IS NULL THEN [] ELSE [1] END |
+        SET c.embedding = row.embedding,
+            c.embedding_bytes = row.embedding_bytes,
+            c.embedding_scale = row.embedding_scale)
+    FOREACH (alias IN row.alt_names |
+        MERGE (a:Alias {label: 'Character', name: alias})
+        MERGE (a)-[:ALIAS_OF]->(c))
+"""
+
+def _character_result(record) -> CharacterResult:
+    """Build a CharacterResult from a record returning the _CHARACTER_FIELDS columns."""
+    character = Character(
+        name=record["name"],
+        arc=record["arc"],
+        physical_desc=record["physical_desc"],
+        psychological_desc=record["psychological_desc"],
+        alt_names=record["alt_names"]
+    )
+    return CharacterResult(character=character, embedding=decode_embedding(record["embedding"], record["embedding_scale"]))
+
+def _names(entity) -> List[str]:
+    return [entity.name] + list(entity.alt_names or [])
+
+def _as_list(embedding) -> list:
+    return embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
 
 class CharacterService:
     """Service for character-related database operations."""
     
-    def __init__(self, connection: Neo4jConnection, embedding_model=None, similarity_threshold=0.85):
+    def __init__(self, connection: Neo4jConnection, embedding_model=None, similarity_threshold=0.85, index_backend="flat", blocking_candidates=NAME_BLOCKING_CANDIDATES, embedding_encoding=NEO4J_EMBEDDING_ENCODING):
         """
         Initialize with a database connection.
         
@@ -17,25 +85,92 @@ class CharacterService:
             connection: Neo4j database connection
             embedding_model: Model for generating embeddings from text
             similarity_threshold: Threshold for considering two entities as the same
+            index_backend: Backend for the in-memory similarity index ("flat" or "hnsw")
+            blocking_candidates: Stored characters with the most similar names to compare by embedding
+                when matching in memory; 0 compares against every character
+            embedding_encoding: How embeddings are stored on character nodes ("list", or "float32" or "int8" for compact bytes)
         """
+        if embedding_encoding not in EMBEDDING_ENCODINGS:
+            raise ValueError(f"Unknown embedding encoding: {embedding_encoding}")
         self.connection = connection
         self.embedding_model = embedding_model
         self.similarity_threshold = similarity_threshold
+        self.index_backend = index_backend
+        self.blocking_candidates = blocking_candidates
+        self.embedding_encoding = embedding_encoding
+        self._index: Optional[VectorIndex] = None
+        self._names = NameIndex()
+        self._entities: Dict[str, CharacterResult] = {}
     
-    def generate_character_embedding(self, character: Character) -> Optional[np.ndarray]:
+    def stored_encoding(self) -> str:
+        """Encoding used for embeddings written now; Neo4j's vector index only indexes float lists."""
+        return "list" if self.connection.vector_index_enabled else self.embedding_encoding
+    
+    def _build_index(self, results: List[CharacterResult]) -> VectorIndex:
+        self._index = VectorIndex(backend=self.index_backend)
+        self._names = NameIndex()
+        for result in results:
+            self._entities[result.character.name] = result
+            self._index.add(result.character.name, result.embedding)
+            self._names.add(result.character.name, _names(result.character))
+        return self._index
+    
+    def _search_index(self, index: VectorIndex, embedding, names: Optional[List[str]] = None, k: int = 1) -> List[Tuple[CharacterResult, float]]:
         """
-        Generate an embedding for a character with emphasis on name and aliases.
+        Search the in-memory index, comparing embeddings only with the characters whose names look alike.
         
         Args:
-            character: Character to generate embedding for
+            index: Loaded in-memory similarity index
+            embedding: Query embedding
+            names: Names of the character being matched; without them every character is compared
+            k: Number of neighbours to return
             
         Returns:
-            Embedding vector or None if no embedding model is available
+            (CharacterResult, cosine similarity) pairs, most similar first
         """
-        if not self.embedding_model:
-            return None
-            
-        # Create a brief description from character attributes
+        if names and self.blocking_candidates > 0:
+            keys = [key for key, _ in self._names.search(names, k=self.blocking_candidates)]
+            matches = index.search_keys(embedding, keys, k=k)
+        else:
+            matches = index.search(embedding, k=k)
+        return [(self._entities[name], score) for name, score in matches]
+    
+    def _load_index(self) -> VectorIndex:
+        """Build the in-memory similarity index from the graph on first use."""
+        if self._index is None:
+            self._build_index(self.get_all_characters())
+        return self._index
+    
+    async def aload_index(self) -> VectorIndex:
+        """Build the in-memory similarity index from the graph on first use, without blocking the event loop."""
+        if self._index is None:
+            results = await self.aget_all_characters()
+            # Another coroutine may have finished loading while this one waited
+            if self._index is None:
+                self._build_index(results)
+        return self._index
+    
+    def index_characters(self, characters: List[Tuple[Character, Optional[np.ndarray]]]) -> None:
+        """
+        Bring the in-memory similarity index up to date after characters were written.
+        
+        Args:
+            characters: (Character, embedding) pairs; a None embedding keeps the indexed one
+        """
+        if self._index is None:
+            # Not loaded yet; it will be read from the graph in full when first needed
+            return
+        for character, embedding in characters:
+            previous = self._entities.get(character.name)
+            if embedding is None and previous is not None:
+                embedding = previous.embedding
+            self._entities[character.name] = CharacterResult(character=character, embedding=embedding)
+            if embedding is not None:
+                self._index.add(character.name, embedding)
+                self._names.add(character.name, _names(character))
+    
+    def _embedding_description(self, character: Character) -> str:
+        """Create a brief description from character attributes."""
         description = ""
         if character.physical_desc:
             description += character.physical_desc + " "
@@ -43,6 +178,22 @@ class CharacterService:
             description += character.psychological_desc + " "
         if character.arc:
             description += character.arc
+        return description
+    
+    def generate_character_embedding(self, character: Character) -> Optional[np.ndarray]:
+        """
+        Generate an embedding for a character with emphasis on name and aliases.
+        
+        Args:
+            character: Character to generate embedding for
+            
+        Returns:
+            Embedding vector or None if no embedding model is available
+        """
+        if not self.embedding_model:
+            return None
+            
+        description = self._embedding_description(character)
             
         # For characters with no embedding model, use the regular encode method
         if not hasattr(self.embedding_model, 'encode_entity'):
@@ -62,6 +213,38 @@ class CharacterService:
             weight_desc=1      # Description gets lowest weight
         )
     
+    def generate_character_embeddings(self, characters: List[Character]) -> List[Optional[np.ndarray]]:
+        """
+        Generate embeddings for many characters with a single batched model call.
+        
+        Args:
+            characters: Characters to generate embeddings for
+            
+        Returns:
+            One embedding (or None if no embedding model is available) per character, in input order
+        """
+        if not self.embedding_model or not characters:
+            return [None] * len(characters)
+            
+        # Models without batch support are encoded one at a time
+        if not hasattr(self.embedding_model, 'encode_entities_batch'):
+            return [self.generate_character_embedding(character) for character in characters]
+            
+        embeddings = self.embedding_model.encode_entities_batch(
+            [
+                {
+                    "name": character.name,
+                    "alt_names": character.alt_names,
+                    "description": self._embedding_description(character)
+                }
+                for character in characters
+            ],
+            weight_primary=3,  # Primary name gets highest weight
+            weight_alt=2,      # Aliases get medium weight
+            weight_desc=1      # Description gets lowest weight
+        )
+        return list(embeddings)
+    
     def add_character(self, character: Character, embedding=None):
         """
         Add a character node to the graph with all their properties.
@@ -98,14 +281,18 @@ class CharacterService:
         
         # Add embedding if available
         if embedding is not None:
-            query += ", c.embedding = $embedding"
-            params["embedding"] = embedding.tolist() if hasattr(embedding, "tolist") else embedding
+            query += ", c.embedding = $embedding, c.embedding_bytes = $embedding_bytes, c.embedding_scale = $embedding_scale"
+            params.update(encode_embedding(embedding, self.stored_encoding()))
+        
+        # Keep alias nodes in step with alt_names
+        query += " FOREACH (alias IN $alt_names | MERGE (a:Alias {label: 'Character', name: alias}) MERGE (a)-[:ALIAS_OF]->(c))"
             
         self.connection.driver.execute_query(
             query,
             params,
             database_=self.connection.db_name,
         )
+        self.index_characters([(character, embedding)])
     
     def get_character(self, name: str) -> Optional[CharacterResult]:
         """
@@ -118,14 +305,9 @@ class CharacterService:
             CharacterResult if found, None otherwise
         """
         records, _, _ = self.connection.driver.execute_query(
-            """
-            MATCH (c:Character {name: $name})
-            RETURN c.name as name,
-                   c.arc as arc,
-                   c.physical_desc as physical_desc,
-                   c.psychological_desc as psychological_desc,
-                   c.embedding as embedding,
-                   c.alt_names as alt_names
+            f"""
+            MATCH (c:Character {{name: $name}})
+            RETURN {_CHARACTER_FIELDS}
             """,
             name=name,
             database_=self.connection.db_name,
@@ -134,20 +316,7 @@ class CharacterService:
         
         if not records:
             return None
-            
-        record = records[0]
-        character = Character(
-            name=record["name"],
-            arc=record["arc"],
-            physical_desc=record["physical_desc"],
-            psychological_desc=record["psychological_desc"],
-            alt_names=record["alt_names"]
-        )
-        
-        return CharacterResult(
-            character=character,
-            embedding=record["embedding"]
-        )
+        return _character_result(records[0])
     
     def get_character_by_alias(self, alias: str) -> Optional[CharacterResult]:
         """
@@ -160,15 +329,9 @@ class CharacterService:
             CharacterResult if found, None otherwise
         """
         records, _, _ = self.connection.driver.execute_query(
-            """
-            MATCH (c:Character)
-            WHERE $alias IN c.alt_names
-            RETURN c.name as name,
-                   c.arc as arc,
-                   c.physical_desc as physical_desc,
-                   c.psychological_desc as psychological_desc,
-                   c.embedding as embedding,
-                   c.alt_names as alt_names
+            f"""
+            MATCH (:Alias {{label: 'Character', name: $alias}})-[:ALIAS_OF]->(c:Character)
+            RETURN {_CHARACTER_FIELDS}
             LIMIT 1
             """,
             alias=alias,
@@ -178,20 +341,7 @@ class CharacterService:
         
         if not records:
             return None
-            
-        record = records[0]
-        character = Character(
-            name=record["name"],
-            arc=record["arc"],
-            physical_desc=record["physical_desc"],
-            psychological_desc=record["psychological_desc"],
-            alt_names=record["alt_names"]
-        )
-        
-        return CharacterResult(
-            character=character,
-            embedding=record["embedding"]
-        )
+        return _character_result(records[0])
     
     def get_all_characters(self) -> List[CharacterResult]:
         """
@@ -201,37 +351,125 @@ class CharacterService:
             List of CharacterResult objects
         """
         records, _, _ = self.connection.driver.execute_query(
-            """
-            MATCH (c:Character)
-            WHERE c.embedding IS NOT NULL
-            RETURN c.name as name,
-                   c.arc as arc,
-                   c.physical_desc as physical_desc,
-                   c.psychological_desc as psychological_desc,
-                   c.embedding as embedding,
-                   c.alt_names as alt_names
-            """,
+            _ALL_CHARACTERS_QUERY,
+            database_=self.connection.db_name,
+            routing_=RoutingControl.READ,
+        )
+        return [_character_result(record) for record in records]
+    
+    async def aget_all_characters(self) -> List[CharacterResult]:
+        """Asynchronous get_all_characters."""
+        records, _, _ = await self.connection.async_driver.execute_query(
+            _ALL_CHARACTERS_QUERY,
+            database_=self.connection.db_name,
+            routing_=RoutingControl.READ,
+        )
+        return [_character_result(record) for record in records]
+    
+    def get_characters_by_names(self, names: List[str]) -> Dict[str, CharacterResult]:
+        """
+        Resolve many names in one query, by exact name first and then by alias.
+        
+        Args:
+            names: Names to look up
+            
+        Returns:
+            Dictionary mapping each name that was found to its CharacterResult
+        """
+        if not names:
+            return {}
+            
+        records, _, _ = self.connection.driver.execute_query(
+            _CHARACTERS_BY_NAMES_QUERY,
+            names=list(dict.fromkeys(names)),
             database_=self.connection.db_name,
             routing_=RoutingControl.READ,
         )
+        return {record["lookup"]: _character_result(record) for record in records}
+    
+    async def aget_characters_by_names(self, names: List[str]) -> Dict[str, CharacterResult]:
+        """Asynchronous get_characters_by_names."""
+        if not names:
+            return {}
+            
+        records, _, _ = await self.connection.async_driver.execute_query(
+            _CHARACTERS_BY_NAMES_QUERY,
+            names=list(dict.fromkeys(names)),
+            database_=self.connection.db_name,
+            routing_=RoutingControl.READ,
+        )
+        return {record["lookup"]: _character_result(record) for record in records}
+    
+    def _query_vector_index(self, embedding, k: int = 1) -> List[Tuple[CharacterResult, float]]:
+        """
+        Run a top-k similarity search on the server using the native vector index.
         
-        results = []
+        Args:
+            embedding: Query embedding
+            k: Number of neighbours to return
+            
+        Returns:
+            (CharacterResult, cosine similarity) pairs, most similar first
+        """
+        records, _, _ = self.connection.driver.execute_query(
+            _SIMILAR_CHARACTERS_QUERY,
+            index_name=CHARACTER_VECTOR_INDEX,
+            k=k,
+            embeddings=[_as_list(embedding)],
+            database_=self.connection.db_name,
+            routing_=RoutingControl.READ,
+        )
+        return self._similar_matches(records, 1)[0]
+    
+    @staticmethod
+    def _similar_matches(records, count: int) -> List[List[Tuple[CharacterResult, float]]]:
+        matches = [[] for _ in range(count)]
         for record in records:
-            character = Character(
-                name=record["name"],
-                arc=record["arc"],
-                physical_desc=record["physical_desc"],
-                psychological_desc=record["psychological_desc"],
-                alt_names=record["alt_names"]
-            )
+            # Neo4j reports cosine scores rescaled to [0, 1] as (1 + cos) / 2
+            matches[record["i"]].append((_character_result(record), 2 * record["score"] - 1))
+        for row in matches:
+            row.sort(key=lambda match: -match[1])
+        return matches
+    
+    async def afind_graph_matches(self, embeddings: List[Optional[np.ndarray]], k: int = 1, names: Optional[List[List[str]]] = None) -> List[List[Tuple[CharacterResult, float]]]:
+        """
+        Find the most similar stored characters for many embeddings at once, without blocking the event loop.
+        
+        Uses one vector index query for the whole batch when the native index is
+        enabled, otherwise the in-memory index (loaded asynchronously on first use).
+        
+        Args:
+            embeddings: Query embeddings; None entries get no matches
+            k: Number of neighbours per embedding
+            names: Names of the character behind each embedding, to narrow in-memory matching
+                to characters with similar names (optional)
             
-            results.append(CharacterResult(
-                character=character,
-                embedding=record["embedding"]
-            ))
-        return results
+        Returns:
+            (CharacterResult, cosine similarity) pairs per embedding, most similar first
+        """
+        present = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+        matches: List[List[Tuple[CharacterResult, float]]] = [[] for _ in embeddings]
+        if not present:
+            return matches
+        
+        if self.connection.vector_index_enabled:
+            records, _, _ = await self.connection.async_driver.execute_query(
+                _SIMILAR_CHARACTERS_QUERY,
+                index_name=CHARACTER_VECTOR_INDEX,
+                k=k,
+                embeddings=[_as_list(embeddings[i]) for i in present],
+                database_=self.connection.db_name,
+                routing_=RoutingControl.READ,
+            )
+            for i, row in zip(present, self._similar_matches(records, len(present))):
+                matches[i] = row
+        else:
+            index = await self.aload_index()
+            for i in present:
+                matches[i] = self._search_index(index, embeddings[i], names[i] if names else None, k=k)
+        return matches
     
-    def find_similar_character(self, character_desc: str = None, character: Character = None, embedding=None) -> Optional[CharacterResult]:
+    def find_similar_character(self, character_desc: str = None, character: Character = None, embedding=None, candidates: List[CharacterResult] = None, graph_matches: Optional[List[Tuple[CharacterResult, float]]] = None) -> Optional[CharacterResult]:
         """
         Find the most similar character based on embedding similarity.
         
@@ -239,6 +477,9 @@ class CharacterService:
             character_desc: Textual description of the character (optional)
             character: Character object to match (optional)
             embedding: Pre-computed embedding vector (optional)
+            candidates: Characters not yet written to the graph to compare against as well (optional)
+            graph_matches: Stored characters most similar to the embedding, already looked up
+                (e.g. by afind_graph_matches); the graph isn't queried when given (optional)
             
         Returns:
             CharacterResult with similarity score if found, None if no similar character is found
@@ -256,28 +497,29 @@ class CharacterService:
         if embedding is None:
             return None
             
-        # Get all characters with embeddings
-        all_characters = self.get_all_characters()
-        if not all_characters:
-            return None
-            
-        # Calculate similarity with each character
+        # Search the vector index instead of scanning every node
         max_similarity = 0
         most_similar_character = None
         
-        for char_result in all_characters:
-            char_embedding = char_result.embedding
-            if char_embedding:
-                # Convert embeddings to numpy arrays if they aren't already
-                query_embedding = np.array(embedding).reshape(1, -1)
-                char_embedding = np.array(char_embedding).reshape(1, -1)
-                
-                # Calculate cosine similarity
-                similarity = cosine_similarity(query_embedding, char_embedding)[0][0]
-                
+        if graph_matches is not None:
+            matches = graph_matches
+        elif self.connection.vector_index_enabled:
+            matches = self._query_vector_index(embedding, k=1)
+        else:
+            matches = self._search_index(self._load_index(), embedding, _names(character) if character else None, k=1)
+        if matches:
+            most_similar_character, max_similarity = matches[0]
+        
+        # Entities that aren't in the graph yet are compared directly
+        if candidates:
+            candidate_index = VectorIndex()
+            for candidate in candidates:
+                if candidate.embedding is not None:
+                    candidate_index.add(candidate.character.name, candidate.embedding)
+            for name, similarity in candidate_index.search(embedding, k=1):
                 if similarity > max_similarity:
                     max_similarity = similarity
-                    most_similar_character = char_result
+                    most_similar_character = next(c for c in candidates if c.character.name == name)
         
         # Return the most similar character if it exceeds the threshold
         if max_similarity >= self.similarity_threshold and most_similar_character:
@@ -300,25 +542,7 @@ class CharacterService:
         Returns:
             Updated CharacterResult
         """
-        existing_character = existing_character_result.character
-        
-        # Consolidate character information, prioritizing non-empty values
-        consolidated_char = Character(
-            name=existing_character.name,
-            arc=new_character.arc if (new_character.arc and not existing_character.arc) else existing_character.arc,
-            physical_desc=new_character.physical_desc if (new_character.physical_desc and not existing_character.physical_desc) else existing_character.physical_desc,
-            psychological_desc=new_character.psychological_desc if (new_character.psychological_desc and not existing_character.psychological_desc) else existing_character.psychological_desc,
-            alt_names=existing_character.alt_names or []
-        )
-        
-        # Add the new character name as an alternative name if different
-        if new_character.name != existing_character.name:
-            consolidated_char.add_alt_name(new_character.name)
-        
-        # Add any new alternative names from the new character
-        if new_character.alt_names:
-            for alt_name in new_character.alt_names:
-                consolidated_char.add_alt_name(alt_name)
+        consolidated_char = self.merge_character_data(new_character, existing_character_result.character)
         
         # Update the character in the database
         self.connection.driver.execute_query(
@@ -328,6 +552,7 @@ class CharacterService:
                 c.physical_desc = $physical_desc,
                 c.psychological_desc = $psychological_desc,
                 c.alt_names = $alt_names
+            FOREACH (alias IN $alt_names | MERGE (a:Alias {label: 'Character', name: alias}) MERGE (a)-[:ALIAS_OF]->(c))
             """,
             name=consolidated_char.name,
             arc=consolidated_char.arc,
@@ -337,8 +562,79 @@ class CharacterService:
             database_=self.connection.db_name,
         )
         
+        self.index_characters([(consolidated_char, None)])
+        
         # Return updated result
         return CharacterResult(
             character=consolidated_char,
             embedding=existing_character_result.embedding
-        )
\ No newline at end of file
+        )
+    
+    def merge_character_data(self, new_character: Character, existing_character: Character) -> Character:
+        """
+        Combine a newly extracted character with an existing one without touching the database.
+        
+        Args:
+            new_character: New character information
+            existing_character: Existing character information
+            
+        Returns:
+            Consolidated Character keeping the existing name
+        """
+        # Consolidate character information, prioritizing non-empty values
+        consolidated_char = Character(
+            name=existing_character.name,
+            arc=new_character.arc if (new_character.arc and not existing_character.arc) else existing_character.arc,
+            physical_desc=new_character.physical_desc if (new_character.physical_desc and not existing_character.physical_desc) else existing_character.physical_desc,
+            psychological_desc=new_character.psychological_desc if (new_character.psychological_desc and not existing_character.psychological_desc) else existing_character.psychological_desc,
+            alt_names=list(existing_character.alt_names or [])
+        )
+        
+        # Add the new character name as an alternative name if different
+        if new_character.name != existing_character.name:
+            consolidated_char.add_alt_name(new_character.name)
+        
+        # Add any new alternative names from the new character
+        if new_character.alt_names:
+            for alt_name in new_character.alt_names:
+                consolidated_char.add_alt_name(alt_name)
+        
+        return consolidated_char
+    
+    def _write_rows(self, characters: List[Tuple[Character, Optional[np.ndarray]]]) -> List[dict]:
+        return [
+            {
+                "name": character.name,
+                "arc": character.arc,
+                "physical_desc": character.physical_desc,
+                "psychological_desc": character.psychological_desc,
+                "alt_names": character.alt_names or [],
+                **encode_embedding(embedding, self.stored_encoding())
+            }
+            for character, embedding in characters
+        ]
+    
+    def write_characters(self, tx, characters: List[Tuple[Character, Optional[np.ndarray]]]) -> None:
+        """
+        Create or update many characters with a single UNWIND query inside a transaction.
+        
+        Args:
+            tx: Open Neo4j transaction
+            characters: (Character, embedding) pairs; a None embedding leaves the stored one untouched
+        """
+        if not characters:
+            return
+        tx.run(_WRITE_CHARACTERS_QUERY, rows=self._write_rows(characters)).consume()
+    
+    async def awrite_characters(self, tx, characters: List[Tuple[Character, Optional[np.ndarray]]]) -> None:
+        """
+        Asynchronous write_characters, for a transaction opened on the async driver.
+        
+        Args:
+            tx: Open async Neo4j transaction
+            characters: (Character, embedding) pairs; a None embedding leaves the stored one untouched
+        """
+        if not characters:
+            return
+        result = await tx.run(_WRITE_CHARACTERS_QUERY, rows=self._write_rows(characters))
+        await result.consume()
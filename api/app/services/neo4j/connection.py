@@ -1,27 +1,170 @@
-from neo4j import GraphDatabase
+import logging
+import os
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from app.services.neo4j.schema import ensure_schema
+
+# Route entity similarity search through Neo4j's native vector indexes
+USE_VECTOR_INDEX = os.getenv("NEO4J_VECTOR_INDEX", "false").lower() in ("1", "true", "yes")
+
+CHARACTER_VECTOR_INDEX = "character_embedding"
+LOCATION_VECTOR_INDEX = "location_embedding"
+
+logger = logging.getLogger(__name__)
 
 class Neo4jConnection:
     """Manages connection to the Neo4j database."""
     
-    def __init__(self, uri="bolt://neo4j:7687", auth=("neo4j", "password"), db_name="neo4j"):
+    def __init__(
+        self,
+        uri="bolt://neo4j:7687",
+        auth=("neo4j", "password"),
+        db_name="neo4j",
+        vector_dimensions=None,
+        max_connection_pool_size=50,
+        connection_acquisition_timeout=60.0,
+        connection_timeout=30.0,
+        connect_retries=0
+    ):
         """
         Initialize connection to Neo4j.
         
+        The database check and schema migrations run once here, so a single
+        connection should be created per process and shared between requests.
+        Alongside the synchronous driver, an asynchronous driver with the same
+        settings is opened on first use, so coroutines can query the graph
+        without blocking the event loop.
+        
         Args:
             uri: Neo4j connection URI
             auth: Authentication credentials (username, password)
             db_name: Name of the database to use
+            vector_dimensions: Embedding size; when given, vector indexes are created on
+                Character.embedding and Location.embedding and used for similarity search
+            max_connection_pool_size: Maximum number of pooled Bolt connections
+            connection_acquisition_timeout: Seconds to wait for a free pooled connection
+            connection_timeout: Seconds to wait when opening a new connection
+            connect_retries: Seconds to keep retrying while the server is unreachable
+        
+        Raises:
+            Exception: If a schema migration can't be applied, e.g. because duplicate entity
+                names prevent a uniqueness constraint
         """
-        self.driver = GraphDatabase.driver(uri, auth=auth)
+        self._driver_settings = {
+            "auth": auth,
+            "max_connection_pool_size": max_connection_pool_size,
+            "connection_acquisition_timeout": connection_acquisition_timeout,
+            "connection_timeout": connection_timeout,
+        }
+        self.uri = uri
+        self.driver = GraphDatabase.driver(uri, **self._driver_settings)
+        self._async_driver = None
         self.db_name = db_name
+        self.vector_index_enabled = False
+        
+        # Give a server that is still starting up (e.g. under docker-compose) time to come online
+        self._wait_for_server(connect_retries)
         
         # Create the database if it doesn't exist (only works with Neo4j Enterprise Edition)
         try:
             self._create_database_if_not_exists()
         except Exception as e:
-            print(f"Warning: Could not create database '{db_name}'. Using default 'neo4j' database.")
-            print(f"Error was: {str(e)}")
+            logger.warning(f"Could not create database '{db_name}'; using the default 'neo4j' database. Error was: {str(e)}")
             self.db_name = "neo4j"
+        
+        # Constraints and alias nodes turn name/alias lookups into index seeks. Alias
+        # matching only reads the alias nodes, so running without them would
+        # silently miss every existing alias: refuse to start instead
+        try:
+            applied = ensure_schema(self.driver, self.db_name)
+        except Exception as e:
+            logger.error(
+                f"Could not apply schema migrations to '{self.db_name}': {str(e)}. "
+                "If a uniqueness constraint failed, merge the duplicate Character or Location nodes it reports and restart."
+            )
+            self.driver.close()
+            raise
+        if applied:
+            logger.info(f"Applied schema migrations {applied} to '{self.db_name}'")
+        
+        if vector_dimensions:
+            self.enable_vector_indexes(vector_dimensions)
+    
+    @classmethod
+    def from_env(cls, **kwargs):
+        """
+        Create a connection configured from NEO4J_* environment variables.
+        
+        Args:
+            **kwargs: Overrides for any constructor argument
+            
+        Returns:
+            Neo4jConnection instance
+        """
+        settings = {
+            "uri": os.getenv("NEO4J_URI", "bolt://neo4j:7687"),
+            "auth": (os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD", "password")),
+            "db_name": os.getenv("NEO4J_DATABASE", "story_graph"),
+            "max_connection_pool_size": int(os.getenv("NEO4J_MAX_POOL_SIZE", "50")),
+            "connection_acquisition_timeout": float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60")),
+            "connection_timeout": float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "30")),
+            "connect_retries": int(os.getenv("NEO4J_CONNECT_RETRIES", "30")),
+        }
+        settings.update(kwargs)
+        return cls(**settings)
+    
+    def enable_vector_indexes(self, dimensions: int) -> bool:
+        """
+        Create the entity vector indexes if needed and route similarity search through them.
+        
+        Safe to call on every request; the indexes are only set up once per connection.
+        Only float-list embeddings are indexed, so the entity services store
+        embeddings as lists while the indexes are in use; nodes written earlier
+        as byte arrays are indexed once their embedding is rewritten.
+        
+        Args:
+            dimensions: Embedding size
+            
+        Returns:
+            True if vector indexes are in use
+        """
+        if self.vector_index_enabled:
+            return True
+        try:
+            self._create_vector_indexes(dimensions)
+            self.vector_index_enabled = True
+        except Exception as e:
+            logger.warning(f"Could not create vector indexes; falling back to in-memory similarity search. Error was: {str(e)}")
+        return self.vector_index_enabled
+    
+    def _create_vector_indexes(self, dimensions: int):
+        """Create cosine vector indexes on entity embeddings and wait for them to come online."""
+        for index_name, label in ((CHARACTER_VECTOR_INDEX, "Character"), (LOCATION_VECTOR_INDEX, "Location")):
+            self.driver.execute_query(
+                f"CREATE VECTOR INDEX {index_name} IF NOT EXISTS "
+                f"FOR (n:{label}) ON n.embedding "
+                f"OPTIONS {{indexConfig: {{"
+                f"`vector.dimensions`: {int(dimensions)}, "
+                f"`vector.similarity_function`: 'cosine'"
+                f"}}}}",
+                database_=self.db_name
+            )
+            self.driver.execute_query(
+                "CALL db.awaitIndex($index_name, 60)",
+                index_name=index_name,
+                database_=self.db_name
+            )
+    
+    def _wait_for_server(self, retries: int):
+        """Block until the server accepts connections or the retries run out."""
+        import time
+        for attempt in range(retries + 1):
+            try:
+                self.driver.verify_connectivity()
+                return
+            except Exception:
+                if attempt == retries:
+                    return  # Let the first real query surface the error
+                time.sleep(1)
     
     def _create_database_if_not_exists(self):
         """Check if the database exists and create it if it doesn't."""
@@ -42,7 +185,7 @@ class Neo4jConnection:
                         f"CREATE DATABASE {self.db_name} IF NOT EXISTS",
                         database_="system"
                     )
-                    print(f"Created database '{self.db_name}'")
+                    logger.info(f"Created database '{self.db_name}'")
                     
                     # Wait for the database to be available
                     import time
@@ -52,7 +195,7 @@ class Neo4jConnection:
                                 "RETURN 1",
                                 database_=self.db_name
                             )
-                            print(f"Database '{self.db_name}' is now available")
+                            logger.info(f"Database '{self.db_name}' is now available")
                             return
                         except:
                             time.sleep(1)  # Wait a second before trying again
@@ -66,10 +209,58 @@ class Neo4jConnection:
                 # If it's a different error, re-raise it
                 raise
     
+    @property
+    def async_driver(self):
+        """Asynchronous driver with its own connection pool, created on first use inside the event loop."""
+        if self._async_driver is None:
+            self._async_driver = AsyncGraphDatabase.driver(self.uri, **self._driver_settings)
+        return self._async_driver
+    
+    def session(self, **kwargs):
+        """Open a synchronous session on the connection's database."""
+        return self.driver.session(database=self.db_name, **kwargs)
+    
+    def async_session(self, **kwargs):
+        """Open an asynchronous session on the connection's database."""
+        return self.async_driver.session(database=self.db_name, **kwargs)
+    
+    def execute_write(self, work):
+        """
+        Run a unit of work in a single managed write transaction.
+        
+        Args:
+            work: Function taking a transaction; may be retried on transient errors
+            
+        Returns:
+            Whatever the work function returns
+        """
+        with self.session() as session:
+            return session.execute_write(work)
+    
+    async def aexecute_write(self, work):
+        """
+        Run a unit of work in a single managed write transaction without blocking the event loop.
+        
+        Args:
+            work: Coroutine function taking an async transaction; may be retried on transient errors
+            
+        Returns:
+            Whatever the work function returns
+        """
+        async with self.async_session() as session:
+            return await session.execute_write(work)
+    
     def close(self):
         """Close the driver connection."""
         self.driver.close()
     
+    async def aclose(self):
+        """Close both drivers."""
+        if self._async_driver is not None:
+            await self._async_driver.close()
+            self._async_driver = None
+        self.close()
+    
     def __enter__(self):
         """Enable usage with context manager."""
         return self
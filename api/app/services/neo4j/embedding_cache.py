@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only safe from a single process
+    fcntl = None
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+# Vectors kept on disk per model; when full, the least recently used half is dropped
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "200000"))
+
+class _DiskStore:
+    """
+    Append-only float32 matrix on disk, read through a memory map and compacted when full.
+
+    Each line of the keys file records a key and the row its vector was written
+    to, so a crash between the two appends only leaves an unused row behind.
+    Once max_rows vectors are stored, the most recently used half is copied
+    into a new generation of files and meta.json is switched over atomically.
+    Appends and compactions take an exclusive file lock, so processes sharing
+    a directory never interleave rows; a process reloads when it sees another
+    compact the store, and otherwise only sees rows others added once reopened.
+    """
+
+    def __init__(self, directory: Path, max_rows: int = EMBEDDING_CACHE_MAX_ROWS):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.meta_path = directory / "meta.json"
+        self.lock_path = directory / "lock"
+        self.max_rows = max(2, max_rows)
+        self.dimensions = None
+        self.generation = 0
+        # Least recently used first
+        self.rows: "OrderedDict[str, int]" = OrderedDict()
+        self._mapped = None
+        self._meta_inode = None
+        self._load()
+
+    def _file_path(self, name: str, suffix: str, generation: Optional[int]) -> Path:
+        generation = self.generation if generation is None else generation
+        # Generation 0 keeps the names stores had before compaction existed
+        return self.directory / (f"{name}{suffix}" if generation == 0 else f"{name}-{generation}{suffix}")
+
+    def _vectors_path(self, generation: Optional[int] = None) -> Path:
+        return self._file_path("vectors", ".f32", generation)
+
+    def _keys_path(self, generation: Optional[int] = None) -> Path:
+        return self._file_path("keys", ".txt", generation)
+
+    def _row_bytes(self) -> int:
+        return 4 * self.dimensions
+
+    def _load(self) -> None:
+        self.rows = OrderedDict()
+        self._mapped = None
+        try:
+            with self.meta_path.open() as f:
+                self._meta_inode = os.fstat(f.fileno()).st_ino
+                meta = json.load(f)
+        except FileNotFoundError:
+            self._meta_inode = None
+            return
+        self.dimensions = meta["dimensions"]
+        self.generation = meta.get("generation", 0)
+        vectors_path, keys_path = self._vectors_path(), self._keys_path()
+        if keys_path.exists() and vectors_path.exists():
+            complete_rows = vectors_path.stat().st_size // self._row_bytes()
+            for line in keys_path.read_text().splitlines():
+                parts = line.split()
+                # A key whose vector never fully reached the file is dropped
+                if len(parts) == 2 and parts[0].isdigit() and int(parts[0]) < complete_rows:
+                    self.rows[parts[1]] = int(parts[0])
+
+    def _reload_if_compacted(self) -> None:
+        try:
+            inode = self.meta_path.stat().st_ino
+        except FileNotFoundError:
+            inode = None
+        if inode != self._meta_inode:
+            self._load()
+
+    def _write_meta(self) -> None:
+        temporary = self.meta_path.with_suffix(".tmp")
+        temporary.write_text(json.dumps({"dimensions": self.dimensions, "generation": self.generation}))
+        os.replace(temporary, self.meta_path)
+        self._meta_inode = self.meta_path.stat().st_ino
+
+    @contextmanager
+    def _locked(self):
+        with self.lock_path.open("a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        self._reload_if_compacted()
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        self.rows.move_to_end(key)
+        if self._mapped is None or row >= self._mapped.shape[0]:
+            rows = self._vectors_path().stat().st_size // self._row_bytes()
+            self._mapped = np.memmap(self._vectors_path(), dtype=np.float32, mode="r", shape=(rows, self.dimensions))
+        return np.array(self._mapped[row])
+
+    def _compact(self) -> None:
+        """Keep the most recently used half of the rows in a new generation of files."""
+        keep = list(self.rows.items())[-(self.max_rows // 2):]
+        generation = self.generation + 1
+        old_paths = (self._vectors_path(), self._keys_path())
+        source = np.memmap(old_paths[0], dtype=np.float32, mode="r", shape=(old_paths[0].stat().st_size // self._row_bytes(), self.dimensions))
+        with self._vectors_path(generation).open("wb") as f:
+            for start in range(0, len(keep), 4096):
+                f.write(np.ascontiguousarray(source[[row for _, row in keep[start:start + 4096]]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        del source
+        with self._keys_path(generation).open("w") as f:
+            f.write("".join(f"{row} {key}\n" for row, (key, _) in enumerate(keep)))
+            f.flush()
+            os.fsync(f.fileno())
+        # Switching meta.json over is the commit point; until then readers use the old files
+        self.generation = generation
+        self._write_meta()
+        self.rows = OrderedDict((key, row) for row, (key, _) in enumerate(keep))
+        self._mapped = None
+        for path in old_paths:
+            path.unlink(missing_ok=True)
+
+    def put(self, key: str, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        with self._locked():
+            self._reload_if_compacted()
+            if self.dimensions is None:
+                self.dimensions = vector.shape[0]
+                self._write_meta()
+            if vector.shape[0] != self.dimensions or key in self.rows:
+                return
+            if len(self.rows) >= self.max_rows:
+                self._compact()
+            with self._vectors_path().open("ab") as f:
+                size = f.seek(0, os.SEEK_END)
+                # Cut off a row a crash left half-written so the new one starts on a row boundary
+                if size % self._row_bytes():
+                    size -= size % self._row_bytes()
+                    f.truncate(size)
+                    f.seek(size)
+                f.write(vector.tobytes())
+            row = size // self._row_bytes()
+            with self._keys_path().open("a") as f:
+                f.write(f"{row} {key}\n")
+            self.rows[key] = row
+
+class EmbeddingCache:
+    """Memoises embeddings by text hash in an LRU, optionally persisted to disk."""
+
+    def __init__(self, model_name: str, max_entries: int = EMBEDDING_CACHE_SIZE, directory: Optional[str] = EMBEDDING_CACHE_DIR, max_disk_rows: int = EMBEDDING_CACHE_MAX_ROWS):
+        """
+        Initialize the cache for one embedding model.
+
+        Args:
+            model_name: Name of the model the vectors came from; part of every key
+            max_entries: Number of vectors kept in the in-process LRU
+            directory: Root directory for the on-disk store, or None/"" to keep everything in memory
+            max_disk_rows: Number of vectors kept in the on-disk store
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        if directory:
+            # One store per model, so vectors from different models never mix
+            safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+            self._disk = _DiskStore(Path(directory) / safe_name, max_rows=max_disk_rows)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """
+        Look up the embedding for a text.
+
+        Args:
+            text: Exact text that was encoded
+
+        Returns:
+            Cached embedding, or None if it has never been computed
+        """
+        key = self._key(text)
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                return vector
+            if self._disk is not None:
+                vector = self._disk.get(key)
+                if vector is not None:
+                    self._remember(key, vector)
+            return vector
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up the embeddings for several texts.
+
+        Args:
+            texts: Texts that were encoded
+
+        Returns:
+            Cached embedding or None for each text, in input order
+        """
+        return [self.get(text) for text in texts]
+
+    def put(self, text: str, vector: np.ndarray) -> None:
+        """
+        Store the embedding computed for a text.
+
+        Args:
+            text: Text that was encoded
+            vector: Its embedding
+        """
+        key = self._key(text)
+        with self._lock:
+            self._remember(key, vector)
+            if self._disk is not None:
+                self._disk.put(key, vector)
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
@@ -0,0 +1,64 @@
+import os
+from typing import Any, Dict, Optional
+import numpy as np
+
+# How entity embeddings are stored on nodes: "list" for a list of floats (the default), or
+# opt in to a compact byte array with "float32" or "int8" (quantised with a scale). Nodes
+# stored either way are read back, so the setting can change on an existing graph; a node
+# moves to the new encoding when its embedding is next written. Neo4j's native vector index
+# only indexes float lists, so "list" is always used while it is enabled.
+NEO4J_EMBEDDING_ENCODING = os.getenv("NEO4J_EMBEDDING_ENCODING", "list").lower()
+EMBEDDING_ENCODINGS = ("list", "float32", "int8")
+
+def encode_embedding(embedding, encoding: str = NEO4J_EMBEDDING_ENCODING) -> Dict[str, Any]:
+    """
+    Node properties holding an embedding in the given encoding.
+
+    Every property is returned, with the ones the encoding doesn't use set to
+    None, so that writing them all replaces an embedding stored in another
+    encoding.
+
+    Args:
+        embedding: Embedding vector, or None
+        encoding: One of EMBEDDING_ENCODINGS
+
+    Returns:
+        Values for the embedding, embedding_bytes and embedding_scale properties; all None for a None embedding
+    """
+    if encoding not in EMBEDDING_ENCODINGS:
+        raise ValueError(f"Unknown embedding encoding: {encoding}")
+    properties = {"embedding": None, "embedding_bytes": None, "embedding_scale": None}
+    if embedding is None:
+        return properties
+
+    vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    if encoding == "list":
+        properties["embedding"] = vector.tolist()
+    elif encoding == "float32":
+        properties["embedding_bytes"] = vector.astype("<f4").tobytes()
+    else:
+        # Symmetric per-vector quantisation: the largest component maps to +/-127
+        peak = float(np.abs(vector).max()) if vector.size else 0.0
+        scale = peak / 127 if peak else 1.0
+        properties["embedding_bytes"] = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8).tobytes()
+        properties["embedding_scale"] = scale
+    return properties
+
+def decode_embedding(embedding, scale: Optional[float] = None) -> Optional[np.ndarray]:
+    """
+    Turn a stored embedding back into a float32 vector.
+
+    Args:
+        embedding: Byte array written by encode_embedding, or a list of floats
+        scale: The embedding_scale property; set only for int8 embeddings
+
+    Returns:
+        float32 vector (read-only when decoded from float32 bytes), or None if nothing was stored
+    """
+    if embedding is None:
+        return None
+    if isinstance(embedding, (bytes, bytearray)):
+        if scale is None:
+            return np.frombuffer(embedding, dtype="<f4")
+        return np.frombuffer(embedding, dtype=np.int8).astype(np.float32) * np.float32(scale)
+    return np.asarray(embedding, dtype=np.float32)
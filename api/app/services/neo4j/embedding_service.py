@@ -1,22 +1,57 @@
-from typing import List, Optional
+import threading
+from typing import Any, Dict, List, Optional
 import numpy as np
+from app.services.neo4j.embedding_cache import EmbeddingCache, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_DIR
 
 class EmbeddingService:
     """Service for generating and working with embeddings."""
     
-    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", cache_size=EMBEDDING_CACHE_SIZE, cache_dir=EMBEDDING_CACHE_DIR):
         """
         Initialize the embedding service with a model.
         
         Args:
             model_name: Name of the pre-trained model to use
+            cache_size: Number of embeddings memoised in memory
+            cache_dir: Directory for the persistent embedding cache, or None to keep it in memory only
         """
-        try:
-            from sentence_transformers import SentenceTransformer
-            self.model = SentenceTransformer(model_name)
-        except ImportError:
-            print("SentenceTransformers package not installed. Using fallback embedding method.")
-            self.model = None
+        self.model_name = model_name
+        self.cache = EmbeddingCache(model_name, max_entries=cache_size, directory=cache_dir)
+        self._model = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        """Whether the model has been loaded from disk yet."""
+        return self._loaded
+    
+    @property
+    def model(self):
+        """The SentenceTransformer model, loaded on first use (None if unavailable)."""
+        if not self._loaded:
+            self.load()
+        return self._model
+    
+    def load(self) -> None:
+        """Load the model now rather than on the first encode; safe to call repeatedly."""
+        with self._load_lock:
+            if self._loaded:
+                return
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+            except ImportError:
+                print("SentenceTransformers package not installed. Using fallback embedding method.")
+                self._model = None
+            self._loaded = True
+    
+    @property
+    def dimensions(self) -> int:
+        """Size of the vectors produced by this service."""
+        if self.model is None:
+            return 36  # Size of the fallback character-frequency vector
+        return self.model.get_sentence_embedding_dimension()
     
     def encode(self, text: str) -> Optional[np.ndarray]:
         """
@@ -31,7 +66,58 @@ class EmbeddingService:
         if self.model is None:
             return self._fallback_encode(text)
             
-        return self.model.encode(text)
+        embedding = self.cache.get(text)
+        if embedding is None:
+            embedding = self.model.encode(text)
+            self.cache.put(text, embedding)
+        return embedding
+    
+    def encode_batch(self, texts: List[str], batch_size: int = 64, cached: bool = True) -> np.ndarray:
+        """
+        Generate embeddings for many texts in one batched model call.
+        
+        Args:
+            texts: Texts to encode
+            batch_size: Number of texts the model processes per forward pass
+            cached: Whether to read and fill the embedding cache; turn off for
+                texts that are rarely encoded twice, such as whole chunks
+            
+        Returns:
+            Matrix with one embedding per row, in the order of the input texts
+        """
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        
+        if self.model is None:
+            return np.vstack([self._fallback_encode(text) for text in texts])
+        
+        if not cached:
+            return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+            
+        # Only send texts the cache hasn't seen to the model
+        embeddings = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if missing:
+            encoded = dict(zip(missing, self.model.encode(missing, batch_size=batch_size, convert_to_numpy=True)))
+            for text, embedding in encoded.items():
+                self.cache.put(text, embedding)
+            embeddings = [encoded[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)]
+            
+        return np.vstack(embeddings)
+    
+    def _weighted_entity_text(self, name: str, alt_names: List[str] = None, description: str = "", weight_primary=3, weight_alt=2, weight_desc=1) -> str:
+        """Build text that emphasizes an entity's names over its description."""
+        # Create a weighted text that emphasizes names and aliases
+        weighted_text = name * weight_primary + " "  # Repeat primary name to increase its weight
+        
+        if alt_names:
+            alt_names_text = " ".join(alt_names)
+            weighted_text += (alt_names_text * weight_alt) + " "
+            
+        if description:
+            weighted_text += description * weight_desc
+            
+        return weighted_text
     
     def encode_entity(self, name: str, alt_names: List[str] = None, description: str = "", weight_primary=3, weight_alt=2, weight_desc=1) -> Optional[np.ndarray]:
         """
@@ -51,17 +137,35 @@ class EmbeddingService:
         if self.model is None:
             return self._fallback_encode(name)
             
-        # Create a weighted text that emphasizes names and aliases
-        weighted_text = name * weight_primary + " "  # Repeat primary name to increase its weight
+        return self.encode(self._weighted_entity_text(name, alt_names, description, weight_primary, weight_alt, weight_desc))
+    
+    def encode_entities_batch(self, entities: List[Dict[str, Any]], weight_primary=3, weight_alt=2, weight_desc=1) -> np.ndarray:
+        """
+        Generate weighted entity embeddings for many entities in one batched model call.
         
-        if alt_names:
-            alt_names_text = " ".join(alt_names)
-            weighted_text += (alt_names_text * weight_alt) + " "
+        Args:
+            entities: Dictionaries with "name" and optional "alt_names" and "description" keys
+            weight_primary: Weight multiplier for primary names
+            weight_alt: Weight multiplier for alternative names
+            weight_desc: Weight multiplier for descriptions
             
-        if description:
-            weighted_text += description * weight_desc
+        Returns:
+            Matrix with one embedding per row, in the order of the input entities
+        """
+        if self.model is None:
+            return self.encode_batch([entity["name"] for entity in entities])
             
-        return self.model.encode(weighted_text)
+        return self.encode_batch([
+            self._weighted_entity_text(
+                entity["name"],
+                entity.get("alt_names"),
+                entity.get("description", ""),
+                weight_primary,
+                weight_alt,
+                weight_desc
+            )
+            for entity in entities
+        ])
     
     def _fallback_encode(self, text: str) -> Optional[np.ndarray]:
         """
@@ -118,4 +222,15 @@ class EmbeddingService:
         if norm1 == 0 or norm2 == 0:
             return 0
             
-        return dot_product / (norm1 * norm2)
\ No newline at end of file
+        return dot_product / (norm1 * norm2)
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_embedding_service() -> EmbeddingService:
+    """Return the process-wide embedding service, so the model is only loaded once."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = EmbeddingService()
+        return _service
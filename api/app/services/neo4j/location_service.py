@@ -1,15 +1,80 @@
 from app.models.location_result import LocationResult
 from neo4j import RoutingControl
-from typing import Optional, List, Tuple
+from typing import Optional, List, Dict, Tuple
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from app.models.location import Location
-from app.services.neo4j.connection import Neo4jConnection
+from app.services.neo4j.connection import Neo4jConnection, LOCATION_VECTOR_INDEX
+from app.services.neo4j.embedding_codec import EMBEDDING_ENCODINGS, NEO4J_EMBEDDING_ENCODING, decode_embedding, encode_embedding
+from app.services.vector.name_index import NAME_BLOCKING_CANDIDATES, NameIndex
+from app.services.vector.vector_index import VectorIndex
+
+_LOCATION_FIELDS = """
+    l.name as name,
+    l.description as description,
+    l.significance as significance,
+    coalesce(l.embedding_bytes, l.embedding) as embedding,
+    l.embedding_scale as embedding_scale,
+    l.alt_names as alt_names
+"""
+
+_ALL_LOCATIONS_QUERY = f"""
+    MATCH (l:Location)
+    WHERE l.embedding IS NOT NULL OR l.embedding_bytes IS NOT NULL
+    RETURN {_LOCATION_FIELDS}
+"""
+
+_LOCATIONS_BY_NAMES_QUERY = f"""
+    UNWIND $names AS lookup
+    OPTIONAL MATCH (exact:Location {{name: lookup}})
+    OPTIONAL MATCH (:Alias {{label: 'Location', name: lookup}})-[:ALIAS_OF]->(aliased:Location)
+    WITH lookup, exact, collect(aliased)[0] AS aliased
+    WITH lookup, coalesce(exact, aliased) AS l
+    WHERE l IS NOT NULL
+    RETURN lookup, {_LOCATION_FIELDS}
+"""
+
+_SIMILAR_LOCATIONS_QUERY = f"""
+    UNWIND range(0, size($embeddings) - 1) AS i
+    CALL db.index.vector.queryNodes($index_name, $k, $embeddings[i])
+    YIELD node AS l, score
+    RETURN i, score, {_LOCATION_FIELDS}
+"""
+
+_WRITE_LOCATIONS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (l:Location {name: row.name})
+    SET l.description = row.description,
+        l.significance = row.significance,
+        l.alt_names = row.alt_names
+    FOREACH (_ IN CASE WHEN row.embedding IS NULL AND row.embedding_bytes IS NULL THEN [] ELSE [1] END |
+        SET l.embedding = row.embedding,
+            l.embedding_bytes = row.embedding_bytes,
+            l.embedding_scale = row.embedding_scale)
+    FOREACH (alias IN row.alt_names |
+        MERGE (a:Alias {label: 'Location', name: alias})
+        MERGE (a)-[:ALIAS_OF]->(l))
+"""
+
+def _location_result(record) -> LocationResult:
+    """Build a LocationResult from a record returning the _LOCATION_FIELDS columns."""
+    location = Location(
+        name=record["name"],
+        description=record["description"],
+        significance=record["significance"],
+        alt_names=record["alt_names"]
+    )
+    return LocationResult(location=location, embedding=decode_embedding(record["embedding"], record["embedding_scale"]))
+
+def _names(entity) -> List[str]:
+    return [entity.name] + list(entity.alt_names or [])
+
+def _as_list(embedding) -> list:
+    return embedding.tolist() if hasattr(embedding, "tolist") else list(embedding)
 
 class LocationService:
     """Service for location-related database operations."""
     
-    def __init__(self, connection: Neo4jConnection, embedding_model=None, similarity_threshold=0.85):
+    def __init__(self, connection: Neo4jConnection, embedding_model=None, similarity_threshold=0.85, index_backend="flat", blocking_candidates=NAME_BLOCKING_CANDIDATES, embedding_encoding=NEO4J_EMBEDDING_ENCODING):
         """
         Initialize with a database connection.
         
@@ -17,11 +82,99 @@ class LocationService:
             connection: Neo4j database connection
             embedding_model: Model for generating embeddings from text
             similarity_threshold: Threshold for considering two entities as the same
+            index_backend: Backend for the in-memory similarity index ("flat" or "hnsw")
+            blocking_candidates: Stored locations with the most similar names to compare by embedding
+                when matching in memory; 0 compares against every location
+            embedding_encoding: How embeddings are stored on location nodes ("list", or "float32" or "int8" for compact bytes)
         """
+        if embedding_encoding not in EMBEDDING_ENCODINGS:
+            raise ValueError(f"Unknown embedding encoding: {embedding_encoding}")
         self.connection = connection
         self.embedding_model = embedding_model
         self.similarity_threshold = similarity_threshold
+        self.index_backend = index_backend
+        self.blocking_candidates = blocking_candidates
+        self.embedding_encoding = embedding_encoding
+        self._index: Optional[VectorIndex] = None
+        self._names = NameIndex()
+        self._entities: Dict[str, LocationResult] = {}
+    
+    def stored_encoding(self) -> str:
+        """Encoding used for embeddings written now; Neo4j's vector index only indexes float lists."""
+        return "list" if self.connection.vector_index_enabled else self.embedding_encoding
+    
+    def _build_index(self, results: List[LocationResult]) -> VectorIndex:
+        self._index = VectorIndex(backend=self.index_backend)
+        self._names = NameIndex()
+        for result in results:
+            self._entities[result.location.name] = result
+            self._index.add(result.location.name, result.embedding)
+            self._names.add(result.location.name, _names(result.location))
+        return self._index
+    
+    def _search_index(self, index: VectorIndex, embedding, names: Optional[List[str]] = None, k: int = 1) -> List[Tuple[LocationResult, float]]:
+        """
+        Search the in-memory index, comparing embeddings only with the locations whose names look alike.
+        
+        Args:
+            index: Loaded in-memory similarity index
+            embedding: Query embedding
+            names: Names of the location being matched; without them every location is compared
+            k: Number of neighbours to return
+            
+        Returns:
+            (LocationResult, cosine similarity) pairs, most similar first
+        """
+        if names and self.blocking_candidates > 0:
+            keys = [key for key, _ in self._names.search(names, k=self.blocking_candidates)]
+            matches = index.search_keys(embedding, keys, k=k)
+        else:
+            matches = index.search(embedding, k=k)
+        return [(self._entities[name], score) for name, score in matches]
+    
+    def _load_index(self) -> VectorIndex:
+        """Build the in-memory similarity index from the graph on first use."""
+        if self._index is None:
+            self._build_index(self.get_all_locations())
+        return self._index
+    
+    async def aload_index(self) -> VectorIndex:
+        """Build the in-memory similarity index from the graph on first use, without blocking the event loop."""
+        if self._index is None:
+            results = await self.aget_all_locations()
+            # Another coroutine may have finished loading while this one waited
+            if self._index is None:
+                self._build_index(results)
+        return self._index
+    
+    def index_locations(self, locations: List[Tuple[Location, Optional[np.ndarray]]]) -> None:
+        """
+        Bring the in-memory similarity index up to date after locations were written.
+        
+        Args:
+            locations: (Location, embedding) pairs; a None embedding keeps the indexed one
+        """
+        if self._index is None:
+            # Not loaded yet; it will be read from the graph in full when first needed
+            return
+        for location, embedding in locations:
+            previous = self._entities.get(location.name)
+            if embedding is None and previous is not None:
+                embedding = previous.embedding
+            self._entities[location.name] = LocationResult(location=location, embedding=embedding)
+            if embedding is not None:
+                self._index.add(location.name, embedding)
+                self._names.add(location.name, _names(location))
 
+    def _embedding_description(self, location: Location) -> str:
+        """Create a brief description from location attributes."""
+        description = ""
+        if location.description:
+            description += location.description + " "
+        if location.significance:
+            description += location.significance
+        return description
+    
     def generate_location_embedding(self, location: Location) -> Optional[np.ndarray]:
         """
         Generate an embedding for a location with emphasis on name and aliases.
@@ -35,12 +188,7 @@ class LocationService:
         if not self.embedding_model:
             return None
             
-        # Create a brief description from location attributes
-        description = ""
-        if location.description:
-            description += location.description + " "
-        if location.significance:
-            description += location.significance
+        description = self._embedding_description(location)
             
         # For locations with no embedding model with encode_entity, use the regular encode method
         if not hasattr(self.embedding_model, 'encode_entity'):
@@ -60,6 +208,38 @@ class LocationService:
             weight_desc=1      # Description gets lowest weight
         )
     
+    def generate_location_embeddings(self, locations: List[Location]) -> List[Optional[np.ndarray]]:
+        """
+        Generate embeddings for many locations with a single batched model call.
+        
+        Args:
+            locations: Locations to generate embeddings for
+            
+        Returns:
+            One embedding (or None if no embedding model is available) per location, in input order
+        """
+        if not self.embedding_model or not locations:
+            return [None] * len(locations)
+            
+        # Models without batch support are encoded one at a time
+        if not hasattr(self.embedding_model, 'encode_entities_batch'):
+            return [self.generate_location_embedding(location) for location in locations]
+            
+        embeddings = self.embedding_model.encode_entities_batch(
+            [
+                {
+                    "name": location.name,
+                    "alt_names": location.alt_names,
+                    "description": self._embedding_description(location)
+                }
+                for location in locations
+            ],
+            weight_primary=3,  # Primary name gets highest weight
+            weight_alt=2,      # Aliases get medium weight
+            weight_desc=1      # Description gets lowest weight
+        )
+        return list(embeddings)
+    
     def add_location(self, location: Location, embedding=None):
         """
         Add a location node to the graph with all its properties.
@@ -94,14 +274,18 @@ class LocationService:
         
         # Add embedding if available
         if embedding is not None:
-            query += ", l.embedding = $embedding"
-            params["embedding"] = embedding.tolist() if hasattr(embedding, "tolist") else embedding
+            query += ", l.embedding = $embedding, l.embedding_bytes = $embedding_bytes, l.embedding_scale = $embedding_scale"
+            params.update(encode_embedding(embedding, self.stored_encoding()))
+        
+        # Keep alias nodes in step with alt_names
+        query += " FOREACH (alias IN $alt_names | MERGE (a:Alias {label: 'Location', name: alias}) MERGE (a)-[:ALIAS_OF]->(l))"
             
         self.connection.driver.execute_query(
             query,
             params,
             database_=self.connection.db_name,
         )
+        self.index_locations([(location, embedding)])
     
     def get_location(self, name: str) -> Optional[LocationResult]:
         """
@@ -114,13 +298,9 @@ class LocationService:
             LocationResult if found, None otherwise
         """
         records, _, _ = self.connection.driver.execute_query(
-            """
-            MATCH (l:Location {name: $name})
-            RETURN l.name as name,
-                   l.description as description,
-                   l.significance as significance,
-                   l.embedding as embedding,
-                   l.alt_names as alt_names
+            f"""
+            MATCH (l:Location {{name: $name}})
+            RETURN {_LOCATION_FIELDS}
             """,
             name=name,
             database_=self.connection.db_name,
@@ -129,19 +309,7 @@ class LocationService:
         
         if not records:
             return None
-            
-        record = records[0]
-        location = Location(
-            name=record["name"],
-            description=record["description"],
-            significance=record["significance"],
-            alt_names=record["alt_names"]
-        )
-        
-        return LocationResult(
-            location=location,
-            embedding=record["embedding"]
-        )
+        return _location_result(records[0])
     
     def get_location_by_alias(self, alias: str) -> Optional[LocationResult]:
         """
@@ -154,14 +322,9 @@ class LocationService:
             LocationResult if found, None otherwise
         """
         records, _, _ = self.connection.driver.execute_query(
-            """
-            MATCH (l:Location)
-            WHERE $alias IN l.alt_names
-            RETURN l.name as name,
-                   l.description as description,
-                   l.significance as significance,
-                   l.embedding as embedding,
-                   l.alt_names as alt_names
+            f"""
+            MATCH (:Alias {{label: 'Location', name: $alias}})-[:ALIAS_OF]->(l:Location)
+            RETURN {_LOCATION_FIELDS}
             LIMIT 1
             """,
             alias=alias,
@@ -171,19 +334,7 @@ class LocationService:
         
         if not records:
             return None
-            
-        record = records[0]
-        location = Location(
-            name=record["name"],
-            description=record["description"],
-            significance=record["significance"],
-            alt_names=record["alt_names"]
-        )
-        
-        return LocationResult(
-            location=location,
-            embedding=record["embedding"]
-        )
+        return _location_result(records[0])
     
     def get_all_locations(self) -> List[LocationResult]:
         """
@@ -193,35 +344,125 @@ class LocationService:
             List of LocationResult objects
         """
         records, _, _ = self.connection.driver.execute_query(
-            """
-            MATCH (l:Location)
-            WHERE l.embedding IS NOT NULL
-            RETURN l.name as name,
-                   l.description as description,
-                   l.significance as significance,
-                   l.embedding as embedding,
-                   l.alt_names as alt_names
-            """,
+            _ALL_LOCATIONS_QUERY,
+            database_=self.connection.db_name,
+            routing_=RoutingControl.READ,
+        )
+        return [_location_result(record) for record in records]
+    
+    async def aget_all_locations(self) -> List[LocationResult]:
+        """Asynchronous get_all_locations."""
+        records, _, _ = await self.connection.async_driver.execute_query(
+            _ALL_LOCATIONS_QUERY,
+            database_=self.connection.db_name,
+            routing_=RoutingControl.READ,
+        )
+        return [_location_result(record) for record in records]
+    
+    def get_locations_by_names(self, names: List[str]) -> Dict[str, LocationResult]:
+        """
+        Resolve many names in one query, by exact name first and then by alias.
+        
+        Args:
+            names: Names to look up
+            
+        Returns:
+            Dictionary mapping each name that was found to its LocationResult
+        """
+        if not names:
+            return {}
+            
+        records, _, _ = self.connection.driver.execute_query(
+            _LOCATIONS_BY_NAMES_QUERY,
+            names=list(dict.fromkeys(names)),
+            database_=self.connection.db_name,
+            routing_=RoutingControl.READ,
+        )
+        return {record["lookup"]: _location_result(record) for record in records}
+    
+    async def aget_locations_by_names(self, names: List[str]) -> Dict[str, LocationResult]:
+        """Asynchronous get_locations_by_names."""
+        if not names:
+            return {}
+            
+        records, _, _ = await self.connection.async_driver.execute_query(
+            _LOCATIONS_BY_NAMES_QUERY,
+            names=list(dict.fromkeys(names)),
             database_=self.connection.db_name,
             routing_=RoutingControl.READ,
         )
+        return {record["lookup"]: _location_result(record) for record in records}
+    
+    def _query_vector_index(self, embedding, k: int = 1) -> List[Tuple[LocationResult, float]]:
+        """
+        Run a top-k similarity search on the server using the native vector index.
         
-        results = []
+        Args:
+            embedding: Query embedding
+            k: Number of neighbours to return
+            
+        Returns:
+            (LocationResult, cosine similarity) pairs, most similar first
+        """
+        records, _, _ = self.connection.driver.execute_query(
+            _SIMILAR_LOCATIONS_QUERY,
+            index_name=LOCATION_VECTOR_INDEX,
+            k=k,
+            embeddings=[_as_list(embedding)],
+            database_=self.connection.db_name,
+            routing_=RoutingControl.READ,
+        )
+        return self._similar_matches(records, 1)[0]
+    
+    @staticmethod
+    def _similar_matches(records, count: int) -> List[List[Tuple[LocationResult, float]]]:
+        matches = [[] for _ in range(count)]
         for record in records:
-            location = Location(
-                name=record["name"],
-                description=record["description"],
-                significance=record["significance"],
-                alt_names=record["alt_names"]
-            )
+            # Neo4j reports cosine scores rescaled to [0, 1] as (1 + cos) / 2
+            matches[record["i"]].append((_location_result(record), 2 * record["score"] - 1))
+        for row in matches:
+            row.sort(key=lambda match: -match[1])
+        return matches
+    
+    async def afind_graph_matches(self, embeddings: List[Optional[np.ndarray]], k: int = 1, names: Optional[List[List[str]]] = None) -> List[List[Tuple[LocationResult, float]]]:
+        """
+        Find the most similar stored locations for many embeddings at once, without blocking the event loop.
+        
+        Uses one vector index query for the whole batch when the native index is
+        enabled, otherwise the in-memory index (loaded asynchronously on first use).
+        
+        Args:
+            embeddings: Query embeddings; None entries get no matches
+            k: Number of neighbours per embedding
+            names: Names of the location behind each embedding, to narrow in-memory matching
+                to locations with similar names (optional)
             
-            results.append(LocationResult(
-                location=location,
-                embedding=record["embedding"]
-            ))
-        return results
+        Returns:
+            (LocationResult, cosine similarity) pairs per embedding, most similar first
+        """
+        present = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+        matches: List[List[Tuple[LocationResult, float]]] = [[] for _ in embeddings]
+        if not present:
+            return matches
+        
+        if self.connection.vector_index_enabled:
+            records, _, _ = await self.connection.async_driver.execute_query(
+                _SIMILAR_LOCATIONS_QUERY,
+                index_name=LOCATION_VECTOR_INDEX,
+                k=k,
+                embeddings=[_as_list(embeddings[i]) for i in present],
+                database_=self.connection.db_name,
+                routing_=RoutingControl.READ,
+            )
+            for i, row in zip(present, self._similar_matches(records, len(present))):
+                matches[i] = row
+        else:
+            index = await self.aload_index()
+            for i in present:
+                matches[i] = self._search_index(index, embeddings[i], names[i] if names else None, k=k)
+        return matches
     
-    def find_similar_location(self, location_desc: str = None, location: Location = None, embedding=None) -> Optional[LocationResult]:
+    def find_similar_location(self, location_desc: str = None, location: Location = None, embedding=None, candidates: List[LocationResult] = None, graph_matches: Optional[List[Tuple[LocationResult, float]]] = None) -> Optional[LocationResult]:
         """
         Find the most similar location based on embedding similarity.
         
@@ -229,6 +470,9 @@ class LocationService:
             location_desc: Textual description of the location (optional)
             location: Location object to match (optional)
             embedding: Pre-computed embedding vector (optional)
+            candidates: Locations not yet written to the graph to compare against as well (optional)
+            graph_matches: Stored locations most similar to the embedding, already looked up
+                (e.g. by afind_graph_matches); the graph isn't queried when given (optional)
             
         Returns:
             LocationResult with similarity score if found, None if no similar location is found
@@ -246,28 +490,29 @@ class LocationService:
         if embedding is None:
             return None
             
-        # Get all locations with embeddings
-        all_locations = self.get_all_locations()
-        if not all_locations:
-            return None
-            
-        # Calculate similarity with each location
+        # Search the vector index instead of scanning every node
         max_similarity = 0
         most_similar_location = None
         
-        for loc_result in all_locations:
-            loc_embedding = loc_result.embedding
-            if loc_embedding:
-                # Convert embeddings to numpy arrays if they aren't already
-                query_embedding = np.array(embedding).reshape(1, -1)
-                loc_embedding = np.array(loc_embedding).reshape(1, -1)
-                
-                # Calculate cosine similarity
-                similarity = cosine_similarity(query_embedding, loc_embedding)[0][0]
-                
+        if graph_matches is not None:
+            matches = graph_matches
+        elif self.connection.vector_index_enabled:
+            matches = self._query_vector_index(embedding, k=1)
+        else:
+            matches = self._search_index(self._load_index(), embedding, _names(location) if location else None, k=1)
+        if matches:
+            most_similar_location, max_similarity = matches[0]
+        
+        # Entities that aren't in the graph yet are compared directly
+        if candidates:
+            candidate_index = VectorIndex()
+            for candidate in candidates:
+                if candidate.embedding is not None:
+                    candidate_index.add(candidate.location.name, candidate.embedding)
+            for name, similarity in candidate_index.search(embedding, k=1):
                 if similarity > max_similarity:
                     max_similarity = similarity
-                    most_similar_location = loc_result
+                    most_similar_location = next(c for c in candidates if c.location.name == name)
         
         # Return the most similar location if it exceeds the threshold
         if max_similarity >= self.similarity_threshold and most_similar_location:
@@ -290,24 +535,7 @@ class LocationService:
         Returns:
             Updated LocationResult
         """
-        existing_location = existing_location_result.location
-        
-        # Consolidate location information, prioritizing non-empty values
-        consolidated_loc = Location(
-            name=existing_location.name,
-            description=new_location.description if (new_location.description and not existing_location.description) else existing_location.description,
-            significance=new_location.significance if (new_location.significance and not existing_location.significance) else existing_location.significance,
-            alt_names=existing_location.alt_names or []
-        )
-        
-        # Add the new location name as an alternative name if different
-        if new_location.name != existing_location.name:
-            consolidated_loc.add_alt_name(new_location.name)
-        
-        # Add any new alternative names from the new location
-        if new_location.alt_names:
-            for alt_name in new_location.alt_names:
-                consolidated_loc.add_alt_name(alt_name)
+        consolidated_loc = self.merge_location_data(new_location, existing_location_result.location)
         
         # Update the location in the database
         self.connection.driver.execute_query(
@@ -316,6 +544,7 @@ class LocationService:
             SET l.description = $description,
                 l.significance = $significance,
                 l.alt_names = $alt_names
+            FOREACH (alias IN $alt_names | MERGE (a:Alias {label: 'Location', name: alias}) MERGE (a)-[:ALIAS_OF]->(l))
             """,
             name=consolidated_loc.name,
             description=consolidated_loc.description,
@@ -324,8 +553,77 @@ class LocationService:
             database_=self.connection.db_name,
         )
         
+        self.index_locations([(consolidated_loc, None)])
+        
         # Return updated result
         return LocationResult(
             location=consolidated_loc,
             embedding=existing_location_result.embedding
-        )
\ No newline at end of file
+        )
+    
+    def merge_location_data(self, new_location: Location, existing_location: Location) -> Location:
+        """
+        Combine a newly extracted location with an existing one without touching the database.
+        
+        Args:
+            new_location: New location information
+            existing_location: Existing location information
+            
+        Returns:
+            Consolidated Location keeping the existing name
+        """
+        # Consolidate location information, prioritizing non-empty values
+        consolidated_loc = Location(
+            name=existing_location.name,
+            description=new_location.description if (new_location.description and not existing_location.description) else existing_location.description,
+            significance=new_location.significance if (new_location.significance and not existing_location.significance) else existing_location.significance,
+            alt_names=list(existing_location.alt_names or [])
+        )
+        
+        # Add the new location name as an alternative name if different
+        if new_location.name != existing_location.name:
+            consolidated_loc.add_alt_name(new_location.name)
+        
+        # Add any new alternative names from the new location
+        if new_location.alt_names:
+            for alt_name in new_location.alt_names:
+                consolidated_loc.add_alt_name(alt_name)
+        
+        return consolidated_loc
+    
+    def _write_rows(self, locations: List[Tuple[Location, Optional[np.ndarray]]]) -> List[dict]:
+        return [
+            {
+                "name": location.name,
+                "description": location.description,
+                "significance": location.significance,
+                "alt_names": location.alt_names or [],
+                **encode_embedding(embedding, self.stored_encoding())
+            }
+            for location, embedding in locations
+        ]
+    
+    def write_locations(self, tx, locations: List[Tuple[Location, Optional[np.ndarray]]]) -> None:
+        """
+        Create or update many locations with a single UNWIND query inside a transaction.
+        
+        Args:
+            tx: Open Neo4j transaction
+            locations: (Location, embedding) pairs; a None embedding leaves the stored one untouched
+        """
+        if not locations:
+            return
+        tx.run(_WRITE_LOCATIONS_QUERY, rows=self._write_rows(locations)).consume()
+    
+    async def awrite_locations(self, tx, locations: List[Tuple[Location, Optional[np.ndarray]]]) -> None:
+        """
+        Asynchronous write_locations, for a transaction opened on the async driver.
+        
+        Args:
+            tx: Open async Neo4j transaction
+            locations: (Location, embedding) pairs; a None embedding leaves the stored one untouched
+        """
+        if not locations:
+            return
+        result = await tx.run(_WRITE_LOCATIONS_QUERY, rows=self._write_rows(locations))
+        await result.consume()
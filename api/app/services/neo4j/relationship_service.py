@@ -1,3 +1,4 @@
+from typing import Dict, List, Tuple
 from app.models.relationship import Relationship
 from app.services.neo4j.connection import Neo4jConnection
 
@@ -45,4 +46,52 @@ class RelationshipService:
             query, 
             params, 
             database_=self.connection.db_name
-        )
\ No newline at end of file
+        )
+    
+    def _write_queries(self, relationships: List[Relationship]) -> List[Tuple[str, List[dict]]]:
+        """Build one UNWIND query and its rows per relationship type."""
+        # Relationship types can't be parameterised, so group rows by type
+        rows_by_type: Dict[str, List[dict]] = {}
+        for relationship in relationships:
+            rows_by_type.setdefault(relationship.type, []).append({
+                "source": relationship.source,
+                "target": relationship.target,
+                "properties": relationship.properties or {}
+            })
+        
+        queries = []
+        for rel_type, rows in rows_by_type.items():
+            target_label = "Character" if rel_type == "character_to_character" else "Location"
+            escaped_type = rel_type.replace("`", "``")
+            queries.append((
+                f"UNWIND $rows AS row "
+                f"MERGE (a:Character {{name: row.source}}) "
+                f"MERGE (b:{target_label} {{name: row.target}}) "
+                f"MERGE (a)-[r:`{escaped_type}`]->(b) "
+                f"SET r += row.properties",
+                rows,
+            ))
+        return queries
+    
+    def write_relationships(self, tx, relationships: List[Relationship]) -> None:
+        """
+        Create many relationships inside a transaction, with one UNWIND query per relationship type.
+        
+        Args:
+            tx: Open Neo4j transaction
+            relationships: Relationship objects to add
+        """
+        for query, rows in self._write_queries(relationships):
+            tx.run(query, rows=rows).consume()
+    
+    async def awrite_relationships(self, tx, relationships: List[Relationship]) -> None:
+        """
+        Asynchronous write_relationships, for a transaction opened on the async driver.
+        
+        Args:
+            tx: Open async Neo4j transaction
+            relationships: Relationship objects to add
+        """
+        for query, rows in self._write_queries(relationships):
+            result = await tx.run(query, rows=rows)
+            await result.consume()
@@ -0,0 +1,63 @@
+from typing import List, Tuple
+
+# Ordered, append-only list of (version, statements). Every statement must be
+# idempotent, so a partially applied migration can simply be run again.
+MIGRATIONS: List[Tuple[int, List[str]]] = [
+    (1, [
+        # Aliases live in their own nodes so alias lookups are index seeks
+        "CREATE CONSTRAINT alias_unique IF NOT EXISTS "
+        "FOR (a:Alias) REQUIRE (a.label, a.name) IS UNIQUE",
+        # Backfill alias nodes from the alt_names already stored on entities
+        """
+        MATCH (c:Character)
+        WHERE c.alt_names IS NOT NULL
+        UNWIND c.alt_names AS alias
+        MERGE (a:Alias {label: 'Character', name: alias})
+        MERGE (a)-[:ALIAS_OF]->(c)
+        """,
+        """
+        MATCH (l:Location)
+        WHERE l.alt_names IS NOT NULL
+        UNWIND l.alt_names AS alias
+        MERGE (a:Alias {label: 'Location', name: alias})
+        MERGE (a)-[:ALIAS_OF]->(l)
+        """,
+        # Exact-name lookups and relationship MERGEs become index seeks; these fail on a
+        # graph with duplicate names, so they come after the alias backfill
+        "CREATE CONSTRAINT character_name_unique IF NOT EXISTS "
+        "FOR (c:Character) REQUIRE c.name IS UNIQUE",
+        "CREATE CONSTRAINT location_name_unique IF NOT EXISTS "
+        "FOR (l:Location) REQUIRE l.name IS UNIQUE",
+    ]),
+]
+
+def ensure_schema(driver, db_name: str) -> List[int]:
+    """
+    Apply any schema migrations that haven't been recorded in the database yet.
+
+    Args:
+        driver: Neo4j driver
+        db_name: Name of the database to migrate
+
+    Returns:
+        Versions that were applied by this call
+    """
+    records, _, _ = driver.execute_query(
+        "MATCH (m:SchemaMigration) RETURN m.version AS version",
+        database_=db_name,
+    )
+    applied_versions = {record["version"] for record in records}
+
+    applied = []
+    for version, statements in MIGRATIONS:
+        if version in applied_versions:
+            continue
+        for statement in statements:
+            driver.execute_query(statement, database_=db_name)
+        driver.execute_query(
+            "MERGE (m:SchemaMigration {version: $version}) SET m.applied_at = datetime()",
+            version=version,
+            database_=db_name,
+        )
+        applied.append(version)
+    return applied
@@ -0,0 +1,96 @@
+import hashlib
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.services.pinecone.pinecone_adapter import PINECONE_DIMENSIONS, PINECONE_INDEX_NAME, PINECONE_NAMESPACE
+from app.services.vector.vector_index import normalize
+from app.services.vector.vector_store import IndexStats, NamespaceStats, QueryResult, VectorMatch, VectorStore, matches_filter
+
+_TOKEN = re.compile(r"\w+")
+
+def hashed_embeddings(texts: List[str], dimensions: int) -> np.ndarray:
+    """
+    Embed texts by hashing their words into buckets, so texts match on shared vocabulary.
+
+    Args:
+        texts: Texts to embed
+        dimensions: Number of buckets
+
+    Returns:
+        Unit-length float32 matrix with one row per text
+    """
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in _TOKEN.findall(text.lower()):
+            bucket = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            matrix[row, bucket % dimensions] += 1.0
+    return normalize(matrix)
+
+class InMemoryPineconeAdapter(VectorStore):
+    """
+    Stand-in for PineconeAdapter that keeps everything in memory, for tests and benchmarks.
+
+    Texts are embedded with hashed_embeddings. Optional latency and visibility
+    delay mimic a remote index whose writes take a while to become queryable.
+    """
+
+    def __init__(self, index_name=PINECONE_INDEX_NAME, namespace=PINECONE_NAMESPACE, dimensions=PINECONE_DIMENSIONS, latency: float = 0.0, visibility_delay: float = 0.0):
+        """
+        Initialize an empty store.
+
+        Args:
+            index_name: Name reported for the index
+            namespace: Default namespace for writes and queries
+            dimensions: Embedding size
+            latency: Seconds each upsert request takes
+            visibility_delay: Seconds before upserted records show up in stats and queries
+        """
+        self.index_name = index_name
+        self.namespace = namespace
+        self.dimensions = dimensions
+        self.latency = latency
+        self.visibility_delay = visibility_delay
+        self.requests = 0
+        self._namespaces: Dict[str, Dict[str, Tuple[np.ndarray, Dict[str, Any], float]]] = {}
+        self._lock = threading.Lock()
+
+    def create_index(self):
+        pass
+
+    def upsert_batch(self, data: List[Dict[str, Any]], namespace: Optional[str] = None) -> int:
+        if not data:
+            return 0
+        embeddings = hashed_embeddings([d['text'] for d in data], self.dimensions)
+        if self.latency:
+            time.sleep(self.latency)
+        visible_at = time.monotonic() + self.visibility_delay
+        with self._lock:
+            self.requests += 1
+            records = self._namespaces.setdefault(namespace or self.namespace, {})
+            for d, embedding in zip(data, embeddings):
+                records[d['id']] = (embedding, {**d.get('metadata', {}), 'text': d['text']}, visible_at)
+        return len(data)
+
+    def _visible(self, namespace: str) -> Dict[str, Tuple[np.ndarray, Dict[str, Any], float]]:
+        now = time.monotonic()
+        with self._lock:
+            return {key: value for key, value in self._namespaces.get(namespace, {}).items() if value[2] <= now}
+
+    def query_index(self, query, top_k=3, filter=None, namespace=None):
+        namespace = namespace or self.namespace
+        records = {key: value for key, value in self._visible(namespace).items() if matches_filter(value[1], filter)}
+        matches = []
+        if records:
+            keys = list(records)
+            matrix = np.stack([records[key][0] for key in keys])
+            scores = matrix @ hashed_embeddings([query], self.dimensions)[0]
+            for row in np.argsort(-scores)[:top_k]:
+                matches.append(VectorMatch(keys[row], float(scores[row]), records[keys[row]][1]))
+        return QueryResult(namespace, matches)
+
+    def get_index_stats(self):
+        with self._lock:
+            names = list(self._namespaces)
+        return IndexStats(self.dimensions, {name: NamespaceStats(len(self._visible(name))) for name in names})
@@ -1,56 +1,74 @@
-
 import os
-from pinecone.grpc import PineconeGRPC as Pinecone
-from pinecone import ServerlessSpec
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
-import time
+from app.services.vector.vector_store import VECTOR_STORE_READY_TIMEOUT, VectorStore, poll_until
+
+PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "example-index")
+PINECONE_NAMESPACE = os.getenv("PINECONE_NAMESPACE", "example-namespace")
+PINECONE_DIMENSIONS = int(os.getenv("PINECONE_DIMENSIONS", "1024"))
+PINECONE_EMBED_MODEL = os.getenv("PINECONE_EMBED_MODEL", "multilingual-e5-large")
 
-class PineconeAdapter:
-    def __init__(self, index_name='example-index', namespace='example-namespace'):
+class PineconeAdapter(VectorStore):
+    """Vector store on a Pinecone index, embedding with Pinecone's hosted inference."""
+
+    def __init__(self, index_name=PINECONE_INDEX_NAME, namespace=PINECONE_NAMESPACE, dimensions=PINECONE_DIMENSIONS):
         load_dotenv()
+        # Imported here so the local stores work without the Pinecone client
+        from pinecone.grpc import PineconeGRPC as Pinecone
         PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
         self.pc = Pinecone(api_key=PINECONE_API_KEY)
         self.index_name = index_name
         self.namespace = namespace
+        self.dimensions = dimensions
+        self._index = None
 
     def create_index(self):
+        from pinecone import ServerlessSpec
         if not self.pc.has_index(self.index_name):
             self.pc.create_index(
                 name=self.index_name,
-                dimension=1024,
+                dimension=self.dimensions,
                 metric='cosine',
                 spec=ServerlessSpec(
                     cloud='aws',
                     region='us-east-1'
                 )
             )
-            while not self.pc.describe_index(self.index_name).status['ready']:
-                time.sleep(1)
+        if not poll_until(lambda: self.pc.describe_index(self.index_name).status['ready']):
+            raise TimeoutError(f"Pinecone index {self.index_name} not ready after {VECTOR_STORE_READY_TIMEOUT}s")
 
     def get_index(self):
-        return self.pc.Index(self.index_name)
+        # Reuse one index handle, and so one gRPC channel, for every request
+        if self._index is None:
+            self._index = self.pc.Index(self.index_name)
+        return self._index
 
-    def embed_texts(self, texts, model='multilingual-e5-large', input_type='passage', truncate='END'):
+    def embed_texts(self, texts, model=PINECONE_EMBED_MODEL, input_type='passage', truncate='END'):
         return self.pc.inference.embed(
             model=model,
             inputs=texts,
             parameters={'input_type': input_type, 'truncate': truncate}
         )
 
-    def upsert_data(self, data):
+    def upsert_batch(self, data: List[Dict[str, Any]], namespace: Optional[str] = None) -> int:
+        if not data:
+            return 0
         embeddings = self.embed_texts([d['text'] for d in data])
-        records = [{'id': d['id'], 'values': e['values'], 'metadata': {'text': d['text']}} for d, e in zip(data, embeddings)]
-        index = self.get_index()
-        index.upsert(vectors=records, namespace=self.namespace)
-        time.sleep(10)
+        records = [
+            {'id': d['id'], 'values': e['values'], 'metadata': {**d.get('metadata', {}), 'text': d['text']}}
+            for d, e in zip(data, embeddings)
+        ]
+        self.get_index().upsert(vectors=records, namespace=namespace or self.namespace, show_progress=False)
+        return len(data)
 
-    def query_index(self, query, top_k=3, model='multilingual-e5-large'):
+    def query_index(self, query, top_k=3, filter=None, namespace=None, model=PINECONE_EMBED_MODEL):
         query_embedding = self.embed_texts([query], model=model, input_type='query')[0]
         index = self.get_index()
         return index.query(
-            namespace=self.namespace,
+            namespace=namespace or self.namespace,
             vector=query_embedding['values'],
             top_k=top_k,
+            filter=filter,
             include_values=False,
             include_metadata=True
         )
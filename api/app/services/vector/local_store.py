@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.services.vector.vector_index import normalize
+from app.services.vector.vector_store import IndexStats, NamespaceStats, QueryResult, VectorMatch, VectorStore, matches_filter
+
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", ".cache/vector_store")
+VECTOR_STORE_INDEX_BACKEND = os.getenv("VECTOR_STORE_INDEX_BACKEND", "hnsw")
+# Up to this many candidate vectors, exact search is about as fast as the ANN index
+VECTOR_STORE_EXACT_SEARCH_MAX = int(os.getenv("VECTOR_STORE_EXACT_SEARCH_MAX", "20000"))
+
+class _Namespace:
+    """Vectors of one namespace in a memory-mapped float32 file, with their ids, metadata and ANN index."""
+
+    def __init__(self, path: Path, dimensions: int, hnswlib=None, initial_capacity: int = 1024):
+        self.path = path
+        self.dimensions = dimensions
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.metadata: List[Dict[str, Any]] = []
+        self.capacity = max(initial_capacity, path.stat().st_size // (4 * dimensions) if path.exists() else 0)
+        self.vectors = self._map(self.capacity)
+        self._hnswlib = hnswlib
+        self.hnsw = None
+        # Rows matching recently used filters; any write invalidates them
+        self._filter_rows: Dict[str, np.ndarray] = {}
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def _map(self, capacity: int) -> np.memmap:
+        size = capacity * self.dimensions * 4
+        with open(self.path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dimensions))
+
+    def _grow(self, needed: int) -> None:
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        self.vectors.flush()
+        del self.vectors
+        self.capacity = capacity
+        self.vectors = self._map(capacity)
+        if self.hnsw is not None:
+            self.hnsw.resize_index(capacity)
+
+    def load(self, records: List[Tuple[str, int, str]]) -> None:
+        """Restore ids and metadata from (id, row, metadata JSON) rows, then build the ANN index."""
+        for key, row, metadata in sorted(records, key=lambda record: record[1]):
+            self.rows[key] = row
+            self.ids.append(key)
+            self.metadata.append(json.loads(metadata))
+        self.build_index()
+
+    def build_index(self) -> None:
+        if self._hnswlib is None:
+            return
+        self.hnsw = self._hnswlib.Index(space="ip", dim=self.dimensions)
+        self.hnsw.init_index(max_elements=self.capacity, ef_construction=200, M=16)
+        self.hnsw.set_ef(64)
+        if self.count:
+            self.hnsw.add_items(np.asarray(self.vectors[:self.count]), np.arange(self.count))
+
+    def write(self, keys: List[str], vectors: np.ndarray, metadata: List[Dict[str, Any]]) -> List[int]:
+        """Insert or replace vectors; returns the row of each."""
+        self._filter_rows.clear()
+        rows = []
+        for key, meta in zip(keys, metadata):
+            row = self.rows.get(key)
+            if row is None:
+                row = self.count
+                self.rows[key] = row
+                self.ids.append(key)
+                self.metadata.append(meta)
+            else:
+                self.metadata[row] = meta
+            rows.append(row)
+        self._grow(self.count)
+        self.vectors[rows] = vectors
+        self.vectors.flush()
+        if self.hnsw is not None:
+            self.hnsw.add_items(vectors, rows)
+        return rows
+
+    def _exact(self, query: np.ndarray, k: int, candidates: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        if candidates is None:
+            scores = self.vectors[:self.count] @ query
+            rows = np.arange(self.count)
+        else:
+            scores = self.vectors[candidates] @ query
+            rows = candidates
+        if len(rows) == 0:
+            return []
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def _approximate(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        k = min(k, self.count)
+        self.hnsw.set_ef(max(64, k))
+        labels, distances = self.hnsw.knn_query(query.reshape(1, -1), k=k)
+        # Inner-product space reports 1 - dot as the distance
+        return [(int(row), float(1.0 - distance)) for row, distance in zip(labels[0], distances[0])]
+
+    def _matching_rows(self, filter: Dict[str, Any]) -> np.ndarray:
+        key = json.dumps(filter, sort_keys=True, default=str)
+        rows = self._filter_rows.get(key)
+        if rows is None:
+            rows = np.array([row for row, meta in enumerate(self.metadata) if matches_filter(meta, filter)], dtype=np.int64)
+            if len(self._filter_rows) >= 64:
+                self._filter_rows.pop(next(iter(self._filter_rows)))
+            self._filter_rows[key] = rows
+        return rows
+
+    def search(self, query: np.ndarray, k: int, filter: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        """
+        Find the rows most similar to a unit-length query.
+
+        Small candidate sets are scanned exactly; larger ones go through the ANN
+        index, over-fetching when a filter is applied and falling back to an
+        exact scan if too few results pass it.
+        """
+        if self.count == 0 or k <= 0:
+            return []
+        if not filter:
+            if self.hnsw is None or self.count <= VECTOR_STORE_EXACT_SEARCH_MAX:
+                return self._exact(query, k)
+            return self._approximate(query, k)
+
+        candidates = self._matching_rows(filter)
+        if self.hnsw is None or len(candidates) <= VECTOR_STORE_EXACT_SEARCH_MAX:
+            return self._exact(query, k, candidates)
+        allowed = set(candidates.tolist())
+        # Over-fetch in proportion to how selective the filter is
+        fetch = min(self.count, k * max(2, 2 * self.count // len(candidates)))
+        results = [(row, score) for row, score in self._approximate(query, fetch) if row in allowed]
+        if len(results) < k:
+            return self._exact(query, k, candidates)
+        return results[:k]
+
+    def close(self) -> None:
+        self.vectors.flush()
+        del self.vectors
+
+class LocalVectorStore(VectorStore):
+    """
+    Vector store on local disk, for air-gapped deployments and tests.
+
+    Each namespace keeps its vectors in a memory-mapped float32 file, so the
+    operating system pages them in on demand, with an HNSW index (via hnswlib,
+    when installed) for large namespaces. Ids, metadata and texts are kept in
+    SQLite next to them; metadata is also held in memory for filtering.
+    """
+
+    def __init__(
+        self,
+        directory: str = VECTOR_STORE_DIR,
+        index_name: str = "chunks",
+        namespace: str = "default",
+        dimensions: Optional[int] = None,
+        embedder: Optional[Callable[[List[str]], np.ndarray]] = None,
+        backend: str = VECTOR_STORE_INDEX_BACKEND
+    ):
+        """
+        Initialize the store; nothing is opened until create_index.
+
+        Args:
+            directory: Directory holding one subdirectory per index
+            index_name: Name of the index
+            namespace: Default namespace for writes and queries
+            dimensions: Embedding size (defaults to the embedder's)
+            embedder: Function from texts to a matrix of embeddings (defaults to
+                the shared sentence embedding service, bypassing its cache)
+            backend: "hnsw" for an approximate index over large namespaces (falls
+                back to exact search if hnswlib is not installed), or "flat"
+        """
+        self.directory = Path(directory) / index_name
+        self.index_name = index_name
+        self.namespace = namespace
+        self.dimensions = dimensions
+        self._embedder = embedder
+        self._hnswlib = None
+        if backend == "hnsw":
+            try:
+                import hnswlib
+                self._hnswlib = hnswlib
+            except ImportError:
+                print("hnswlib package not installed. Using exact vector search.")
+        self._db = None
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.Lock()
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        if self._embedder is None:
+            from app.services.neo4j.embedding_service import get_embedding_service
+            service = get_embedding_service()
+            # Chunk texts would only crowd entity names out of the embedding cache
+            self._embedder = lambda texts: service.encode_batch(texts, cached=False)
+        return normalize(self._embedder(texts))
+
+    def create_index(self):
+        with self._lock:
+            if self._db is not None:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.directory / "records.sqlite3", check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS records (
+                    namespace TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    row INTEGER NOT NULL,
+                    metadata TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (namespace, id)
+                );
+            """)
+            stored = db.execute("SELECT value FROM settings WHERE key = 'dimensions'").fetchone()
+            if stored is not None:
+                if self.dimensions is not None and self.dimensions != int(stored[0]):
+                    raise ValueError(f"Index {self.index_name} holds {stored[0]}-dimensional vectors, not {self.dimensions}")
+                self.dimensions = int(stored[0])
+            self._db = db
+            if self.dimensions is not None:
+                self._open_namespaces()
+
+    def _open_namespaces(self) -> None:
+        self._db.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('dimensions', ?)", (str(self.dimensions),))
+        records: Dict[str, List[Tuple[str, int, str]]] = {}
+        for namespace, key, row, metadata in self._db.execute("SELECT namespace, id, row, metadata FROM records"):
+            records.setdefault(namespace, []).append((key, row, metadata))
+        for namespace, rows in records.items():
+            self._namespace(namespace).load(rows)
+
+    def _namespace(self, name: str) -> _Namespace:
+        namespace = self._namespaces.get(name)
+        if namespace is None:
+            path = self.directory / f"{hashlib.sha1(name.encode('utf-8')).hexdigest()[:16]}.f32"
+            namespace = _Namespace(path, self.dimensions, self._hnswlib)
+            self._namespaces[name] = namespace
+        return namespace
+
+    def upsert_batch(self, data: List[Dict[str, Any]], namespace: Optional[str] = None) -> int:
+        if not data:
+            return 0
+        self.create_index()
+        # Embed outside the lock, so concurrent batches overlap their model calls
+        vectors = self.embed_texts([d['text'] for d in data])
+        name = namespace or self.namespace
+        metadata = [d.get('metadata', {}) for d in data]
+        with self._lock:
+            if self.dimensions is None:
+                self.dimensions = vectors.shape[1]
+                self._open_namespaces()
+            if vectors.shape[1] != self.dimensions:
+                raise ValueError(f"Expected {self.dimensions}-dimensional embeddings, got {vectors.shape[1]}")
+            rows = self._namespace(name).write([d['id'] for d in data], vectors, metadata)
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO records (namespace, id, row, metadata, text) VALUES (?, ?, ?, ?, ?)",
+                [(name, d['id'], row, json.dumps(meta), d['text']) for d, row, meta in zip(data, rows, metadata)]
+            )
+            self._db.execute("COMMIT")
+        return len(data)
+
+    def query_index(self, query, top_k=3, filter=None, namespace=None):
+        self.create_index()
+        name = namespace or self.namespace
+        vector = self.embed_texts([query])[0]
+        with self._lock:
+            store = self._namespaces.get(name)
+            if store is None:
+                return QueryResult(name, [])
+            results = store.search(vector, top_k, filter)
+            keys = [(store.ids[row], score, store.metadata[row]) for row, score in results]
+            texts = dict(self._db.execute(
+                f"SELECT id, text FROM records WHERE namespace = ? AND id IN ({','.join('?' * len(keys))})",
+                [name] + [key for key, _, _ in keys]
+            ).fetchall()) if keys else {}
+        return QueryResult(name, [VectorMatch(key, score, {**meta, 'text': texts.get(key, '')}) for key, score, meta in keys])
+
+    def get_index_stats(self):
+        self.create_index()
+        with self._lock:
+            return IndexStats(self.dimensions or 0, {name: NamespaceStats(store.count) for name, store in self._namespaces.items()})
+
+    def close(self) -> None:
+        with self._lock:
+            for store in self._namespaces.values():
+                store.close()
+            self._namespaces = {}
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,129 @@
+import heapq
+import os
+import re
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+# Stored entities whose names look most like a new entity's are the only ones compared by embedding; 0 compares all
+NAME_BLOCKING_CANDIDATES = int(os.getenv("NAME_BLOCKING_CANDIDATES", "10"))
+NAME_BLOCKING_MIN_SCORE = 0.2
+# Trigrams on more names than this are too common to find candidates with
+NAME_INDEX_MAX_POSTINGS = 64
+
+# Titles and filler words that don't identify anyone on their own
+_HONORIFICS = {
+    "mr", "mrs", "ms", "miss", "mx", "master", "mister", "madam", "madame", "mme", "mlle",
+    "dr", "doctor", "prof", "professor", "rev", "reverend", "sir", "dame", "lady", "lord",
+    "capt", "captain", "col", "colonel", "gen", "general", "lt", "lieutenant",
+}
+_STOPWORDS = {"the", "a", "an", "of"}
+_POSSESSIVE = re.compile(r"['’]s\b")
+_NON_WORD = re.compile(r"[\W_]+")
+
+def normalize_name(name: str) -> str:
+    """
+    Reduce a name to a canonical form for fuzzy comparison.
+
+    Lowercases, strips accents, possessives and punctuation, and drops
+    filler words ("the", "of") and then honorifics ("Mr.", "Lady") unless
+    nothing else is left, so "Mr. Knightley's" and "mr knightley" both become
+    "knightley" and "the Captain" becomes "captain".
+
+    Args:
+        name: Name as extracted
+
+    Returns:
+        Space-separated tokens, or an empty string if the name has no letters or digits
+    """
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in name if not unicodedata.combining(char)).lower()
+    tokens = _NON_WORD.sub(" ", _POSSESSIVE.sub("", name)).split()
+    for ignored in (_STOPWORDS, _HONORIFICS):
+        tokens = [token for token in tokens if token not in ignored] or tokens
+    return " ".join(tokens)
+
+def name_trigrams(normalized: str) -> FrozenSet[str]:
+    """Character trigrams of each token of a normalised name, with word boundaries marked by '#'."""
+    grams = set()
+    for token in normalized.split():
+        padded = f"#{token}#"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+class NameIndex:
+    """
+    Inverted trigram index over entity names, for picking fuzzy-match candidates cheaply.
+
+    Each key (an entity's canonical name) is indexed under all its names.
+    Names are scored by trigram overlap, so near-identical spellings, aliases
+    that share a surname and names with or without a title all rank highly,
+    without looking at embeddings.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[str, FrozenSet[str]]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._variants: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._variants)
+
+    def add(self, key: str, names: Iterable[str]) -> None:
+        """
+        Index a key under more names; names it already has are kept.
+
+        Args:
+            key: Identifier returned by searches
+            names: Names the entity is known by
+        """
+        variants = self._variants.setdefault(key, set())
+        for name in names:
+            normalized = normalize_name(name) if name else ""
+            if not normalized or normalized in variants:
+                continue
+            variants.add(normalized)
+            entry = len(self._entries)
+            grams = name_trigrams(normalized)
+            self._entries.append((key, grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(entry)
+
+    def search(self, names: Iterable[str], k: int = NAME_BLOCKING_CANDIDATES, min_score: float = NAME_BLOCKING_MIN_SCORE) -> List[Tuple[str, float]]:
+        """
+        Find the keys whose names look most like any of the given names.
+
+        A name pair scores the mean of its trigram overlap coefficient and
+        Jaccard similarity, so a name contained in a longer one ("Emma" in
+        "Emma Woodhouse") still ranks above unrelated names.
+
+        Args:
+            names: Names of the entity to match
+            k: Number of keys to return
+            min_score: Lowest score worth returning
+
+        Returns:
+            (key, score) pairs, best first
+        """
+        best: Dict[str, float] = {}
+        for normalized in {normalize_name(name) for name in names if name}:
+            grams = name_trigrams(normalized)
+            # Gather candidates from the rarest trigrams; a trigram shared by a large share of
+            # all names (a common first name) only adds candidates if nothing rarer matched
+            entries: Set[int] = set()
+            for gram in sorted(grams, key=lambda gram: len(self._postings.get(gram, ()))):
+                postings = self._postings.get(gram)
+                if not postings:
+                    continue
+                if entries and len(postings) > NAME_INDEX_MAX_POSTINGS:
+                    break
+                entries.update(postings)
+            for entry in entries:
+                key, entry_grams = self._entries[entry]
+                count = len(grams & entry_grams)
+                overlap = count / min(len(grams), len(entry_grams))
+                jaccard = count / (len(grams) + len(entry_grams) - count)
+                score = (overlap + jaccard) / 2
+                if score > best.get(key, 0.0):
+                    best[key] = score
+        ranked = heapq.nlargest(k, ((score, key) for key, score in best.items() if score >= min_score))
+        return [(key, score) for score, key in ranked]
@@ -0,0 +1,166 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale vectors to unit length so that dot products are cosine similarities.
+
+    Args:
+        vectors: 1D vector or 2D matrix of row vectors
+
+    Returns:
+        float32 array of the same shape; zero vectors are left as zeros
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class VectorIndex:
+    """In-memory cosine-similarity index over keyed vectors."""
+
+    def __init__(self, dimensions: Optional[int] = None, backend: str = "flat", initial_capacity: int = 256):
+        """
+        Initialize an empty index.
+
+        Args:
+            dimensions: Vector size; inferred from the first vector added if omitted
+            backend: "flat" for exact vectorised search, or "hnsw" for approximate search
+                via hnswlib (falls back to flat if hnswlib is not installed)
+            initial_capacity: Number of rows to allocate up front
+        """
+        self.dimensions = dimensions
+        self._capacity = max(1, initial_capacity)
+        self._matrix = None
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._hnsw = None
+
+        if backend == "hnsw":
+            try:
+                import hnswlib
+                self._hnswlib = hnswlib
+                self.backend = "hnsw"
+            except ImportError:
+                print("hnswlib package not installed. Using flat vector index.")
+                self.backend = "flat"
+        else:
+            self.backend = "flat"
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def _allocate(self, dimensions: int) -> None:
+        self.dimensions = dimensions
+        self._matrix = np.zeros((self._capacity, dimensions), dtype=np.float32)
+        if self.backend == "hnsw":
+            self._hnsw = self._hnswlib.Index(space="ip", dim=dimensions)
+            self._hnsw.init_index(max_elements=self._capacity, ef_construction=200, M=16)
+            self._hnsw.set_ef(64)
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        matrix = np.zeros((self._capacity, self.dimensions), dtype=np.float32)
+        matrix[:len(self._keys)] = self._matrix[:len(self._keys)]
+        self._matrix = matrix
+        if self._hnsw is not None:
+            self._hnsw.resize_index(self._capacity)
+
+    def add(self, key: str, vector) -> None:
+        """
+        Insert a vector, or replace the vector already stored under the key.
+
+        Args:
+            key: Identifier returned by searches
+            vector: Embedding vector
+        """
+        vector = normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        if self._matrix is None:
+            self._allocate(vector.shape[0])
+        if vector.shape[0] != self.dimensions:
+            raise ValueError(f"Expected a {self.dimensions}-dimensional vector, got {vector.shape[0]}")
+
+        row = self._rows.get(key)
+        if row is None:
+            if len(self._keys) == self._capacity:
+                self._grow()
+            row = len(self._keys)
+            self._keys.append(key)
+            self._rows[key] = row
+
+        self._matrix[row] = vector
+        if self._hnsw is not None:
+            self._hnsw.add_items(vector.reshape(1, -1), [row])
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Return the normalised vector stored under a key.
+
+        Args:
+            key: Identifier of the vector
+
+        Returns:
+            Unit-length float32 vector, or None if the key is unknown
+        """
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        return self._matrix[row]
+
+    def search(self, vector, k: int = 1) -> List[Tuple[str, float]]:
+        """
+        Find the stored vectors most similar to the query.
+
+        Args:
+            vector: Query embedding
+            k: Number of results to return
+
+        Returns:
+            (key, cosine similarity) pairs, most similar first
+        """
+        count = len(self._keys)
+        if count == 0 or k <= 0:
+            return []
+        k = min(k, count)
+        query = normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        if query.shape[0] != self.dimensions:
+            raise ValueError(f"Expected a {self.dimensions}-dimensional vector, got {query.shape[0]}")
+
+        if self._hnsw is not None:
+            labels, distances = self._hnsw.knn_query(query.reshape(1, -1), k=k)
+            # Inner-product space reports 1 - dot as the distance
+            return [(self._keys[row], float(1.0 - dist)) for row, dist in zip(labels[0], distances[0])]
+
+        scores = self._matrix[:count] @ query
+        if k < count:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(count)
+        top = top[np.argsort(-scores[top])]
+        return [(self._keys[row], float(scores[row])) for row in top]
+
+    def search_keys(self, vector, keys: List[str], k: int = 1) -> List[Tuple[str, float]]:
+        """
+        Find the most similar vectors among the given keys only, scoring them exactly.
+
+        Args:
+            vector: Query embedding
+            keys: Keys to compare against; unknown keys are ignored
+            k: Number of results to return
+
+        Returns:
+            (key, cosine similarity) pairs, most similar first
+        """
+        rows = [self._rows[key] for key in dict.fromkeys(keys) if key in self._rows]
+        if not rows or k <= 0:
+            return []
+        query = normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        if query.shape[0] != self.dimensions:
+            raise ValueError(f"Expected a {self.dimensions}-dimensional vector, got {query.shape[0]}")
+
+        scores = self._matrix[rows] @ query
+        top = np.argsort(-scores)[:k]
+        return [(self._keys[rows[i]], float(scores[i])) for i in top]
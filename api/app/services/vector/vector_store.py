@@ -0,0 +1,222 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Records per embed + upsert request, and how many requests run at once
+VECTOR_STORE_UPSERT_BATCH_SIZE = int(os.getenv("VECTOR_STORE_UPSERT_BATCH_SIZE", "64"))
+VECTOR_STORE_UPSERT_CONCURRENCY = int(os.getenv("VECTOR_STORE_UPSERT_CONCURRENCY", "4"))
+
+# Readiness polling: first delay, growth factor and cap, and how long to wait overall
+VECTOR_STORE_POLL_INTERVAL = float(os.getenv("VECTOR_STORE_POLL_INTERVAL", "0.5"))
+VECTOR_STORE_POLL_BACKOFF = 1.5
+VECTOR_STORE_POLL_MAX_INTERVAL = 5.0
+VECTOR_STORE_READY_TIMEOUT = float(os.getenv("VECTOR_STORE_READY_TIMEOUT", "120"))
+
+def batched(items: List[Any], batch_size: int) -> List[List[Any]]:
+    """Split a list into consecutive batches of at most batch_size items."""
+    batch_size = max(1, batch_size)
+    return [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+
+def poll_until(condition: Callable[[], bool], timeout: float = VECTOR_STORE_READY_TIMEOUT, interval: float = VECTOR_STORE_POLL_INTERVAL) -> bool:
+    """
+    Call condition() with growing delays until it is true or the timeout passes.
+
+    Returns:
+        Whether the condition became true
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if condition():
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        interval = min(interval * VECTOR_STORE_POLL_BACKOFF, VECTOR_STORE_POLL_MAX_INTERVAL)
+
+_COMPARISONS = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+    "$exists": lambda value, operand: (value is not None) == operand,
+}
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate a Pinecone-style metadata filter against one record's metadata.
+
+    Supports field equality ({"book": "emma.txt"}), the operators $eq, $ne,
+    $gt, $gte, $lt, $lte, $in, $nin and $exists, and $and / $or over lists of
+    filters. List-valued fields match if any element matches.
+
+    Args:
+        metadata: Record metadata
+        filter: Filter expression, or None to match everything
+
+    Returns:
+        Whether the record matches
+    """
+    if not filter:
+        return True
+    for field, condition in filter.items():
+        if field == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif field == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        else:
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            value = metadata.get(field)
+            for operator, operand in condition.items():
+                compare = _COMPARISONS.get(operator)
+                if compare is None:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                if isinstance(value, list) and operator not in ("$exists", "$ne", "$nin"):
+                    matched = any(compare(item, operand) for item in value)
+                elif isinstance(value, list) and operator in ("$ne", "$nin"):
+                    matched = all(compare(item, operand) for item in value)
+                else:
+                    matched = compare(value, operand)
+                if not matched:
+                    return False
+    return True
+
+class VectorMatch:
+    """One record returned by a query."""
+
+    def __init__(self, id: str, score: float, metadata: Optional[Dict[str, Any]] = None):
+        self.id = id
+        self.score = score
+        self.metadata = metadata or {}
+
+class QueryResult:
+    """Records most similar to a query, best first."""
+
+    def __init__(self, namespace: str, matches: List[VectorMatch]):
+        self.namespace = namespace
+        self.matches = matches
+
+class NamespaceStats:
+    def __init__(self, vector_count: int):
+        self.vector_count = vector_count
+
+class IndexStats:
+    """Size of an index and of each of its namespaces."""
+
+    def __init__(self, dimension: int, namespaces: Dict[str, NamespaceStats]):
+        self.dimension = dimension
+        self.namespaces = namespaces
+        self.total_vector_count = sum(namespace.vector_count for namespace in namespaces.values())
+
+class VectorStore:
+    """
+    Text store with similarity search; subclasses wrap a hosted or local index.
+
+    Records are dictionaries with an "id", the "text" to embed and optional
+    "metadata"; the text is stored in the metadata alongside it. Every call
+    works on the store's default namespace unless another is given. Results
+    have the shape of Pinecone's responses (.matches with .id, .score and
+    .metadata; .namespaces with .vector_count), so callers can switch stores.
+    """
+
+    namespace = "default"
+
+    def create_index(self) -> None:
+        """Create the index if it doesn't exist and wait until it is ready."""
+        raise NotImplementedError
+
+    def upsert_batch(self, data: List[Dict[str, Any]], namespace: Optional[str] = None) -> int:
+        """
+        Embed and upsert one batch of records in a single request.
+
+        Args:
+            data: Records with "id", "text" and optional "metadata"
+            namespace: Namespace to write to (defaults to the store's)
+
+        Returns:
+            Number of records upserted
+        """
+        raise NotImplementedError
+
+    def query_index(self, query: str, top_k: int = 3, filter: Optional[Dict[str, Any]] = None, namespace: Optional[str] = None):
+        """
+        Find the records most similar to a query text.
+
+        Args:
+            query: Query text
+            top_k: Number of records to return
+            filter: Metadata filter (see matches_filter)
+            namespace: Namespace to search (defaults to the store's)
+
+        Returns:
+            Query result with .matches, most similar first
+        """
+        raise NotImplementedError
+
+    def get_index_stats(self):
+        """Return index statistics with .dimension, .namespaces and .total_vector_count."""
+        raise NotImplementedError
+
+    def upsert_data(self, data, batch_size: int = VECTOR_STORE_UPSERT_BATCH_SIZE, namespace: Optional[str] = None) -> int:
+        """
+        Embed and upsert records in batches.
+
+        Upserts may take a moment to become visible to queries; call
+        wait_for_vectors to block until they are, instead of sleeping.
+
+        Args:
+            data: Records with "id", "text" and optional "metadata"
+            batch_size: Records per request
+            namespace: Namespace to write to (defaults to the store's)
+
+        Returns:
+            Number of records upserted
+        """
+        return sum(self.upsert_batch(batch, namespace=namespace) for batch in batched(list(data), batch_size))
+
+    async def aupsert_data(self, data, batch_size: int = VECTOR_STORE_UPSERT_BATCH_SIZE, concurrency: int = VECTOR_STORE_UPSERT_CONCURRENCY, namespace: Optional[str] = None) -> int:
+        """
+        Embed and upsert records in batches, running several requests at once.
+
+        Args:
+            data: Records with "id", "text" and optional "metadata"
+            batch_size: Records per request
+            concurrency: Requests in flight at once
+            namespace: Namespace to write to (defaults to the store's)
+
+        Returns:
+            Number of records upserted
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def upsert(batch):
+            async with semaphore:
+                return await asyncio.to_thread(self.upsert_batch, batch, namespace)
+
+        counts = await asyncio.gather(*(upsert(batch) for batch in batched(list(data), batch_size)))
+        return sum(counts)
+
+    def vector_count(self, namespace: Optional[str] = None) -> int:
+        """Number of vectors visible in a namespace (defaults to the store's)."""
+        namespaces = self.get_index_stats().namespaces or {}
+        stats = namespaces.get(namespace or self.namespace)
+        return stats.vector_count if stats else 0
+
+    def wait_for_vectors(self, count: int, timeout: float = VECTOR_STORE_READY_TIMEOUT, namespace: Optional[str] = None) -> bool:
+        """
+        Poll the index until a namespace holds at least count vectors.
+
+        Returns:
+            Whether the count was reached before the timeout
+        """
+        return poll_until(lambda: self.vector_count(namespace) >= count, timeout=timeout)
+
+    def close(self) -> None:
+        """Release files or connections held by the store."""
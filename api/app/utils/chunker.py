@@ -0,0 +1,263 @@
+import os
+import re
+import threading
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
+
+CHUNK_TARGET_TOKENS = int(os.getenv("CHUNK_TARGET_TOKENS", "2500"))
+# A chunk is only closed early at a boundary once it holds this share of the target
+CHUNK_MIN_FILL = float(os.getenv("CHUNK_MIN_FILL", "0.5"))
+CHUNK_TOKENIZER_MODEL = os.getenv("CHUNK_TOKENIZER_MODEL", "gpt-4o")
+
+# Boundary strengths, weakest first; a chunk is cut at the strongest boundary available
+TOKEN, SENTENCE, PARAGRAPH, PAGE, CHAPTER = range(5)
+
+# Strength of the boundary between consecutive text blocks, by block kind
+BLOCK_BOUNDARIES = {
+    "document": CHAPTER,  # EPUB spine items
+    "page": PAGE,         # PDF pages
+    "slice": PARAGRAPH,   # newline-aligned slices of a text file
+}
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|(?<=[.!?][\"'”’)])\s+")
+_NUMBER_WORDS = (
+    "one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|thirteen|fourteen|"
+    "fifteen|sixteen|seventeen|eighteen|nineteen|twenty|thirty|forty|fifty"
+)
+# A heading line: "Chapter 12", "PART II", "Book One: The Road", "Prologue" or a bare "XIV".
+# Numerals are upper case only, and a title after the number has to follow a separator or
+# start with a capital and hold no sentence break, so prose like "Part of him wanted to
+# leave." or "Book in hand, she ran." isn't taken for a chapter break.
+_HEADING = re.compile(
+    rf"^\s*(?:(?i:chapter|book|part)\s+(?:\d{{1,4}}|[IVXLC]+|(?i:(?:{_NUMBER_WORDS})(?:-(?:{_NUMBER_WORDS}))?))"
+    r"|(?i:prologue|epilogue)|[IVXLC]{2,}\.?)"
+    r"(?:\s*[:.\-–—]\s*[^.!?\n]{1,60}|\s+[^a-z\s.!?,;:][^.!?\n]{0,60})?"
+    r"[.:]?\s*$"
+)
+_WORD_PIECES = re.compile(r"\w+|[^\w\s]")
+
+class TokenCounter:
+    """Counts and splits text in the tokens of the extraction model."""
+
+    def __init__(self, model_name: str = CHUNK_TOKENIZER_MODEL):
+        """
+        Initialize the counter, falling back to an estimate if the tokenizer is unavailable.
+
+        Args:
+            model_name: Model whose tokenizer to use
+        """
+        self.model_name = model_name
+        try:
+            import tiktoken
+            self.encoding = tiktoken.encoding_for_model(model_name)
+        except Exception as e:
+            # tiktoken is missing, or its encoding files can't be downloaded
+            print(f"Tokenizer for {model_name} unavailable ({e}). Estimating token counts.")
+            self.encoding = None
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        """
+        Count the tokens in several texts.
+
+        Args:
+            texts: Texts to count
+
+        Returns:
+            Token count for each text, in input order
+        """
+        if self.encoding is None:
+            # Roughly one token per word or punctuation mark, and at least one per four characters
+            return [max(len(_WORD_PIECES.findall(text)), len(text) // 4) for text in texts]
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        """
+        Cut text that has no usable boundaries into pieces of at most max_tokens tokens.
+
+        Args:
+            text: Text to cut
+            max_tokens: Token budget per piece
+
+        Returns:
+            Pieces in order
+        """
+        if self.encoding is None:
+            size = max(1, max_tokens * 4)
+            return [text[i:i + size] for i in range(0, len(text), size)]
+        tokens = self.encoding.encode_ordinary(text)
+        return [self.encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+_counter = None
+_counter_lock = threading.Lock()
+
+def get_token_counter() -> TokenCounter:
+    """Return the process-wide token counter, so the tokenizer is only loaded once."""
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            _counter = TokenCounter()
+        return _counter
+
+class _Unit:
+    """Smallest piece the chunker moves around: usually one sentence."""
+
+    __slots__ = ("text", "tokens", "strength", "separator")
+
+    def __init__(self, text: str, tokens: int, strength: int, separator: str):
+        self.text = text
+        self.tokens = tokens
+        self.strength = strength    # Strength of the boundary before this unit
+        self.separator = separator  # Whitespace restored before this unit when joined
+
+class StructuredChunker:
+    """Packs text blocks into chunks of about a target token count, cutting at natural boundaries."""
+
+    def __init__(
+        self,
+        target_tokens: int = CHUNK_TARGET_TOKENS,
+        block_kind: str = "page",
+        min_fill: float = CHUNK_MIN_FILL,
+        counter: Optional[TokenCounter] = None
+    ):
+        """
+        Initialize the chunker.
+
+        Args:
+            target_tokens: Maximum tokens per chunk
+            block_kind: What a block is ("document", "page" or "slice"); decides how
+                strongly the chunker prefers to cut between blocks
+            min_fill: Share of target_tokens a chunk must hold before it is cut
+                anywhere other than right at the limit
+            counter: Token counter (defaults to the process-wide one)
+        """
+        self.target_tokens = max(1, target_tokens)
+        self.block_boundary = BLOCK_BOUNDARIES.get(block_kind, PAGE)
+        self.min_tokens = int(self.target_tokens * min_fill)
+        self.counter = counter or get_token_counter()
+        self._units: List[_Unit] = []
+        self._tokens = 0
+        self._started = False
+
+    def _segment(self, block: str) -> List[_Unit]:
+        """Split a block into sentence units tagged with the boundary before each."""
+        pieces = []
+        for p, paragraph in enumerate(_PARAGRAPH_BREAK.split(block)):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if p == 0:
+                strength = self.block_boundary if self._started else CHAPTER
+            else:
+                strength = PARAGRAPH
+            if _HEADING.match(paragraph.split("\n", 1)[0]):
+                strength = CHAPTER
+            for s, sentence in enumerate(_SENTENCE_BREAK.split(paragraph)):
+                if sentence:
+                    pieces.append((sentence, strength if s == 0 else SENTENCE, "\n\n" if s == 0 else " "))
+
+        units = []
+        counts = self.counter.count_batch([text for text, _, _ in pieces])
+        for (text, strength, separator), tokens in zip(pieces, counts):
+            # Budget a token for the whitespace that joins units back together
+            tokens += 1
+            if tokens <= self.target_tokens:
+                units.append(_Unit(text, tokens, strength, separator))
+                continue
+            # A sentence longer than a whole chunk has to be cut mid-sentence
+            parts = self.counter.split(text, self.target_tokens - 1)
+            for i, (part, part_tokens) in enumerate(zip(parts, self.counter.count_batch(parts))):
+                units.append(_Unit(part, min(part_tokens + 1, self.target_tokens), strength if i == 0 else TOKEN, separator if i == 0 else ""))
+        return units
+
+    def _emit(self, count: int) -> str:
+        """Remove the first count units and return them joined into a chunk."""
+        units = self._units[:count]
+        self._units = self._units[count:]
+        self._tokens -= sum(unit.tokens for unit in units)
+        return "".join([units[0].text] + [unit.separator + unit.text for unit in units[1:]]).strip()
+
+    def _best_cut(self, next_unit: _Unit) -> int:
+        """Number of buffered units to emit so the chunk ends at the strongest boundary."""
+        best_cut, best_strength = None, -1
+        prefix = 0
+        for i, unit in enumerate(self._units):
+            # Later cuts win ties, so chunks come out as full as possible
+            if i > 0 and prefix >= self.min_tokens and unit.strength >= best_strength:
+                best_cut, best_strength = i, unit.strength
+            prefix += unit.tokens
+        if best_cut is None or next_unit.strength >= best_strength:
+            return len(self._units)
+        return best_cut
+
+    def feed(self, block: str) -> List[str]:
+        """
+        Add the next block of text.
+
+        Args:
+            block: Text block in reading order
+
+        Returns:
+            Chunks completed by this block
+        """
+        chunks = []
+        for unit in self._segment(block):
+            self._started = True
+            if self._units and unit.strength == CHAPTER and self._tokens >= self.min_tokens:
+                chunks.append(self._emit(len(self._units)))
+            while self._units and self._tokens + unit.tokens > self.target_tokens:
+                chunks.append(self._emit(self._best_cut(unit)))
+            self._units.append(unit)
+            self._tokens += unit.tokens
+        return chunks
+
+    def finish(self) -> List[str]:
+        """
+        Flush the text still buffered.
+
+        Returns:
+            The final chunk, if any text is left
+        """
+        if not self._units:
+            return []
+        return [self._emit(len(self._units))]
+
+def chunk_blocks(blocks: Iterable[str], block_kind: str = "page", target_tokens: int = CHUNK_TARGET_TOKENS) -> Iterator[str]:
+    """
+    Split a stream of text blocks into token-budgeted chunks.
+
+    Chunks hold at most target_tokens tokens of the extraction model's tokenizer
+    and end at the strongest nearby boundary: chapter headings and EPUB spine
+    items first, then PDF page breaks, paragraphs and sentences. Each chunk is
+    yielded as soon as it is complete, and the work is linear in the text length.
+
+    Args:
+        blocks: Text blocks in reading order
+        block_kind: What a block is ("document", "page" or "slice")
+        target_tokens: Maximum tokens per chunk
+
+    Yields:
+        Text chunks
+    """
+    chunker = StructuredChunker(target_tokens=target_tokens, block_kind=block_kind)
+    for block in blocks:
+        yield from chunker.feed(block)
+    yield from chunker.finish()
+
+async def achunk_blocks(blocks: AsyncIterable[str], block_kind: str = "page", target_tokens: int = CHUNK_TARGET_TOKENS) -> AsyncIterator[str]:
+    """
+    Async counterpart of chunk_blocks, for blocks streamed from the parsing pool.
+
+    Args:
+        blocks: Text blocks in reading order
+        block_kind: What a block is ("document", "page" or "slice")
+        target_tokens: Maximum tokens per chunk
+
+    Yields:
+        Text chunks
+    """
+    chunker = StructuredChunker(target_tokens=target_tokens, block_kind=block_kind)
+    async for block in blocks:
+        for chunk in chunker.feed(block):
+            yield chunk
+    for chunk in chunker.finish():
+        yield chunk
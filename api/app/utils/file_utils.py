@@ -1,55 +1,230 @@
 from fastapi import File, UploadFile, HTTPException
 from pathlib import Path
-import shutil
-import uuid
+from io import BytesIO
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional, Union
+import asyncio
+import codecs
+import hashlib
 import logging
-import PyPDF2
-import ebooklib
-from ebooklib import epub
-from bs4 import BeautifulSoup 
+import multiprocessing
+import os
+import tempfile
+import threading
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
 MAX_FILE_SIZE = 50 * 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+TEXT_BLOCK_SIZE = 64 * 1024
+
+# Number of worker processes for document parsing; 0 parses in threads instead
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Pages handed to a worker at a time; each task re-opens the PDF, so keep it well above 1
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+def get_parse_pool() -> Optional[Executor]:
+    """Return the process-wide parsing pool, or None when parsing runs in threads."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None and PARSE_WORKERS > 0:
+            # Spawned rather than forked: the server process holds driver threads and locks
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _parse_pool
+
+def shutdown_parse_pool() -> None:
+    """Stop the parsing pool's worker processes."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(cancel_futures=True)
+            _parse_pool = None
+
+# Worker functions run in the parsing pool, so they take and return plain picklable values
+
+def _open_pdf(source: Union[bytes, str]):
+    import PyPDF2
+    # Worker processes get a temporary file path rather than a copy of the document per task
+    return PyPDF2.PdfReader(source if isinstance(source, str) else BytesIO(source))
+
+def _count_pdf_pages(source: Union[bytes, str]) -> int:
+    return len(_open_pdf(source).pages)
+
+def _extract_pdf_pages(source: Union[bytes, str], start: int, stop: int) -> List[str]:
+    pdf_reader = _open_pdf(source)
+    return [pdf_reader.pages[i].extract_text() for i in range(start, stop)]
+
+def _read_epub_documents(data: bytes) -> List[bytes]:
+    import ebooklib
+    from ebooklib import epub
+    book = epub.read_epub(BytesIO(data))
+    return [item.content for item in book.get_items_of_type(ebooklib.ITEM_DOCUMENT)]
+
+def _html_to_text(content: bytes) -> str:
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(content, 'html.parser').get_text()
+
+def _iter_text_slices(data: bytes) -> Iterator[str]:
+    """Decode text in slices cut at newlines, so joining them with newlines restores the text."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    pending = ""
+    for offset in range(0, len(data), TEXT_BLOCK_SIZE):
+        pending += decoder.decode(data[offset:offset + TEXT_BLOCK_SIZE])
+        cut = pending.rfind('\n')
+        if cut != -1:
+            yield pending[:cut]
+            pending = pending[cut + 1:]
+    yield pending + decoder.decode(b'', final=True)
+
+def _write_temporary_file(data: bytes, suffix: str) -> str:
+    descriptor, path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(descriptor, "wb") as f:
+        f.write(data)
+    return path
+
+async def _iter_in_pool(pool: Optional[Executor], function: Callable, tasks: Iterable[tuple]) -> AsyncIterator:
+    """
+    Run tasks in the parsing pool and yield their results in order.
+
+    Only about one task per worker is queued at a time, topped up as results
+    are taken, so a long document doesn't fill the pool's queue ahead of
+    other uploads or parse far ahead of a slow reader.
+    """
+    loop = asyncio.get_running_loop()
+    tasks = iter(tasks)
+    in_flight = deque()
+
+    def submit_next() -> None:
+        args = next(tasks, None)
+        if args is not None:
+            in_flight.append(loop.run_in_executor(pool, function, *args))
 
-async def process_file(file_path: Path) -> dict:
     try:
-        file_size = file_path.stat().st_size
-        content = ""
-        
-        if file_path.suffix.lower() == '.pdf':
-            with open(file_path, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                content = '\n'.join(page.extract_text() for page in pdf_reader.pages)
-        
-        elif file_path.suffix.lower() == '.epub':
-            logger.info(f"epub")
-            book = epub.read_epub(str(file_path))
-            logger.info(f"epub2")
-            texts = []
-            for item in book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
-                soup = BeautifulSoup(item.content, 'html.parser')
-                texts.append(soup.get_text())
-            content = '\n'.join(texts)
+        for _ in range(max(1, PARSE_WORKERS)):
+            submit_next()
+        while in_flight:
+            result = await in_flight.popleft()
+            submit_next()
+            yield result
+    finally:
+        # Don't leave the pool parsing a document nobody is reading any more
+        for task in in_flight:
+            task.cancel()
+
+async def _iter_pdf_pages(pool: Optional[Executor], source: Union[bytes, str], page_count: int) -> AsyncIterator[str]:
+    batches = (
+        (source, start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    )
+    try:
+        async for pages in _iter_in_pool(pool, _extract_pdf_pages, batches):
+            for page in pages:
+                yield page
+    finally:
+        if isinstance(source, str):
+            os.unlink(source)
+
+async def _iter_epub_documents(pool: Optional[Executor], contents: List[bytes]) -> AsyncIterator[str]:
+    async for document in _iter_in_pool(pool, _html_to_text, ((content,) for content in contents)):
+        yield document
+
+async def _iter_text(data: bytes) -> AsyncIterator[str]:
+    # Decoding is cheap enough to stay on the event loop
+    for block in _iter_text_slices(data):
+        yield block
+
+def text_block_kind(suffix: str) -> str:
+    """
+    Describe what one text block of a file type is, for the chunker.
+    
+    Args:
+        suffix: File extension
         
-        else:  # text file
-            with open(file_path, 'rb') as f:
-                content = f.read().decode('utf-8', errors='ignore')
+    Returns:
+        "page" for PDFs, "document" for EPUB spine items, "slice" for text files
+    """
+    return {'.pdf': 'page', '.epub': 'document'}.get(suffix.lower(), 'slice')
+
+async def open_text_blocks(data: bytes, suffix: str) -> AsyncIterator[str]:
+    """
+    Open a document in the parsing pool and return an async stream of its text blocks.
+    
+    The document is opened before this returns, so a corrupt file fails here
+    rather than halfway through the stream. Extraction is then fanned out
+    across the pool: PDFs in batches of PDF_PAGES_PER_TASK pages and EPUBs one
+    spine document per task, with about one task per worker queued at a time.
+    Blocks are yielded in reading order as soon as they are ready, while the
+    next pages are still being parsed. Worker processes read a PDF from a
+    temporary file, removed once the stream is finished or closed.
+    
+    Args:
+        data: Raw file contents
+        suffix: File extension, used to pick the parser
         
-        return {
-            "file_size": file_size,
-            "text_content": content,
-            "status": "processed"
-        }
-    except Exception as e:
-        logger.error(f"File processing failed: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
+    Returns:
+        Async iterator of text blocks (PDF pages, EPUB documents or text slices)
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_parse_pool()
+    
+    if suffix.lower() == '.pdf':
+        # Threads share the bytes; processes would otherwise be sent a copy with every batch
+        source = data if pool is None else await asyncio.to_thread(_write_temporary_file, data, '.pdf')
+        try:
+            page_count = await loop.run_in_executor(pool, _count_pdf_pages, source)
+        except BaseException:
+            if isinstance(source, str):
+                os.unlink(source)
+            raise
+        return _iter_pdf_pages(pool, source, page_count)
+    
+    elif suffix.lower() == '.epub':
+        contents = await loop.run_in_executor(pool, _read_epub_documents, data)
+        return _iter_epub_documents(pool, contents)
+    
+    else:  # text file
+        return _iter_text(data)
 
-async def extract_file_content(file: UploadFile = File(...)):
+async def read_upload(file: UploadFile, max_size: int = MAX_FILE_SIZE) -> bytes:
+    """
+    Read an upload into memory, rejecting it as soon as it grows past the size limit.
+    
+    Args:
+        file: Uploaded file
+        max_size: Maximum accepted size in bytes
+        
+    Returns:
+        The file contents
+    """
+    buffer = BytesIO()
+    while True:
+        data = await file.read(READ_CHUNK_SIZE)
+        if not data:
+            break
+        buffer.write(data)
+        if buffer.tell() > max_size:
+            logger.warning(f"File too large: more than {max_size / (1024*1024):.2f} MB")
+            raise HTTPException(status_code=400, detail="File too large")
+    return buffer.getvalue()
 
+async def receive_upload(file: UploadFile) -> bytes:
+    """
+    Check an upload's type and read it within the size limit.
+    
+    Args:
+        file: Uploaded file
+        
+    Returns:
+        The file contents
+    """
     logger.info(f"Receiving upload: {file.filename} ({file.content_type})")
     
     allowed_types = ["application/pdf", "application/epub+zip", "text/plain"]
@@ -57,32 +232,42 @@ async def extract_file_content(file: UploadFile = File(...)):
         logger.warning(f"Invalid file type: {file.content_type}")
         raise HTTPException(status_code=400, detail="Invalid file type")
     
-    file_ext = Path(file.filename).suffix
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = UPLOAD_DIR / unique_filename
+    return await read_upload(file)
+
+async def open_book(filename: str, data: bytes) -> dict:
+    """
+    Open a book's raw contents for processing.
     
-    try:
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        file_size = file_path.stat().st_size
-        if file_size > MAX_FILE_SIZE:
-            logger.warning(f"File too large: {file_size / (1024*1024):.2f} MB")
-            file_path.unlink()
-            raise HTTPException(status_code=400, detail="File too large")
+    Args:
+        filename: Original file name; its extension picks the parser
+        data: Raw file contents
         
-        result = await process_file(file_path)
-        file_path.unlink()
-        
-        return {
-            "filename": file.filename,
-            "processed_data": result
+    Returns:
+        Dictionary in the shape process_book expects, with the text blocks still streaming
+    """
+    suffix = Path(filename).suffix
+    text_blocks = await open_text_blocks(data, suffix)
+    
+    return {
+        "filename": filename,
+        # Derived from the contents, so books that share a file name stay apart
+        "book_id": hashlib.sha1(data).hexdigest()[:16],
+        "processed_data": {
+            "file_size": len(data),
+            "text_blocks": text_blocks,
+            "block_kind": text_block_kind(suffix),
+            "status": "streaming"
         }
+    }
+
+async def extract_file_content(file: UploadFile = File(...)):
+    data = await receive_upload(file)
+    
+    try:
+        return await open_book(file.filename, data)
         
     except Exception as e:
         logger.error(f"Upload failed: {str(e)}", exc_info=True)
-        if file_path.exists():
-            file_path.unlink()
         raise HTTPException(status_code=500, detail=str(e))
     
 
@@ -116,4 +301,4 @@ def chunkify_textblob(text, chunk_size=10000, overlap=100):
         if next_word != -1 and next_word - start < overlap:
             start = next_word + 1
 
-    return chunks
\ No newline at end of file
+    return chunks
@@ -0,0 +1,180 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+def _strip_fences(text: str) -> str:
+    """Drop Markdown code fences and anything before the first brace."""
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object in the response")
+    text = text[start:]
+    fence = text.rfind("```")
+    if fence != -1:
+        text = text[:fence]
+    return text
+
+def _at_element_boundary(stack: List[str]) -> bool:
+    """Whether the open containers are just the top-level object, or it and one of its arrays."""
+    return len(stack) == 1 or (len(stack) == 2 and stack[-1] == "]")
+
+def parse_partial_json(text: str) -> Tuple[Any, bool]:
+    """
+    Parse a JSON object, recovering as much as possible from a truncated one.
+
+    A truncated document is cut back to the last complete member of the
+    top-level object or element of one of its top-level arrays, and its open
+    containers are closed. Every member or element that is returned was
+    fully present in the text; a half-written one (such as an entity object
+    cut off partway through its fields) is dropped rather than guessed at.
+    A document whose top-level object closes counts as complete, whatever
+    text the model wrote after it.
+
+    Args:
+        text: Model response, possibly wrapped in code fences or cut off
+
+    Returns:
+        (parsed value, whether the text was complete)
+
+    Raises:
+        ValueError: If no part of the text can be recovered
+    """
+    text = _strip_fences(text)
+    try:
+        # Stops at the end of the top-level value, so trailing prose is ignored
+        return json.JSONDecoder().raw_decode(text)[0], True
+    except json.JSONDecodeError:
+        pass
+
+    # Remember every position where a top-level member or an element of a
+    # top-level array had just finished, together with the containers open at
+    # that point; cutting anywhere deeper would keep part of an element
+    checkpoints: List[Tuple[int, str]] = []
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+            # An empty container is a valid point to stop at
+            if _at_element_boundary(stack):
+                checkpoints.append((i + 1, "".join(reversed(stack))))
+        elif char in "}]":
+            if not stack:
+                break
+            stack.pop()
+            if not stack or _at_element_boundary(stack):
+                checkpoints.append((i + 1, "".join(reversed(stack))))
+            if not stack:
+                break
+        elif char == "," and _at_element_boundary(stack):
+            checkpoints.append((i, "".join(reversed(stack))))
+
+    for end, closers in reversed(checkpoints):
+        try:
+            return json.loads(text[:end] + closers), False
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("Could not recover any JSON from the response")
+
+class IncrementalObjectParser:
+    """
+    Picks complete objects out of top-level arrays while a JSON document streams in.
+
+    For a document like {"characters": [{...}, {...}], ...} fed in arbitrary
+    pieces, every element object of a watched array is returned as soon as its
+    closing brace arrives. Scanning is incremental, so the total work is linear
+    in the length of the document.
+    """
+
+    def __init__(self, keys: List[str]):
+        """
+        Initialize the parser.
+
+        Args:
+            keys: Top-level keys whose array elements should be emitted
+        """
+        self.keys = set(keys)
+        self._buffer = ""
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._last_string = None
+        self._current_key = None
+        self._element_start = None
+
+    def feed(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Add the next piece of the document.
+
+        Args:
+            text: Newly received text
+
+        Returns:
+            (key, object) pairs for the elements completed by this piece
+        """
+        self._buffer += text
+        completed = []
+        buffer = self._buffer
+        for i in range(self._position, len(buffer)):
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = buffer[self._string_start:i]
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif char == ":" and self._depth == 1:
+                # Strings at depth 1 followed by a colon are top-level keys
+                self._current_key = self._last_string
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 3 and char == "{" and self._current_key in self.keys:
+                    self._element_start = i
+            elif char in "}]":
+                if self._depth == 3 and self._element_start is not None:
+                    element = self._parse(buffer[self._element_start:i + 1])
+                    if element is not None:
+                        completed.append((self._current_key, element))
+                    self._element_start = None
+                self._depth -= 1
+        self._position = len(buffer)
+        # Keep only what an element still being written needs
+        keep_from = self._element_start if self._element_start is not None else self._position
+        if self._in_string and self._depth == 1:
+            keep_from = min(keep_from, self._string_start)
+        if keep_from > 0:
+            self._buffer = buffer[keep_from:]
+            self._position -= keep_from
+            if self._element_start is not None:
+                self._element_start -= keep_from
+            if self._string_start is not None:
+                self._string_start -= keep_from
+        return completed
+
+    @staticmethod
+    def _parse(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None
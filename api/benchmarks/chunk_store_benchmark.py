@@ -0,0 +1,71 @@
+"""
+Drive the chunk store upload stage against the in-memory Pinecone stand-in.
+
+Run from the api directory:
+
+    python -m benchmarks.chunk_store_benchmark [--chunks N] [--latency S] [--visibility-delay S]
+
+Two synthetic books that share a file name but not their contents are queued
+through ChunkUploader, as process_book does, for several batch sizes and
+request concurrencies. The stand-in sleeps on every upsert and only shows
+records after a delay, like a remote index. Reports how long the pipeline
+was blocked on put(), the total upload time and the requests made, then
+checks that every record of both books became queryable under its own id.
+Exits with an error if any record is missing or landed under the wrong book.
+"""
+import argparse
+import asyncio
+import hashlib
+import time
+
+from app.pipeline.chunk_uploader import ChunkUploader, chunk_record
+from app.services.pinecone.memory_adapter import InMemoryPineconeAdapter
+from benchmarks.chunker_benchmark import synthetic_book
+
+async def upload(adapter: InMemoryPineconeAdapter, records: list, batch_size: int, concurrency: int):
+    uploader = ChunkUploader(adapter, batch_size=batch_size, concurrency=concurrency)
+    blocked = 0.0
+    start = time.perf_counter()
+    for record in records:
+        put_start = time.perf_counter()
+        await uploader.put(record)
+        blocked += time.perf_counter() - put_start
+    stored = await uploader.flush()
+    return stored, blocked, time.perf_counter() - start
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200, help="Chunks per book")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per upsert request")
+    parser.add_argument("--visibility-delay", type=float, default=0.2, help="Seconds before upserted records are queryable")
+    args = parser.parse_args()
+
+    filename = "book.txt"
+    books = {}
+    for seed in range(2):
+        chunks = "\n\n".join(synthetic_book(args.chunks * 1000, seed=seed)).split("\n\n")[:args.chunks]
+        book = hashlib.sha1("\n\n".join(chunks).encode("utf-8")).hexdigest()[:16]
+        books[book] = [chunk_record(book, filename, index, chunk, summary=f"summary {index}") for index, chunk in enumerate(chunks)]
+    records = [record for book_records in books.values() for record in book_records]
+    if len({record["id"] for record in records}) != len(records):
+        raise SystemExit("Books with the same file name share record ids")
+
+    print(f"{len(records)} records from {len(books)} books named {filename}, "
+          f"{args.latency}s per request, visible after {args.visibility_delay}s")
+    print(f"{'batch':>6}{'parallel':>10}{'requests':>10}{'blocked s':>11}{'upload s':>10}{'visible s':>11}")
+    for batch_size, concurrency in ((8, 1), (64, 1), (8, 8), (64, 4)):
+        adapter = InMemoryPineconeAdapter(namespace="chunks", latency=args.latency, visibility_delay=args.visibility_delay)
+        stored, blocked, elapsed = asyncio.run(upload(adapter, records, batch_size, concurrency))
+        start = time.perf_counter()
+        if stored != len(records) or not adapter.wait_for_vectors(len(records), timeout=30):
+            raise SystemExit(f"Only {adapter.vector_count()} of {len(records)} records became visible")
+        visible = time.perf_counter() - start
+        for book, book_records in books.items():
+            matches = adapter.query_index(book_records[0]["text"], top_k=len(records), filter={"book_id": book}).matches
+            if {match.id for match in matches} != {record["id"] for record in book_records}:
+                raise SystemExit(f"Records of book {book} are missing or mixed with another book")
+        print(f"{batch_size:>6}{concurrency:>10}{adapter.requests:>10}{blocked:>11.3f}{elapsed:>10.3f}{visible:>11.3f}")
+    print("every record stored once and queryable under its own book")
+
+if __name__ == "__main__":
+    main()
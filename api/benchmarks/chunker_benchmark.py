@@ -0,0 +1,80 @@
+"""
+Compare the structured token-aware chunker with chunkify_textblob.
+
+Run from the api directory:
+
+    python -m benchmarks.chunker_benchmark [book.txt] [--target-tokens N]
+
+Without a file, a synthetic book of about one million characters is used.
+Reports chunk counts, token statistics per chunk and throughput for both
+chunkers, and times the structured chunker at several book sizes to check
+that it scales linearly.
+"""
+import argparse
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from app.utils.chunker import chunk_blocks, get_token_counter, CHUNK_TARGET_TOKENS
+from app.utils.file_utils import chunkify_textblob
+
+WORDS = "the a of and to in was he she it his her that with had as for on at by said Elizabeth Darcy Pemberley".split()
+
+def synthetic_book(characters: int, seed: int = 0) -> List[str]:
+    """Build chapters of random paragraphs until the book reaches the requested size."""
+    rng = random.Random(seed)
+    chapters, size = [], 0
+    while size < characters:
+        paragraphs = [f"CHAPTER {len(chapters) + 1}"]
+        for _ in range(rng.randint(30, 80)):
+            sentences = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 30))).capitalize() + rng.choice(".!?")
+                for _ in range(rng.randint(1, 8))
+            ]
+            paragraphs.append(" ".join(sentences))
+        chapter = "\n\n".join(paragraphs)
+        chapters.append(chapter)
+        size += len(chapter) + 1
+    return chapters
+
+def measure(name: str, chunker: Callable[[], List[str]], characters: int) -> None:
+    start = time.perf_counter()
+    chunks = chunker()
+    seconds = time.perf_counter() - start
+    tokens = get_token_counter().count_batch(chunks)
+    print(
+        f"{name:<12} {len(chunks):>6} chunks  "
+        f"tokens min/mean/max {min(tokens)}/{int(statistics.mean(tokens))}/{max(tokens)}  "
+        f"{seconds:.3f}s  {characters / seconds / 1e6:.2f}M chars/s"
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("book", nargs="?", help="Plain-text book; blank-line separated chapters are not required")
+    parser.add_argument("--target-tokens", type=int, default=CHUNK_TARGET_TOKENS)
+    args = parser.parse_args()
+
+    if args.book:
+        blocks = [Path(args.book).read_text(errors="ignore")]
+        block_kind = "slice"
+    else:
+        blocks = synthetic_book(1_000_000)
+        block_kind = "document"
+    text = "\n".join(blocks)
+    characters = len(text)
+    print(f"{characters:,} characters, target {args.target_tokens} tokens per chunk")
+
+    measure("textblob", lambda: chunkify_textblob(text), characters)
+    measure("structured", lambda: list(chunk_blocks(blocks, block_kind, args.target_tokens)), characters)
+
+    print("Scaling of the structured chunker:")
+    for size in (250_000, 500_000, 1_000_000, 2_000_000):
+        book = synthetic_book(size, seed=1)
+        start = time.perf_counter()
+        count = sum(1 for _ in chunk_blocks(book, "document", args.target_tokens))
+        print(f"  {size:>9,} chars  {count:>5} chunks  {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compare the ways entity embeddings can be stored on Neo4j nodes.
+
+Run from the api directory:
+
+    python -m benchmarks.embedding_encoding_benchmark [--entities N] [--queries Q] [--dimensions D] [--noise S]
+
+Encodes random dense embeddings as float lists, float32 bytes and int8 bytes
+with a scale, then decodes them as loading the in-memory index does. Reports
+the stored size per vector (Neo4j keeps float lists as 64-bit floats), encode
+and decode time, and how often a nearest-neighbour search over the decoded
+vectors finds the same entity as one over the originals, for queries that
+are stored embeddings plus noise.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.neo4j.embedding_codec import EMBEDDING_ENCODINGS, decode_embedding, encode_embedding
+from app.services.vector.vector_index import VectorIndex
+
+def stored_bytes(properties: dict) -> int:
+    if properties["embedding"] is not None:
+        return 8 * len(properties["embedding"])
+    return len(properties["embedding_bytes"]) + (8 if properties["embedding_scale"] is not None else 0)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", type=int, default=20000, help="Stored embeddings")
+    parser.add_argument("--queries", type=int, default=500, help="Nearest-neighbour searches compared")
+    parser.add_argument("--dimensions", type=int, default=384, help="Embedding size")
+    parser.add_argument("--noise", type=float, default=0.5, help="Query noise relative to the stored embedding")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.entities, args.dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Each query is a stored embedding moved by noise, as a new mention of a known entity would be
+    query_vectors = vectors[rng.integers(0, args.entities, args.queries)]
+    query_vectors = query_vectors + args.noise * rng.standard_normal(query_vectors.shape).astype(np.float32) / np.sqrt(args.dimensions)
+
+    reference = VectorIndex(dimensions=args.dimensions, initial_capacity=len(vectors))
+    for key, vector in enumerate(vectors):
+        reference.add(key, vector)
+    expected = [reference.search(vector, k=1)[0][0] for vector in query_vectors]
+
+    print(f"{'encoding':<10}{'bytes/vector':>14}{'encode ms':>12}{'decode ms':>12}{'same top-1':>12}")
+    for encoding in EMBEDDING_ENCODINGS:
+        start = time.perf_counter()
+        stored = [encode_embedding(vector, encoding) for vector in vectors]
+        encode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decoded = [
+            decode_embedding(properties["embedding_bytes"] if properties["embedding_bytes"] is not None else properties["embedding"], properties["embedding_scale"])
+            for properties in stored
+        ]
+        decode_time = time.perf_counter() - start
+
+        index = VectorIndex(dimensions=args.dimensions, initial_capacity=len(decoded))
+        for key, vector in enumerate(decoded):
+            index.add(key, vector)
+        same = sum(index.search(vector, k=1)[0][0] == key for vector, key in zip(query_vectors, expected))
+
+        print(f"{encoding:<10}{stored_bytes(stored[0]):>14,}{1000 * encode_time:>12.1f}{1000 * decode_time:>12.1f}{same / len(expected):>12.1%}")
+
+if __name__ == "__main__":
+    main()
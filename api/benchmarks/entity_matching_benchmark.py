@@ -0,0 +1,101 @@
+"""
+Compare full embedding search with name-blocked search for entity matching.
+
+Run from the api directory:
+
+    python -m benchmarks.entity_matching_benchmark [--entities N] [--queries Q] [--candidates K]
+
+Synthetic characters get random first and last names; queries are either
+stored characters under a variant of their name (a title, a possessive, just
+the surname, a typo) or unseen characters. Embeddings hash name and
+description words, so no model is needed. Reports per-query latency of
+searching every vector against searching only the top-K name candidates, and
+how often each finds the right character for the stored ones.
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+from app.services.pinecone.memory_adapter import hashed_embeddings
+from app.services.vector.name_index import NameIndex
+from app.services.vector.vector_index import VectorIndex
+from benchmarks.chunker_benchmark import WORDS
+
+FIRST = ["Emma", "George", "Harriet", "Frank", "Jane", "Robert", "Anne", "Henry", "Philip", "Isabella",
+         "John", "Augusta", "Charles", "Mary", "Edward", "Elizabeth", "William", "Catherine", "Thomas", "Lucy"]
+TITLES = ["Mr.", "Mrs.", "Miss", "Dr.", "Captain", "Lady", "Sir"]
+
+SYLLABLES = [consonant + vowel for consonant in "bcdfghklmnprstvw" for vowel in "aeiou"] + ["ton", "ley", "ford", "well", "by"]
+
+def surname(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+def variant(rng: random.Random, name: str) -> str:
+    first, last = name.split(" ", 1)
+    choice = rng.randrange(4)
+    if choice == 0:
+        return f"{rng.choice(TITLES)} {last}"
+    if choice == 1:
+        return f"{name}'s"
+    if choice == 2:
+        return last
+    position = rng.randrange(1, len(last))
+    return f"{first} {last[:position]}{last[position + 1:]}"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", type=int, default=20000, help="Stored characters")
+    parser.add_argument("--queries", type=int, default=500, help="Characters to match")
+    parser.add_argument("--candidates", type=int, default=10, help="Name candidates compared by embedding")
+    parser.add_argument("--dimensions", type=int, default=384, help="Embedding size")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = list(dict.fromkeys(f"{rng.choice(FIRST)} {surname(rng)}" for _ in range(args.entities)))
+    descriptions = {name: " ".join(rng.choice(WORDS) for _ in range(12)) for name in names}
+    embed = lambda texts: hashed_embeddings(texts, args.dimensions)
+
+    start = time.perf_counter()
+    vectors = VectorIndex(dimensions=args.dimensions, initial_capacity=len(names))
+    name_index = NameIndex()
+    for name, embedding in zip(names, embed([f"{name} {descriptions[name]}" for name in names])):
+        vectors.add(name, embedding)
+        name_index.add(name, [name])
+    print(f"{len(names):,} characters indexed in {time.perf_counter() - start:.2f}s")
+
+    # (query name, description, stored character it should match or None)
+    queries: List[Tuple[str, str, Optional[str]]] = []
+    for _ in range(args.queries):
+        if rng.random() < 0.7:
+            name = rng.choice(names)
+            queries.append((variant(rng, name), descriptions[name], name))
+        else:
+            queries.append((f"{rng.choice(FIRST)} {surname(rng)}", " ".join(rng.choice(WORDS) for _ in range(12)), None))
+    query_vectors = embed([f"{name} {description}" for name, description, _ in queries])
+
+    full, blocked = [], []
+    found = {"full": 0, "blocked": 0}
+    for (name, _, expected), vector in zip(queries, query_vectors):
+        start = time.perf_counter()
+        best_full = vectors.search(vector, k=1)
+        full.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        keys = [key for key, _ in name_index.search([name], k=args.candidates)]
+        best_blocked = vectors.search_keys(vector, keys, k=1)
+        blocked.append(time.perf_counter() - start)
+
+        if expected:
+            found["full"] += bool(best_full) and best_full[0][0] == expected
+            found["blocked"] += bool(best_blocked) and best_blocked[0][0] == expected
+
+    print(f"{'':<22}{'p50 ms':>10}{'mean ms':>10}")
+    for label, latencies in (("full search", full), (f"blocked (k={args.candidates})", blocked)):
+        print(f"{label:<22}{1000 * statistics.median(latencies):>10.3f}{1000 * statistics.fmean(latencies):>10.3f}")
+    stored = sum(expected is not None for _, _, expected in queries)
+    print(f"right character found: full {found['full'] / stored:.1%}, blocked {found['blocked'] / stored:.1%} of {stored} stored-character queries")
+
+if __name__ == "__main__":
+    main()
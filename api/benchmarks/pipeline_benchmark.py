@@ -0,0 +1,111 @@
+"""
+Drive process_book end to end against the offline fake LLM backend.
+
+Run from the api directory, with Neo4j reachable through the usual NEO4J_*
+settings (point NEO4J_DATABASE at a scratch database; the run writes to it):
+
+    python -m benchmarks.pipeline_benchmark [book.pdf|book.epub|book.txt] [--chunks N] [--latency S]
+
+Without a file, a synthetic book of about one million characters is used.
+Pass --dry-run to skip Neo4j entirely, --stream-entities to report
+entities as responses stream in and --consolidation batch to cluster the
+whole book's entities after extraction instead of resolving them per chunk. Reports chunks per second and the time spent
+in each pipeline stage. Extraction time is summed across concurrent calls, so
+it can exceed the wall time.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("book", nargs="?", help="Book to process (PDF, EPUB or text)")
+    parser.add_argument("--chunks", type=int, default=None, help="Process at most this many chunks")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per fake LLM call")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Random extra seconds per call, up to this much")
+    parser.add_argument("--characters", type=int, default=4, help="Characters per fake response")
+    parser.add_argument("--locations", type=int, default=2, help="Locations per fake response")
+    parser.add_argument("--relationships", type=int, default=4, help="Relationships per fake response")
+    parser.add_argument("--description-words", type=int, default=30, help="Words per fake description")
+    parser.add_argument("--concurrency", type=int, default=None, help="Concurrent extractions (defaults to EXTRACTION_CONCURRENCY)")
+    parser.add_argument("--dry-run", action="store_true", help="Extract only; don't connect to Neo4j")
+    parser.add_argument("--stream-entities", action="store_true", help="Report entities while responses stream in")
+    parser.add_argument("--consolidation", choices=["online", "batch"], default="online", help="Resolve entities per chunk, or cluster the whole book at the end")
+    parser.add_argument("--chunk-store", choices=["none", "memory"], default="none", help="Also upsert chunks into the in-memory chunk store")
+    parser.add_argument("--use-cache", action="store_true", help="Reuse the extraction cache instead of a fresh one")
+    return parser.parse_args()
+
+def configure(args: argparse.Namespace) -> None:
+    """Select the fake backend; settings are read when the app modules are imported."""
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.latency)
+    os.environ["FAKE_LLM_JITTER"] = str(args.jitter)
+    os.environ["FAKE_LLM_CHARACTERS"] = str(args.characters)
+    os.environ["FAKE_LLM_LOCATIONS"] = str(args.locations)
+    os.environ["FAKE_LLM_RELATIONSHIPS"] = str(args.relationships)
+    os.environ["FAKE_LLM_DESCRIPTION_WORDS"] = str(args.description_words)
+    os.environ["CHUNK_STORE"] = args.chunk_store
+    if args.concurrency:
+        os.environ["EXTRACTION_CONCURRENCY"] = str(args.concurrency)
+    if not args.use_cache:
+        # A fresh cache, so every chunk really goes through the backend
+        os.environ["EXTRACTION_CACHE_DIR"] = tempfile.mkdtemp(prefix="extraction-cache-")
+
+async def run(args: argparse.Namespace) -> None:
+    from app.agents.summary_extractor import get_extractor_service
+    from app.pipeline.extraction_scheduler import EXTRACTION_CONCURRENCY
+    from app.pipeline.processing_window import ProcessingWindow
+    from app.pipeline.read_a_book import process_book
+    from app.pipeline.stage_timings import StageTimings
+    from app.services.neo4j.connection import Neo4jConnection
+    from app.utils.file_utils import open_book, shutdown_parse_pool
+
+    if args.book:
+        filename, data = Path(args.book).name, Path(args.book).read_bytes()
+    else:
+        from benchmarks.chunker_benchmark import synthetic_book
+        filename, data = "synthetic.txt", "\n\n".join(synthetic_book(1_000_000)).encode("utf-8")
+
+    connection = None if args.dry_run else Neo4jConnection.from_env()
+    timings = StageTimings()
+    chunks = 0
+    try:
+        start = time.perf_counter()
+        with timings.measure("open"):
+            result = await open_book(filename, data)
+        window = ProcessingWindow(max_chunks=args.chunks, dry_run=args.dry_run)
+        first_result = None
+        first_entity = None
+        async for update in process_book(result, connection, window=window, timings=timings, stream_entities=args.stream_entities, consolidation=args.consolidation):
+            if update.startswith("Processing chunk"):
+                chunks += 1
+                if first_result is None:
+                    first_result = time.perf_counter() - start
+            elif update.startswith("\nCharacter") and first_entity is None:
+                first_entity = time.perf_counter() - start
+        wall = time.perf_counter() - start
+    finally:
+        shutdown_parse_pool()
+        if connection is not None:
+            await connection.aclose()
+
+    print(f"{filename}: {len(data):,} bytes, {chunks} chunks, concurrency {EXTRACTION_CONCURRENCY}, "
+          f"fake latency {args.latency}s (+{args.jitter}s jitter)")
+    print(f"wall {wall:.2f}s, first entity after {first_entity or 0:.2f}s, first chunk after {first_result or 0:.2f}s, "
+          f"{chunks / wall:.2f} chunks/s")
+    print(f"{'stage':<16}{'seconds':>10}{'calls':>8}{'ms/call':>10}{'% wall':>8}")
+    for stage, seconds in sorted(timings.seconds.items(), key=lambda item: -item[1]):
+        calls = timings.calls[stage]
+        print(f"{stage:<16}{seconds:>10.3f}{calls:>8}{1000 * seconds / calls:>10.1f}{100 * seconds / wall:>8.1f}")
+    print("LLM calls:", get_extractor_service().metrics.to_dict())
+
+def main() -> None:
+    args = parse_args()
+    configure(args)
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
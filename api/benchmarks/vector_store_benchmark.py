@@ -0,0 +1,92 @@
+"""
+Compare query latency of the local vector store with the in-memory stand-in.
+
+Run from the api directory:
+
+    python -m benchmarks.vector_store_benchmark [--records N] [--dimensions D] [--queries Q]
+
+Records are synthetic chunks embedded by word hashing, so no model or network
+is needed. Reports upsert throughput and p50/p95 query latency with and
+without a metadata filter, and how often both stores return the same top
+result (all but ties while the local store searches exactly).
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+from app.services.pinecone.memory_adapter import InMemoryPineconeAdapter, hashed_embeddings
+from app.services.vector.local_store import LocalVectorStore
+from benchmarks.chunker_benchmark import WORDS
+
+def synthetic_records(count: int, books: int = 20, words: int = 200, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"record-{i}",
+            "text": " ".join(rng.choice(WORDS) + str(rng.randrange(500)) for _ in range(words)),
+            "metadata": {"book": f"book-{i % books}", "chunk": i // books},
+        }
+        for i in range(count)
+    ]
+
+def time_queries(store, queries: List[str], **kwargs) -> List[float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.query_index(query, top_k=5, **kwargs)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def report(name: str, latencies: List[float]) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    print(f"{name:<28}{1000 * statistics.median(latencies):>10.2f}{1000 * p95:>10.2f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000, help="Records to upsert")
+    parser.add_argument("--dimensions", type=int, default=384, help="Embedding size")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to time")
+    parser.add_argument("--batch-size", type=int, default=256, help="Records per upsert request")
+    args = parser.parse_args()
+
+    records = synthetic_records(args.records)
+    rng = random.Random(1)
+    queries = [" ".join(rng.choice(WORDS) + str(rng.randrange(500)) for _ in range(8)) for _ in range(args.queries)]
+    embedder: Callable[[List[str]], object] = lambda texts: hashed_embeddings(texts, args.dimensions)
+
+    with tempfile.TemporaryDirectory() as directory:
+        stores = {
+            "memory": InMemoryPineconeAdapter(namespace="bench", dimensions=args.dimensions),
+            "local": LocalVectorStore(directory, namespace="bench", dimensions=args.dimensions, embedder=embedder),
+        }
+        print(f"{args.records:,} records, {args.dimensions} dimensions, {args.queries} queries")
+        print(f"{'':<28}{'p50 ms':>10}{'p95 ms':>10}")
+        results = {}
+        for name, store in stores.items():
+            store.create_index()
+            start = time.perf_counter()
+            store.upsert_data(records, batch_size=args.batch_size)
+            elapsed = time.perf_counter() - start
+            print(f"{name} upsert: {args.records / elapsed:,.0f} records/s")
+            report(f"{name} query", time_queries(store, queries))
+            report(f"{name} query, filtered", time_queries(store, queries, filter={"book": {"$in": ["book-1", "book-2"]}}))
+            results[name] = [store.query_index(query, top_k=1).matches[0].id for query in queries]
+
+        # Reopen from disk to time the cold load
+        stores["local"].close()
+        start = time.perf_counter()
+        reopened = LocalVectorStore(directory, namespace="bench", embedder=embedder)
+        reopened.create_index()
+        print(f"local reopen: {time.perf_counter() - start:.3f}s, {reopened.vector_count():,} vectors")
+        report("local query after reopen", time_queries(reopened, queries))
+        reopened.close()
+
+    agreement = sum(a == b for a, b in zip(results["memory"], results["local"])) / len(queries)
+    print(f"top-1 agreement between stores: {agreement:.1%}")
+
+if __name__ == "__main__":
+    main()